@@ -1,223 +1,708 @@
 #!/usr/bin/env python
 
 import os
-import json
+import copy
+import hashlib
+import time
+import threading
 import requests
 import logging
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# local imports
+import artifactoryCache
+import artifactoryDescriptor
+import artifactoryRetry
+import artifactoryLimits
+import artifactoryMetrics
+import artifactoryJSON
+import artifactoryAuth
 
 # uncomment the following line, if needed, to avoid SSL missing certificate warnings
 # logging.getLogger("urllib3").setLevel(logging.ERROR)
 
+# bytes read from the socket at a time when decoding a streamed response
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# size in bytes of a request body given as text, bytes or a file
+def _body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, bytes):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    try:
+        return os.fstat(body.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+# size, SHA-1, SHA-256 and MD5 of a file, read a chunk at a time
+def file_checksums(fileName):
+    sha1, sha256, md5 = hashlib.sha1(), hashlib.sha256(), hashlib.md5()
+    size = 0
+    with open(fileName, 'rb') as artifact_file:
+        while True:
+            chunk = artifact_file.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            sha1.update(chunk)
+            sha256.update(chunk)
+            md5.update(chunk)
+            size += len(chunk)
+    return {'size': size, 'sha1': sha1.hexdigest(), 'sha256': sha256.hexdigest(), 'md5': md5.hexdigest()}
+
+# True if a 404 response to a checksum deploy means the server has no content with the checksums, rather than
+# that the repository or path does not exist
+def checksum_deploy_failed(response):
+    try:
+        errors = artifactoryJSON.decode(response.content).get('errors') or []
+        message = ' '.join(str(error.get('message', '')) for error in errors)
+    except (ValueError, AttributeError):
+        message = response.text
+    return 'checksum' in message.lower()
+
 class ArtifactoryAPI:
-    
-    def __init__(self, serverBase, username, password):
+
+    # poolConnections: number of per-host connection pools to keep
+    # poolMaxSize: maximum number of connections kept open to a single host
+    # keepAliveTimeout: seconds the client may be idle before its pooled connections are discarded rather than
+    #   reused; the idle time is that of the client as a whole, not of each connection; None reuses indefinitely
+    # cacheDirectory: if set, detail responses are cached there and revalidated with conditional requests
+    # cacheMaxBytes: size limit of the cache directory
+    # cacheTTL: if set, GET responses are also kept in memory for this many seconds; writes invalidate them
+    # cacheMaxEntries: number of GET responses kept in memory
+    # retries: times an idempotent request (GET, PUT, DELETE) is retried after a connection error or a 429/502/503/504
+    # backoffFactor: base of the exponential, jittered wait between retries; Retry-After takes precedence
+    # circuitBreakerThreshold: consecutive failures after which calls to the host fail at once; None disables
+    # circuitBreakerReset: seconds before a trial call is let through to a host with an open circuit
+    # rateLimits: requests per second by endpoint family ('security', 'repositories', 'system', 'other')
+    # adaptiveConcurrency: if set, the maximum number of requests in flight; the actual limit adapts to
+    #   the observed latency and error rate
+    # apiKey: if set, authenticate with this API key instead of the password
+    # accessToken: if set, authenticate with this access token instead of the password
+    # useToken: exchange the password for an access token once and authenticate with that, renewing it before
+    #   it expires; password may be None while a token is cached in tokenDirectory
+    # tokenDirectory: if set, tokens are cached there and shared with other clients and runs for the same user
+    # tokenExpiresIn: seconds a token is requested for
+    def __init__(self, serverBase, username, password, poolConnections=4, poolMaxSize=10, keepAliveTimeout=60,
+                 cacheDirectory=None, cacheMaxBytes=64 * 1024 * 1024, cacheTTL=None, cacheMaxEntries=1024,
+                 retries=3, backoffFactor=0.5, circuitBreakerThreshold=5, circuitBreakerReset=30,
+                 rateLimits=None, adaptiveConcurrency=None,
+                 apiKey=None, accessToken=None, useToken=False, tokenDirectory=None, tokenExpiresIn=artifactoryAuth.TOKEN_EXPIRES_IN):
         self.ARTIFACTORY_MGMT_URI = serverBase + "/api/"
+        self.serverBase = serverBase
         self.USER = username
         self.PASSWORD = password
-    
+        self.tokenExpiresIn = tokenExpiresIn
+        self.keepAliveTimeout = keepAliveTimeout
+        self.lastRequestTime = time.time()
+        self.keepAliveLock = threading.Lock()
+
+        # one session, shared by all endpoint methods, so connections (and TLS sessions) are reused
+        self.session = requests.Session()
+        if apiKey:
+            self.session.auth = artifactoryAuth.ApiKeyAuth(apiKey)
+        elif accessToken:
+            self.session.auth = artifactoryAuth.BearerAuth(accessToken)
+        elif useToken:
+            tokenCache = artifactoryAuth.TokenCache(tokenDirectory) if tokenDirectory else None
+            self.session.auth = artifactoryAuth.TokenAuth(serverBase, username,
+                                                          lambda: self._token_request(self._token_create_options(username, self.tokenExpiresIn), direct=True),
+                                                          lambda entry: self._token_request(self._token_refresh_options(entry['accessToken'], entry['refreshToken']), direct=True),
+                                                          tokenCache)
+        else:
+            self.session.auth = (self.USER, self.PASSWORD)
+        self.session.verify = False  # do not check certificate
+        adapter = requests.adapters.HTTPAdapter(pool_connections=poolConnections, pool_maxsize=poolMaxSize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.diskCache = None
+        if cacheDirectory:
+            self.diskCache = artifactoryCache.DiskCache(cacheDirectory, cacheMaxBytes)
+        self.memoryCache = None
+        if cacheTTL:
+            self.memoryCache = artifactoryCache.MemoryCache(cacheTTL, cacheMaxEntries)
+
+        self.retryPolicy = artifactoryRetry.RetryPolicy(retries, backoffFactor)
+        self.circuitBreakerThreshold = circuitBreakerThreshold
+        self.circuitBreakerReset = circuitBreakerReset
+        self.circuitBreakers = {}
+
+        self.rateLimiters = {}
+        for family, rate in (rateLimits or {}).items():
+            self.rateLimiters[family] = artifactoryLimits.TokenBucket(rate)
+        self.concurrencyLimiter = None
+        if adaptiveConcurrency:
+            self.concurrencyLimiter = artifactoryLimits.AdaptiveConcurrencyLimiter(adaptiveConcurrency)
+
+        self.requestHooks = []
+        self.taskWrappers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    # release all pooled connections
+    def close(self):
+        self.session.close()
+
+    # call hook(record) after every HTTP request, including each retry; record is a dict with
+    # method, url, endpoint (template, e.g. 'security/users/{name}'), status (None if no response),
+    # bytesIn, bytesOut, started (epoch seconds), latency (seconds) and attempt
+    def add_request_hook(self, hook):
+        self.requestHooks.append(hook)
+
+    def remove_request_hook(self, hook):
+        self.requestHooks.remove(hook)
+
+    # call wrapper(function) on every function the client hands to its own worker threads (detail prefetch,
+    # concurrent deploys), in the thread handing it over; the wrapper can carry that thread's context, e.g. the
+    # active trace span (artifactoryTrace.Tracer.propagate), over to the worker
+    def add_task_wrapper(self, wrapper):
+        self.taskWrappers.append(wrapper)
+
+    # function wrapped by every task wrapper
+    def _task(self, function):
+        for wrapper in self.taskWrappers:
+            function = wrapper(function)
+        return function
+
+    # send a request to a management API path through the shared connection pool
+    def _request(self, method, path, **kwargs):
+        return self._send(method, self.ARTIFACTORY_MGMT_URI + path, **kwargs)
+
+    # send a request to url, retrying transient failures and failing fast while the host's circuit is open
+    def _send(self, method, url, **kwargs):
+        breaker = self._circuit_breaker(url)
+        rateLimiter = self._rate_limiter(url)
+        family = self._endpoint_family(url)
+        body = kwargs.get('data')
+        bodyStart = body.tell() if hasattr(body, 'seek') else None
+        attempt = 0
+        while True:
+            if breaker:
+                breaker.before_call()
+            outcomeRecorded = False
+            slotHeld = False
+            try:
+                # servers drop idle keep-alive connections; discard ours first rather than fail on a stale socket
+                # idle means no request from any thread of the client, and then every pooled connection is discarded
+                with self.keepAliveLock:
+                    now = time.time()
+                    idle = self.keepAliveTimeout is not None and now - self.lastRequestTime > self.keepAliveTimeout
+                    self.lastRequestTime = now
+                if idle:
+                    for adapter in self.session.adapters.values():
+                        adapter.poolmanager.clear()
+
+                if rateLimiter:
+                    rateLimiter.acquire()
+                if self.concurrencyLimiter:
+                    self.concurrencyLimiter.acquire()
+                    slotHeld = True
+                started = time.time()
+                try:
+                    r = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout):
+                    if self.concurrencyLimiter:
+                        slotHeld = False
+                        self.concurrencyLimiter.release(time.time() - started, True, family)
+                    self._run_request_hooks(method, url, None, started, attempt, kwargs)
+                    if breaker:
+                        breaker.record_failure()
+                        outcomeRecorded = True
+                    r = None
+                    if not self._may_retry(method, attempt, None, body):
+                        raise
+                else:
+                    # 429 Too Many Requests slows us down, but does not mean the host is failing
+                    if self.concurrencyLimiter:
+                        slotHeld = False
+                        self.concurrencyLimiter.release(time.time() - started, r.status_code == 429 or r.status_code >= 500, family)
+                    self._run_request_hooks(method, url, r, started, attempt, kwargs)
+                    if breaker:
+                        if r.status_code >= 500:
+                            breaker.record_failure()
+                        else:
+                            breaker.record_success()
+                        outcomeRecorded = True
+                    if not self._may_retry(method, attempt, r, body):
+                        return r
+                    r.close()
+            finally:
+                # any other way out (an invalid URL, a hook raising, an interrupt) says nothing about the host,
+                # but must still free the concurrency slot and end a trial call, or both would be lost for good
+                if slotHeld:
+                    self.concurrencyLimiter.cancel()
+                if breaker and not outcomeRecorded:
+                    breaker.cancel_call()
+
+            delay = self.retryPolicy.delay(attempt, r)
+            logging.warning(method + ' ' + url + ' failed' + (' with ' + str(r.status_code) if r is not None else '') + '; retrying in ' + '%.1f' % delay + 's')
+            time.sleep(delay)
+            if bodyStart is not None:
+                body.seek(bodyStart)
+            attempt += 1
+
+    def _run_request_hooks(self, method, url, response, started, attempt, requestOptions):
+        if not self.requestHooks:
+            return
+        latency = time.time() - started
+        path = url[len(self.ARTIFACTORY_MGMT_URI):] if url.startswith(self.ARTIFACTORY_MGMT_URI) else None
+        bytesIn = 0
+        bytesOut = _body_size(requestOptions.get('data'))
+        if response is not None:
+            # a streamed body has not been read yet, and a compressed one is decompressed when read;
+            # count what the server announced, the bytes on the wire
+            if requestOptions.get('stream') or response.headers.get('Content-Encoding'):
+                bytesIn = int(response.headers.get('Content-Length', 0))
+            else:
+                bytesIn = len(response.content)
+        record = {'method': method,
+                  'url': url,
+                  'endpoint': artifactoryMetrics.endpoint_template(path),
+                  'status': response.status_code if response is not None else None,
+                  'bytesIn': bytesIn,
+                  'bytesOut': bytesOut,
+                  'started': started,
+                  'latency': latency,
+                  'attempt': attempt}
+        for hook in self.requestHooks:
+            hook(record)
+
+    # a streamed request body can only be sent again if it can be rewound
+    def _may_retry(self, method, attempt, response, body):
+        if hasattr(body, 'read') and not hasattr(body, 'seek'):
+            return False
+        return self.retryPolicy.should_retry(method, attempt, response)
+
+    # endpoint family of url: 'security', 'repositories', 'system', or 'other' (artifacts among them)
+    def _endpoint_family(self, url):
+        path = url[len(self.ARTIFACTORY_MGMT_URI):] if url.startswith(self.ARTIFACTORY_MGMT_URI) else ''
+        return artifactoryLimits.endpoint_family(path)
+
+    # token bucket of url's endpoint family, None if that family is not limited
+    def _rate_limiter(self, url):
+        return self.rateLimiters.get(self._endpoint_family(url))
+
+    # the circuit breaker of url's host, None if circuit breaking is disabled
+    def _circuit_breaker(self, url):
+        if self.circuitBreakerThreshold is None:
+            return None
+        host = requests.compat.urlparse(url).netloc
+        if host not in self.circuitBreakers:
+            self.circuitBreakers.setdefault(host, artifactoryRetry.CircuitBreaker(host, self.circuitBreakerThreshold, self.circuitBreakerReset))
+        return self.circuitBreakers[host]
+
+    # GET a resource, reading through the in-process cache when enabled
+    # revalidate: also use the disk cache, with conditional requests
+    # text: return the body as text instead of decoded JSON
+    def _get(self, path, revalidate=False, text=False):
+        if self.memoryCache is not None:
+            cached = self.memoryCache.get(path)
+            if cached is not None:
+                return copy.deepcopy(cached)
+            generation = self.memoryCache.generation()
+        if revalidate and self.diskCache is not None:
+            status, body = self._get_conditional(path)
+        else:
+            r = self._request('GET', path)
+            status, body = r.status_code, (r.text if text else r.content)
+        value = body if text else artifactoryJSON.decode(body)
+        if self.memoryCache is not None and status in (200, 304):
+            self.memoryCache.put(path, copy.deepcopy(value), generation)
+        return value
+
+    # GET a resource with the validators stored in the disk cache; a 304 Not Modified reuses the stored body
+    # returns the status code and the body text
+    def _get_conditional(self, path):
+        url = self.ARTIFACTORY_MGMT_URI + path
+        entry = self.diskCache.get(url)
+        requestHeaders = {}
+        if entry and entry['etag']:
+            requestHeaders['If-None-Match'] = entry['etag']
+        if entry and entry['lastModified']:
+            requestHeaders['If-Modified-Since'] = entry['lastModified']
+        r = self._request('GET', path, headers=requestHeaders)
+        if r.status_code == 304 and entry:
+            return r.status_code, entry['body']
+        if r.status_code == 200 and ('ETag' in r.headers or 'Last-Modified' in r.headers):
+            self.diskCache.put(url, r.headers.get('ETag'), r.headers.get('Last-Modified'), r.text)
+        elif entry:
+            self.diskCache.delete(url)
+        return r.status_code, r.text
+
+    # drop cached reads made stale by a write; paths are invalidated exactly, prefixes with everything below them
+    def _invalidate(self, paths, prefixes=()):
+        if self.memoryCache is None:
+            return
+        for path in paths:
+            self.memoryCache.invalidate(path)
+        for prefix in prefixes:
+            self.memoryCache.invalidate_prefix(prefix)
+
+    # GET a JSON array and yield its elements as they are decoded from the response stream, without reading the
+    # whole body first; a list held in the in-process cache is used as is, but a streamed one is not cached
+    def _iter_list(self, path):
+        if self.memoryCache is not None:
+            cached = self.memoryCache.get(path)
+            if cached is not None:
+                for entry in copy.deepcopy(cached):
+                    yield entry
+                return
+        r = self._request('GET', path, stream=True)
+        try:
+            r.raise_for_status()
+            for entry in artifactoryJSON.iter_json_array(r.iter_content(chunk_size=STREAM_CHUNK_SIZE)):
+                yield entry
+        finally:
+            r.close()
+
+    # yield the entries of a list endpoint; with detailFunction, yield detailFunction(name) for each entry instead,
+    # fetched up to prefetch at a time on the connection pool and yielded in list order as they arrive
+    def _iter_entities(self, entries, nameField, detailFunction=None, prefetch=8):
+        if detailFunction is None:
+            for entry in entries:
+                yield entry
+            return
+        detailFunction = self._task(detailFunction)
+        pending = collections.deque()
+        executor = ThreadPoolExecutor(max_workers=max(1, prefetch))
+        try:
+            for entry in entries:
+                pending.append(executor.submit(detailFunction, entry[nameField]))
+                if len(pending) >= prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # a consumer which stops early leaves fetches in flight; drop those not yet started
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    # hits, misses and entries of the in-process cache; None if it is not enabled
+    def cache_statistics(self):
+        if self.memoryCache is None:
+            return None
+        return self.memoryCache.statistics()
+
     def artifactory_information(self):
-        r = requests.get(
-            self.ARTIFACTORY_MGMT_URI + "system",
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
-        return r.text
+        return self._get("system", text=True)
 
     def artifactory_health(self):
-        r = requests.get(
-            self.ARTIFACTORY_MGMT_URI + "system/ping",
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
+        r = self._request('GET', "system/ping")
         return r.text
 
     def artifactory_configuration(self):
-        r = requests.get(
-            self.ARTIFACTORY_MGMT_URI + "system/configuration",
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
-        return r.text
+        return self._get("system/configuration", text=True)
+
+    # configuration descriptor parsed straight from the response stream into an indexed ConfigurationDescriptor
+    def artifactory_configuration_descriptor(self):
+        r = self._request('GET', "system/configuration", stream=True)
+        try:
+            r.raise_for_status()
+            r.raw.decode_content = True  # undo any Content-Encoding while streaming
+            return artifactoryDescriptor.parse(r.raw)
+        finally:
+            r.close()
+
+    # replace the whole configuration descriptor; descriptor is XML text, bytes or a file object
+    def artifactory_configuration_update(self, descriptor):
+        requestHeaders = {'Content-Type': 'application/xml'}
+        r = self._request('POST', "system/configuration",
+                headers=requestHeaders,
+                data=descriptor)
+        self._invalidate(["system/configuration", "repositories"], ["repositories"])
+        return r.status_code
+
+    # change only the parts of the configuration named in patch, e.g.
+    #   {'localRepositories': {'libs-release-local': {'blackedOut': True}}}
+    # patch is a dict, or YAML text; a dict is sent as JSON, which is valid YAML
+    def artifactory_configuration_patch(self, patch):
+        requestHeaders = {'Content-Type': 'application/yaml'}
+        if isinstance(patch, dict):
+            patch = artifactoryJSON.encode(patch)
+        r = self._request('PATCH', "system/configuration",
+                headers=requestHeaders,
+                data=patch)
+        self._invalidate(["system/configuration", "repositories"], ["repositories"])
+        return r.status_code
 
     def license_information(self):
-        r = requests.get(
-            self.ARTIFACTORY_MGMT_URI + "system/license",
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
-        return r.json()
-        
+        return self._get("system/license")
+
     def license_install(self, licenseData):
         requestHeaders = {'Content-Type': 'application/json'}
-        r = requests.put(
-                self.ARTIFACTORY_MGMT_URI + "system/license",
+        r = self._request('PUT', "system/license",
                 headers=requestHeaders,
-                data=licenseData,
-                verify=False,  # do not check certificate
-                auth=(self.USER, self.PASSWORD))
-        return r.json()
-    
+                data=licenseData)
+        self._invalidate(["system/license"])
+        return artifactoryJSON.decode(r.content)
+
     def repositories_list(self, repoType):
         query = (("?type=" + repoType) if repoType else "")
-        print('repoType:'+str(repoType))
-        print('query:'+str(query))
-        r = requests.get(
-                self.ARTIFACTORY_MGMT_URI + "repositories" + query,
-                verify=False,  # do not check certificate
-                auth=(self.USER, self.PASSWORD))
-        return r.json()
-    
+        logging.debug('repoType:'+str(repoType))
+        logging.debug('query:'+str(query))
+        return self._get("repositories" + query)
+
     def repositories_detail(self, key):
-        r = requests.get(
-                self.ARTIFACTORY_MGMT_URI + "repositories/" + key,
-                verify=False,  # do not check certificate
-                auth=(self.USER, self.PASSWORD))
-        return r.json()
-    
+        return self._get("repositories/" + key, revalidate=True)
+
+    # repositories (of repoType, if given) one at a time, decoded as they are received; with detail, the
+    # configuration of each
+    # prefetch: number of detail requests in flight at once; keep it at most poolMaxSize
+    def iter_repositories(self, repoType='', detail=False, prefetch=8):
+        query = (("?type=" + repoType) if repoType else "")
+        return self._iter_entities(self._iter_list("repositories" + query), 'key', self.repositories_detail if detail else None, prefetch)
+
     def repositories_create(self, key, payload):
         requestHeaders = {'Content-Type': 'application/json'}
-        r = requests.put(
-                self.ARTIFACTORY_MGMT_URI + "repositories/" + key,
+        r = self._request('PUT', "repositories/" + key,
                 headers=requestHeaders,
-                data=json.dumps(payload),
-                verify=False,  # do not check certificate
-                auth=(self.USER, self.PASSWORD))
+                data=artifactoryJSON.encode(payload))
+        self._invalidate(["repositories", "repositories/" + key], ["repositories?"])
         return r.status_code
 
     def repositories_update(self, key, payload):
         requestHeaders = {'Content-Type': 'application/json'}
-        r = requests.post(
-                self.ARTIFACTORY_MGMT_URI + "repositories/" + key,
+        r = self._request('POST', "repositories/" + key,
                 headers=requestHeaders,
-                data=json.dumps(payload),
-                verify=False,  # do not check certificate
-                auth=(self.USER, self.PASSWORD))
+                data=artifactoryJSON.encode(payload))
+        self._invalidate(["repositories", "repositories/" + key], ["repositories?"])
         return r.status_code
 
     def repositories_delete(self, key):
-        r = requests.delete(
-            self.ARTIFACTORY_MGMT_URI + "repositories/" + key,
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
+        r = self._request('DELETE', "repositories/" + key)
+        self._invalidate(["repositories", "repositories/" + key], ["repositories?", "security/permissions"])
         return r.status_code
 
+    # apply changes to many repositories with a single configuration patch instead of one update per repository
+    # changes maps repository keys to the fields to change, e.g. {'libs-release-local': {'includesPattern': '**/*'}}
+    def repositories_patch(self, changes):
+        sectionNames = {}
+        for repository in self.repositories_list(''):
+            sectionNames[repository['key']] = repository['type'].lower() + 'Repositories'
+        patch = {}
+        for key in changes:
+            if key not in sectionNames:
+                raise KeyError('No repository with key ' + key)
+            patch.setdefault(sectionNames[key], {})[key] = changes[key]
+        return self.artifactory_configuration_patch(patch)
+
+    # issue an access token for username, authenticating with the password; returns the token response, with
+    # access_token, expires_in and, if refreshable, refresh_token
+    # scope: e.g. 'member-of-groups:readers'; the server's default if None
+    def security_token_create(self, username, expiresIn=artifactoryAuth.TOKEN_EXPIRES_IN, scope=None, refreshable=True):
+        return self._token_request(self._token_create_options(username, expiresIn, scope, refreshable))
+
+    # exchange a refresh token, and the access token it came with, for a new pair; the tokens authenticate the call
+    def security_token_refresh(self, accessToken, refreshToken):
+        return self._token_request(self._token_refresh_options(accessToken, refreshToken))
+
+    def _token_create_options(self, username, expiresIn, scope=None, refreshable=True):
+        if self.PASSWORD is None:
+            raise ValueError('A password is needed to obtain an access token for ' + username)
+        requestData = {'username': username, 'expires_in': str(expiresIn), 'refreshable': 'true' if refreshable else 'false'}
+        if scope:
+            requestData['scope'] = scope
+        return {'data': requestData, 'auth': (self.USER, self.PASSWORD)}
+
+    def _token_refresh_options(self, accessToken, refreshToken):
+        requestData = {'grant_type': 'refresh_token', 'access_token': accessToken, 'refresh_token': refreshToken}
+        return {'data': requestData, 'auth': artifactoryAuth.NoAuth()}
+
+    # POST a token request and return the decoded response
+    # direct: send it straight through the session instead of _send, outside concurrency limits, rate limits,
+    #   retries and the circuit breaker; TokenAuth's requests are made while the request needing the token holds
+    #   a concurrency slot, and waiting for another slot there could wait forever
+    def _token_request(self, requestOptions, direct=False):
+        if direct:
+            r = self.session.post(self.ARTIFACTORY_MGMT_URI + "security/token", **requestOptions)
+        else:
+            r = self._request('POST', "security/token", **requestOptions)
+        r.raise_for_status()
+        return artifactoryJSON.decode(r.content)
+
     def users_list(self):
-        r = requests.get(
-            self.ARTIFACTORY_MGMT_URI + "security/users",
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
-        return r.json()
+        return self._get("security/users")
 
     def users_detail(self, name):
-        r = requests.get(
-            self.ARTIFACTORY_MGMT_URI + "security/users/" + name,
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
-        return r.json()
+        return self._get("security/users/" + name, revalidate=True)
+
+    # Users one at a time, decoded as they are received; with detail, the details of each
+    def iter_users(self, detail=False, prefetch=8):
+        return self._iter_entities(self._iter_list("security/users"), 'name', self.users_detail if detail else None, prefetch)
 
     def users_create(self, name, payload):
         requestHeaders = {'Content-Type': 'application/json'}
         requestParameters = {'username': name}
-        r = requests.put(
-                self.ARTIFACTORY_MGMT_URI + "security/users/" + name,
+        r = self._request('PUT', "security/users/" + name,
                 headers=requestHeaders,
                 params=requestParameters,
-                data=json.dumps(payload),
-                verify=False,  # do not check certificate
-                auth=(self.USER, self.PASSWORD))
+                data=artifactoryJSON.encode(payload))
+        self._invalidate(["security/users", "security/users/" + name])
         return r.status_code
-    
+
     def users_update(self, name, payload):
         requestHeaders = {'Content-Type': 'application/json'}
         requestParameters = {'username': name}
-        r = requests.post(
-                self.ARTIFACTORY_MGMT_URI + "security/users/" + name,
+        r = self._request('POST', "security/users/" + name,
                 headers=requestHeaders,
                 params=requestParameters,
-                data=json.dumps(payload),
-                verify=False,  # do not check certificate
-                auth=(self.USER, self.PASSWORD))
+                data=artifactoryJSON.encode(payload))
+        self._invalidate(["security/users", "security/users/" + name])
         return r.status_code
-    
+
     def users_delete(self, name):
-        r = requests.delete(
-            self.ARTIFACTORY_MGMT_URI + "security/users/" + name,
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
+        r = self._request('DELETE', "security/users/" + name)
+        self._invalidate(["security/users", "security/users/" + name], ["security/permissions"])
         return r.status_code
 
     def groups_list(self):
-        r = requests.get(
-            self.ARTIFACTORY_MGMT_URI + "security/groups",
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
-        return r.json()
+        return self._get("security/groups")
 
     def groups_detail(self, name):
-        r = requests.get(
-            self.ARTIFACTORY_MGMT_URI + "security/groups/" + name,
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
-        return r.json()
+        return self._get("security/groups/" + name, revalidate=True)
+
+    # Groups one at a time, decoded as they are received; with detail, the details of each
+    def iter_groups(self, detail=False, prefetch=8):
+        return self._iter_entities(self._iter_list("security/groups"), 'name', self.groups_detail if detail else None, prefetch)
 
     def groups_create(self, name, payload):
         requestHeaders = {'Content-Type': 'application/json'}
         requestParameters = {'groupname': name}
-        r = requests.put(
-                self.ARTIFACTORY_MGMT_URI + "security/groups/" + name,
+        r = self._request('PUT', "security/groups/" + name,
                 headers=requestHeaders,
                 params=requestParameters,
-                data=json.dumps(payload),
-                verify=False,  # do not check certificate
-                auth=(self.USER, self.PASSWORD))
+                data=artifactoryJSON.encode(payload))
+        self._invalidate(["security/groups", "security/groups/" + name])
         return r.status_code
-    
+
     def groups_update(self, name, payload):
         requestHeaders = {'Content-Type': 'application/json'}
         requestParameters = {'groupname': name}
-        r = requests.post(
-                self.ARTIFACTORY_MGMT_URI + "security/groups/" + name,
+        r = self._request('POST', "security/groups/" + name,
                 headers=requestHeaders,
                 params=requestParameters,
-                data=json.dumps(payload),
-                verify=False,  # do not check certificate
-                auth=(self.USER, self.PASSWORD))
+                data=artifactoryJSON.encode(payload))
+        self._invalidate(["security/groups", "security/groups/" + name])
         return r.status_code
-    
+
     def groups_delete(self, name):
-        r = requests.delete(
-            self.ARTIFACTORY_MGMT_URI + "security/groups/" + name,
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
+        r = self._request('DELETE', "security/groups/" + name)
+        self._invalidate(["security/groups", "security/groups/" + name], ["security/users", "security/permissions"])
         return r.status_code
 
     def permissions_list(self):
-        r = requests.get(
-            self.ARTIFACTORY_MGMT_URI + "security/permissions",
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
-        return r.json()
+        return self._get("security/permissions")
 
     def permissions_detail(self, name):
-        r = requests.get(
-            self.ARTIFACTORY_MGMT_URI + "security/permissions/" + name,
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
-        return r.json()
+        return self._get("security/permissions/" + name, revalidate=True)
+
+    # permission targets one at a time, decoded as they are received; with detail, the details of each
+    def iter_permissions(self, detail=False, prefetch=8):
+        return self._iter_entities(self._iter_list("security/permissions"), 'name', self.permissions_detail if detail else None, prefetch)
 
     def permissions_create(self, name, payload):
         requestHeaders = {'Content-Type': 'application/json'}
         requestParameters = {'permissionname': name}
-        r = requests.put(
-                self.ARTIFACTORY_MGMT_URI + "security/permissions/" + name,
+        r = self._request('PUT', "security/permissions/" + name,
                 headers=requestHeaders,
                 params=requestParameters,
-                data=json.dumps(payload),
-                verify=False,  # do not check certificate
-                auth=(self.USER, self.PASSWORD))
+                data=artifactoryJSON.encode(payload))
+        self._invalidate(["security/permissions", "security/permissions/" + name])
         return r.status_code
-    
+
     def permissions_delete(self, name):
-        r = requests.delete(
-            self.ARTIFACTORY_MGMT_URI + "security/permissions/" + name,
-            verify=False,  # do not check certificate
-            auth=(self.USER, self.PASSWORD))
+        r = self._request('DELETE', "security/permissions/" + name)
+        self._invalidate(["security/permissions", "security/permissions/" + name])
         return r.status_code
 
+    # deploy the file fileName to path in repository repoKey; the server verifies the content against its checksums
+    # content the server already has (in any repository) is deployed by checksum alone, without sending the file;
+    # otherwise the file is streamed from disk
+    # checksums: file_checksums(fileName), if already known
+    # returns the deploy response, with deployedBy ('checksum' or 'upload') and bytesSent added
+    def artifact_deploy(self, repoKey, path, fileName, checksums=None):
+        if checksums is None:
+            checksums = file_checksums(fileName)
+        url = self.serverBase + "/" + repoKey + "/" + requests.utils.quote(path.lstrip('/'))
+        requestHeaders = {'X-Checksum-Sha1': checksums['sha1'],
+                          'X-Checksum-Sha256': checksums['sha256'],
+                          'X-Checksum': checksums['md5']}
+        r = self._send('PUT', url, headers=dict(requestHeaders, **{'X-Checksum-Deploy': 'true'}))
+        deployedBy, bytesSent = 'checksum', 0
+        # 404 is also returned for a missing repository; only upload when the server has no content with these checksums
+        if r.status_code == 404 and checksum_deploy_failed(r):
+            r.close()
+            with open(fileName, 'rb') as artifact_file:
+                # an empty file object would be sent chunked; send an empty body instead
+                r = self._send('PUT', url, headers=requestHeaders, data=artifact_file if checksums['size'] else b'')
+            deployedBy, bytesSent = 'upload', checksums['size']
+        r.raise_for_status()
+        result = artifactoryJSON.decode(r.content) if r.content else {}
+        result['deployedBy'] = deployedBy
+        result['bytesSent'] = bytesSent
+        return result
+
+    # deploy many files to repository repoKey, up to jobs at once, each as artifact_deploy does; files is an iterable
+    # of (path, fileName), read as the deploys proceed, so it can be a generator walking a large directory tree
+    # yields one record per file as it completes, in completion order:
+    #   {'path': ..., 'file': ..., 'ok': bool, 'deployedBy': 'checksum', 'upload' or None, 'bytesSent': int, 'error': repr or None}
+    # deploying the same files again sends no content, so an interrupted run can simply be repeated
+    # files with the same content are uploaded once: while one is uploading, the others wait for it and then
+    # deploy by checksum
+    def iter_artifacts_deploy(self, repoKey, files, jobs=8):
+        # sha1 -> event set when the deploy of the first file with that content has finished, while it is in flight
+        inFlight = {}
+        inFlightLock = threading.Lock()
+
+        def deploy_once(path, fileName):
+            checksums = file_checksums(fileName)
+            with inFlightLock:
+                first = inFlight.get(checksums['sha1'])
+                if first is None:
+                    done = inFlight[checksums['sha1']] = threading.Event()
+            if first is not None:
+                # the first deploy runs on another worker already, so waiting for it cannot deadlock the pool
+                first.wait()
+                return self.artifact_deploy(repoKey, path, fileName, checksums)
+            try:
+                return self.artifact_deploy(repoKey, path, fileName, checksums)
+            finally:
+                # later files with this content find it on the server, so only uploads in flight are remembered
+                with inFlightLock:
+                    del inFlight[checksums['sha1']]
+                done.set()
+
+        def deploy(path, fileName):
+            try:
+                result = deploy_once(path, fileName)
+                return {'path': path, 'file': fileName, 'ok': True, 'deployedBy': result['deployedBy'], 'bytesSent': result['bytesSent'], 'error': None}
+            except Exception as error:
+                return {'path': path, 'file': fileName, 'ok': False, 'deployedBy': None, 'bytesSent': 0, 'error': repr(error)}
 
+        executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+        pending = set()
+        try:
+            for path, fileName in files:
+                pending.add(executor.submit(self._task(deploy), path, fileName))
+                if len(pending) >= jobs:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            # a consumer which stops early leaves deploys in flight; drop those not yet started
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
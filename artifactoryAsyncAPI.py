@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# local imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import artifactoryAPI
+
+# ArtifactoryAPI methods which are not endpoint calls, or return generators, and are not mirrored as coroutines
+NOT_MIRRORED = ('close', 'add_task_wrapper', 'add_request_hook', 'remove_request_hook', 'cache_statistics',
+                'iter_users', 'iter_groups', 'iter_repositories', 'iter_permissions', 'iter_artifacts_deploy')
+
+class AsyncArtifactoryAPI:
+
+    # maxConcurrency: maximum number of requests in flight at once (worker threads); further calls wait their turn
+    # any other keyword arguments (poolConnections, poolMaxSize, keepAliveTimeout) configure the shared pool
+    def __init__(self, serverBase, username, password, maxConcurrency=10, **poolOptions):
+        # the pool must be able to hold one connection per concurrent request
+        poolOptions.setdefault('poolMaxSize', maxConcurrency)
+        self.api = artifactoryAPI.ArtifactoryAPI(serverBase, username, password, **poolOptions)
+        self.maxConcurrency = maxConcurrency
+        self.executor = ThreadPoolExecutor(max_workers=maxConcurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, excType, excValue, traceback):
+        await self.close()
+
+    # release the worker threads and all pooled connections
+    # waits for requests in flight off the event loop, so other tasks keep running meanwhile
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self.executor.shutdown, wait=True))
+        self.api.close()
+
+    # run one blocking ArtifactoryAPI call on the worker threads; calls beyond maxConcurrency queue for a thread
+    async def _call(self, name, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(getattr(self.api, name), *args, **kwargs)
+        return await loop.run_in_executor(self.executor, call)
+
+# build a coroutine method forwarding to the ArtifactoryAPI method of the same name
+def _mirror(name):
+    async def method(self, *args, **kwargs):
+        return await self._call(name, *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = getattr(artifactoryAPI.ArtifactoryAPI, name).__doc__
+    return method
+
+for _name in dir(artifactoryAPI.ArtifactoryAPI):
+    if _name.startswith('_') or _name in NOT_MIRRORED:
+        continue
+    if callable(getattr(artifactoryAPI.ArtifactoryAPI, _name)):
+        setattr(AsyncArtifactoryAPI, _name, _mirror(_name))
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+
+import os
+import json
+import time
+import hashlib
+import threading
+import requests
+import concurrent.futures
+
+# where tokens are cached between runs, unless a directory is given
+DEFAULT_TOKEN_DIRECTORY = os.path.join(os.path.expanduser('~'), '.artifactory', 'tokens')
+
+# seconds a token is requested for, and how long before it expires it is replaced
+TOKEN_EXPIRES_IN = 3600
+REFRESH_MARGIN = 300
+
+# environment variables an API key or access token is read from, keeping it off the command line
+API_KEY_ENVIRONMENT = 'ARTIFACTORY_API_KEY'
+ACCESS_TOKEN_ENVIRONMENT = 'ARTIFACTORY_ACCESS_TOKEN'
+
+# Artifactory checks the password hash of basic authentication on every request; an API key or an access token
+# is checked far more cheaply
+
+# authenticate with an API key
+class ApiKeyAuth(requests.auth.AuthBase):
+
+    def __init__(self, apiKey):
+        self.apiKey = apiKey
+
+    def __call__(self, request):
+        request.headers['X-JFrog-Art-Api'] = self.apiKey
+        return request
+
+# authenticate with a given access token
+class BearerAuth(requests.auth.AuthBase):
+
+    def __init__(self, accessToken):
+        self.accessToken = accessToken
+
+    def __call__(self, request):
+        request.headers['Authorization'] = 'Bearer ' + self.accessToken
+        return request
+
+# send no credentials; overrides the authentication of a session for one request
+class NoAuth(requests.auth.AuthBase):
+
+    def __call__(self, request):
+        return request
+
+# access tokens on disk, one file per server and user, readable by the owner only; entries are dicts with
+# accessToken, refreshToken (None if not refreshable) and expires (epoch seconds)
+class TokenCache:
+
+    def __init__(self, directory=DEFAULT_TOKEN_DIRECTORY):
+        self.directory = directory
+        self.lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+
+    # file name for a server and user
+    def _path(self, baseURL, username):
+        return os.path.join(self.directory, hashlib.sha1((baseURL + '\n' + username).encode('utf-8')).hexdigest() + '.json')
+
+    # cached entry for baseURL and username; None if there is none
+    def get(self, baseURL, username):
+        try:
+            with open(self._path(baseURL, username), 'r') as token_file:
+                entry = json.load(token_file)
+        except (IOError, OSError, ValueError):
+            return None
+        if entry.get('baseURL') != baseURL or entry.get('username') != username:
+            return None
+        return entry
+
+    # True if the cached token for baseURL and username can be used, or renewed, without the password
+    def usable(self, baseURL, username, refreshMargin=REFRESH_MARGIN):
+        entry = self.get(baseURL, username)
+        return entry is not None and (entry['expires'] - refreshMargin > time.time() or bool(entry.get('refreshToken')))
+
+    def put(self, baseURL, username, entry):
+        path = self._path(baseURL, username)
+        entry = dict(entry, baseURL=baseURL, username=username)
+        with self.lock:
+            # created with owner-only permissions, then renamed so readers never see a partial entry
+            temporaryPath = path + '.' + str(os.getpid()) + '.' + str(threading.current_thread().ident) + '.tmp'
+            descriptor = os.open(temporaryPath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, 'w') as token_file:
+                json.dump(entry, token_file)
+            os.replace(temporaryPath, path)
+
+    def delete(self, baseURL, username):
+        try:
+            os.remove(self._path(baseURL, username))
+        except OSError:
+            pass
+
+# the entry of a token response of api/security/token
+def token_entry(response):
+    return {'accessToken': response['access_token'],
+            'refreshToken': response.get('refresh_token'),
+            'expires': time.time() + int(response.get('expires_in') or TOKEN_EXPIRES_IN)}
+
+# position of a streamed request body, None if it can not be rewound (or is not streamed)
+def body_position(body):
+    if not hasattr(body, 'read') or not hasattr(body, 'seek'):
+        return None
+    try:
+        return body.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+# authenticate with an access token obtained for username: taken from the cache if a valid one is there, refreshed
+# when it is about to expire, and else issued by exchanging the password once
+#   issue(): token response for username, authenticating with the password
+#   refresh(entry): token response for a refreshed entry
+# the token is shared, through cache, by every client and run for the same server and user; a token the server
+# rejects (revoked, or expired early) is replaced and the request sent again
+class TokenAuth(requests.auth.AuthBase):
+
+    def __init__(self, baseURL, username, issue, refresh, cache=None, refreshMargin=REFRESH_MARGIN):
+        self.baseURL = baseURL
+        self.username = username
+        self.issue = issue
+        self.refresh = refresh
+        self.cache = cache
+        self.refreshMargin = refreshMargin
+        self.lock = threading.Lock()
+        self.entry = None
+        # future of the renewal in progress, None if there is none
+        self.renewal = None
+
+    # True if the entry is valid for at least refreshMargin more seconds
+    def _fresh(self, entry):
+        return entry is not None and entry['expires'] - self.refreshMargin > time.time()
+
+    # a valid access token; rejected: tokens the server has just refused, which must not be used again
+    # one thread renews the token at a time, without holding the lock over the request; the other threads
+    # needing a new token wait for its result (single flight)
+    def token(self, rejected=()):
+        with self.lock:
+            entry = self.entry
+            if (not self._fresh(entry) or entry['accessToken'] in rejected) and self.cache:
+                # another run may have replaced the token meanwhile
+                entry = self.cache.get(self.baseURL, self.username) or entry
+            if self._fresh(entry) and entry['accessToken'] not in rejected:
+                self.entry = entry
+                return entry['accessToken']
+            renewal = self.renewal
+            if renewal is None:
+                renewal = self.renewal = concurrent.futures.Future()
+                renewing = True
+            else:
+                renewing = False
+        if not renewing:
+            return renewal.result()['accessToken']
+
+        try:
+            entry = self._renew(entry)
+            if self.cache:
+                self.cache.put(self.baseURL, self.username, entry)
+        except BaseException as error:
+            with self.lock:
+                self.renewal = None
+            renewal.set_exception(error)
+            raise
+        with self.lock:
+            self.entry = entry
+            self.renewal = None
+        renewal.set_result(entry)
+        return entry['accessToken']
+
+    def _renew(self, entry):
+        if entry is not None and entry.get('refreshToken'):
+            try:
+                return token_entry(self.refresh(entry))
+            except requests.HTTPError:
+                # the refresh token has expired or been revoked; exchange the password instead
+                pass
+        return token_entry(self.issue())
+
+    def __call__(self, request):
+        request.headers['Authorization'] = 'Bearer ' + self.token()
+        # where a streamed body starts, which need not be the start of its file, to send it again from there
+        request.bodyPosition = body_position(request.body)
+        request.register_hook('response', self._handle_401)
+        return request
+
+    # on 401, send the request again with another token: first the cached one, if another run replaced it,
+    # then a renewed one
+    def _handle_401(self, response, **kwargs):
+        rejected = getattr(response.request, 'rejectedTokens', []) + [response.request.headers['Authorization'][len('Bearer '):]]
+        if response.status_code != 401 or len(rejected) > 2:
+            return response
+        # a streamed body can only be sent again if it can be rewound
+        body = response.request.body
+        bodyPosition = getattr(response.request, 'bodyPosition', None)
+        if hasattr(body, 'read'):
+            if bodyPosition is None:
+                return response
+            body.seek(bodyPosition)
+        response.content
+        response.close()
+        request = response.request.copy()
+        request.rejectedTokens = rejected
+        request.bodyPosition = bodyPosition
+        request.headers['Authorization'] = 'Bearer ' + self.token(rejected)
+        retried = response.connection.send(request, **kwargs)
+        retried.history.append(response)
+        retried.request = request
+        return self._handle_401(retried, **kwargs)
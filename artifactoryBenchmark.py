@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+
+###
+### external import
+###
+
+import os
+import sys
+import time
+import json
+import argparse
+import textwrap
+import requests
+import subprocess
+import concurrent.futures
+
+###
+### internal import
+###
+
+import artifactoryAPI
+import artifactoryStub
+import artifactoryMetrics
+
+###
+### benchmarks
+###
+
+# baseline: one module-level requests call (new connection) per API call
+def run_unpooled(baseURL, count):
+    for i in range(count):
+        requests.get(baseURL + '/api/security/users', verify=False, auth=('admin', 'password')).json()
+
+# pooled: all calls share the ArtifactoryAPI session
+def run_pooled(baseURL, count):
+    with artifactoryAPI.ArtifactoryAPI(baseURL, 'admin', 'password') as api:
+        for i in range(count):
+            api.users_list()
+
+def measure(name, function, baseURL, count):
+    start = time.time()
+    function(baseURL, count)
+    elapsed = time.time() - start
+    print(name + ': ' + str(count) + ' requests in ' + '%.2f' % elapsed + 's, ' + '%.1f' % (count / elapsed) + ' requests/sec')
+    return count / elapsed
+
+# pooled against unpooled requests to a stub accepting connections slowly
+def benchmark_pooling(arguments):
+    stub = artifactoryStub.ArtifactoryStub(handshakeDelay=arguments.handshakeDelay)
+    baseURL = stub.start()
+
+    before = measure('unpooled', run_unpooled, baseURL, arguments.requests)
+    after = measure('pooled  ', run_pooled, baseURL, arguments.requests)
+    print('speedup: ' + '%.1f' % (after / before) + 'x')
+
+    stub.stop()
+
+###
+### setup workloads
+###
+
+# share of the entities of a workload per entity type
+WORKLOAD_MIX = (('users', 0.4), ('groups', 0.2), ('repositories', 0.3), ('permissions', 0.1))
+
+# name prefix of the generated entities per entity type
+WORKLOAD_NAMES = {'users': 'user', 'groups': 'group', 'repositories': 'repo', 'permissions': 'permission'}
+
+# entities of a setup-style workload of about count entities: {entityType: [(name, payload), ...]}
+def workload_entities(count):
+    entities = {}
+    for entityType, share in WORKLOAD_MIX:
+        entities[entityType] = []
+        for i in range(max(1, int(count * share))):
+            name = WORKLOAD_NAMES[entityType] + '-' + str(i)
+            if entityType == 'users':
+                payload = {'email': name + '@example.com', 'password': 'secret', 'groups': ['group-' + str(i % 10)]}
+            elif entityType == 'groups':
+                payload = {'description': 'benchmark group ' + str(i), 'autoJoin': False}
+            elif entityType == 'repositories':
+                payload = {'rclass': 'local', 'packageType': 'generic', 'description': 'benchmark repository ' + str(i)}
+            else:
+                payload = {'repositories': ['repo-' + str(i)],
+                           'principals': {'groups': {'group-' + str(i % 10): ['r', 'w']}}}
+            entities[entityType].append((name, payload))
+    return entities
+
+# the operations of a setup run over entities, in the order artifactorySetup.py runs its sections:
+# create everything, read it back, update it, then delete it again
+def workload_operations(api, entities):
+    phases = []
+    for action in ('create', 'detail', 'update', 'delete'):
+        operations = []
+        for entityType, share in WORKLOAD_MIX:
+            # permission targets have no update call; creating one again replaces it
+            if action == 'update' and entityType == 'permissions':
+                function = api.permissions_create
+            else:
+                function = getattr(api, entityType + '_' + action)
+            for name, payload in entities[entityType]:
+                operations.append((function, (name,) if action in ('detail', 'delete') else (name, payload)))
+        phases.append((action, operations))
+    return phases
+
+# q-quantile (0..1) of sorted values, nearest rank
+def quantile(sortedValues, q):
+    if not sortedValues:
+        return 0.0
+    return sortedValues[min(len(sortedValues) - 1, int(q * len(sortedValues)))]
+
+def timed_call(operation):
+    function, args = operation
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+# run one workload of count entities against a fresh stub; returns a result row
+def run_workload(arguments, count):
+    stub = artifactoryStub.ArtifactoryStub(latency=arguments.latency, latencyJitter=arguments.latencyJitter,
+                                           errorRate=arguments.errorRate)
+    baseURL = stub.start()
+    collector = artifactoryMetrics.MetricsCollector()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=arguments.jobs) if arguments.jobs > 1 else None
+
+    durations = []
+    with artifactoryAPI.ArtifactoryAPI(baseURL, 'admin', 'password', poolMaxSize=max(10, arguments.jobs),
+                                       retries=arguments.retries, backoffFactor=0.01) as api:
+        api.add_request_hook(collector)
+        start = time.time()
+        for action, operations in workload_operations(api, workload_entities(count)):
+            if executor is not None:
+                durations.extend(executor.map(timed_call, operations))
+            else:
+                durations.extend(timed_call(operation) for operation in operations)
+        elapsed = time.time() - start
+
+    if executor is not None:
+        executor.shutdown()
+    stub.stop()
+
+    durations.sort()
+    return {'entities': count,
+            'operations': len(durations),
+            'requests': stub.requests,
+            'injectedErrors': stub.errors,
+            'seconds': round(elapsed, 3),
+            'operationsPerSecond': round(len(durations) / elapsed, 1),
+            'p50Seconds': round(quantile(durations, 0.5), 6),
+            'p99Seconds': round(quantile(durations, 0.99), 6),
+            'endpoints': collector.summary() if arguments.endpoints else None}
+
+# setup-style workloads of increasing size against the stub; reports throughput and latency quantiles
+def benchmark_setup(arguments):
+    results = [run_workload(arguments, count) for count in arguments.entities]
+    if arguments.json:
+        print(json.dumps({'workloads': results}, indent=2))
+        return
+    print('%10s %10s %10s %8s %9s %10s %10s %10s' % ('entities', 'operations', 'requests', 'errors', 'seconds', 'ops/sec', 'p50 ms', 'p99 ms'))
+    for result in results:
+        print('%10d %10d %10d %8d %9.2f %10.1f %10.2f %10.2f' % (result['entities'], result['operations'], result['requests'],
+                                                                result['injectedErrors'], result['seconds'], result['operationsPerSecond'],
+                                                                result['p50Seconds'] * 1000, result['p99Seconds'] * 1000))
+        for endpoint in result['endpoints'] or []:
+            print('    %-7s %-28s %8d %10.2f %10.2f' % (endpoint['method'], endpoint['endpoint'], endpoint['count'],
+                                                       endpoint['p50Seconds'] * 1000, endpoint['p99Seconds'] * 1000))
+
+###
+### CLI startup
+###
+
+# artifactoryCLI.py next to this file
+CLI_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifactoryCLI.py')
+
+# wall-clock seconds of count runs of a command, sorted
+def time_command(command, count):
+    durations = []
+    for i in range(count):
+        start = time.time()
+        subprocess.check_call(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        durations.append(time.time() - start)
+    return sorted(durations)
+
+# start-up time of artifactoryCLI.py, as it is called from shell loops; fails (exit 1) if the median
+# of a command against the stub exceeds --budget milliseconds
+def benchmark_startup(arguments):
+    stub = artifactoryStub.ArtifactoryStub()
+    baseURL = stub.start()
+    cli = [sys.executable, CLI_SCRIPT, '-s', baseURL, '-p', 'password']
+    commands = (('interpreter', [sys.executable, '-c', 'pass']),
+                ('help', cli + ['users', 'list', '--help']),
+                ('request', cli + ['users', 'list']))
+
+    medians = {}
+    print('%-12s %10s %10s %10s' % ('command', 'min ms', 'p50 ms', 'max ms'))
+    for name, command in commands:
+        durations = time_command(command, arguments.runs)
+        medians[name] = quantile(durations, 0.5)
+        print('%-12s %10.1f %10.1f %10.1f' % (name, durations[0] * 1000, medians[name] * 1000, durations[-1] * 1000))
+    stub.stop()
+
+    if medians['request'] * 1000 > arguments.budget:
+        print('over budget: ' + '%.1f' % (medians['request'] * 1000) + 'ms > ' + str(arguments.budget) + 'ms')
+        sys.exit(1)
+
+##################################
+# main program
+##################################
+
+if __name__ == "__main__":
+
+    main_parser = argparse.ArgumentParser(
+                      description='Benchmark the Artifactory API client against a local stub server.',
+                      formatter_class=argparse.RawDescriptionHelpFormatter,
+                      epilog=textwrap.dedent('''\
+                        Examples:
+                          %(prog)s pooling
+                          %(prog)s pooling --requests 2000 --handshakeDelay 0.005
+                          %(prog)s setup
+                          %(prog)s setup --entities 100 1000 --jobs 8 --latency 0.002 --errorRate 0.01
+                          %(prog)s startup --budget 300
+                      '''))
+
+    benchmark_parsers = main_parser.add_subparsers(title='benchmark', dest='benchmark')
+    benchmark_parsers.required = True
+
+    pooling_parser = benchmark_parsers.add_parser('pooling', help='pooled against unpooled connections')
+    pooling_parser.add_argument('-n', '--requests', required=False, type=int, default=500, help='number of requests per run')
+    pooling_parser.add_argument('--handshakeDelay', required=False, type=float, default=0.002, help='seconds the stub server spends accepting each new connection')
+
+    setup_parser = benchmark_parsers.add_parser('setup', help='setup-style create/detail/update/delete workloads')
+    setup_parser.add_argument('-e', '--entities', required=False, type=int, nargs='+', default=[100, 1000, 10000], help='entity counts of the workloads to run')
+    setup_parser.add_argument('-j', '--jobs', required=False, type=int, default=1, help='number of operations run concurrently')
+    setup_parser.add_argument('--latency', required=False, type=float, default=0.0, help='seconds the stub server adds to every response')
+    setup_parser.add_argument('--latencyJitter', required=False, type=float, default=0.0, help='up to this many seconds of random latency added on top')
+    setup_parser.add_argument('--errorRate', required=False, type=float, default=0.0, help='fraction of requests the stub server fails with 503')
+    setup_parser.add_argument('--retries', required=False, type=int, default=3, help='retries of failed idempotent requests')
+    setup_parser.add_argument('--endpoints', required=False, action='store_true', help='also report latency quantiles per endpoint')
+    setup_parser.add_argument('--json', required=False, action='store_true', help='print results as JSON')
+
+    startup_parser = benchmark_parsers.add_parser('startup', help='start-up time of artifactoryCLI.py')
+    startup_parser.add_argument('-n', '--runs', required=False, type=int, default=10, help='number of runs per command')
+    startup_parser.add_argument('--budget', required=False, type=float, default=400, help='milliseconds the median CLI request may take')
+
+    pooling_parser.set_defaults(function=benchmark_pooling)
+    setup_parser.set_defaults(function=benchmark_setup)
+    startup_parser.set_defaults(function=benchmark_startup)
+
+    arguments = main_parser.parse_args()
+
+    arguments.function(arguments)
+
+### EOF
@@ -6,125 +6,304 @@
 
 import os
 import sys
+import errno
 import json
 import re
 import getpass
 import textwrap
 import argparse
-import urlparse
+import glob
+import shlex
+import threading
 from pprint import pprint
+try:
+    import urlparse
+except ImportError:
+    import urllib.parse as urlparse
 
 ###
 ### internal import
 ###
 
+# artifactoryAPI (and with it requests) and artifactoryDescriptor are imported in the main program once the
+# command line has been parsed, so --help and usage errors do not pay for them
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-import artifactoryAPI
+import artifactoryOutput
 
 ###
 ### local functions for API calls
 ###
 ### to allow any needed parameter/value manipulation
 
-def artifactory_health():
-    return artifactoryAPI.artifactory_health()
+def artifactory_health(api):
+    return api.artifactory_health()
         
-def artifactory_information():
-    return artifactoryAPI.artifactory_information()
+def artifactory_information(api):
+    return api.artifactory_information()
         
-def artifactory_configuration():
-    return artifactoryAPI.artifactory_configuration()
+def artifactory_configuration(api):
+    if not options.section:
+        return api.artifactory_configuration()
+    descriptor = api.artifactory_configuration_descriptor()
+    if options.key:
+        element = descriptor.entry(options.section, options.key)
+    else:
+        element = descriptor.section(options.section)
+    if element is None:
+        return None
+    return artifactoryDescriptor.element_to_dict(element)
+        
+def artifactory_configurationDiff(api):
+    changes = artifactoryDescriptor.diff(options.descriptorFile, api.artifactory_configuration())
+    return artifactoryDescriptor.format_changes(changes)
+        
+def artifactory_configurationUpdate(api):
+    with open(options.descriptorFile, 'rb') as descriptor_file:
+        return api.artifactory_configuration_update(descriptor_file)
+        
+def artifactory_configurationPatch(api):
+    with open(options.patchFile, 'r') as patch_file:
+        data = patch_file.read()
+    return api.artifactory_configuration_patch(data)
         
-def license_information():
-    return artifactoryAPI.license_information()
+def license_information(api):
+    return api.license_information()
         
-def license_install():
+def license_install(api):
     with open(options.keyFile, 'r') as data_file:
         data = data_file.read()
-    return artifactoryAPI.license_install(data)
+    return api.license_install(data)
         
-def users_list():
-    return artifactoryAPI.users_list()
+def users_list(api):
+    if options.output != 'pprint':
+        return api.iter_users()
+    return api.users_list()
         
-def users_detail():
-    return artifactoryAPI.users_detail(options.name)
+def users_detail(api):
+    if options.all:
+        return api.iter_users(detail=True, prefetch=options.jobs)
+    return api.users_detail(options.name)
         
-def users_create():
-    name = os.path.splitext(options.userFile)[0]
-    with open(options.userFile, 'r') as data_file:
-        data = data_file.read()    
-    return artifactoryAPI.users_create(name,data)
+def users_create(api):
+    if options.dir:
+        return bulk_submit(api.users_create)
+    name, data = read_entity_file(options.userFile)
+    return api.users_create(name,data)
         
-def users_update():
-    name = os.path.splitext(options.userFile)[0]
-    with open(options.userFile, 'r') as data_file:
-        data = data_file.read()
-    return artifactoryAPI.users_update(name,data)
+def users_update(api):
+    if options.dir:
+        return bulk_submit(api.users_update)
+    name, data = read_entity_file(options.userFile)
+    return api.users_update(name,data)
         
-def users_delete():
-    return artifactoryAPI.users_delete(options.name)
+def users_delete(api):
+    return api.users_delete(options.name)
 
-def groups_list():
-    return artifactoryAPI.groups_list()
+def groups_list(api):
+    if options.output != 'pprint':
+        return api.iter_groups()
+    return api.groups_list()
         
-def groups_detail():
-    return artifactoryAPI.groups_detail(options.name)
+def groups_detail(api):
+    if options.all:
+        return api.iter_groups(detail=True, prefetch=options.jobs)
+    return api.groups_detail(options.name)
         
-def groups_create():
-    name = os.path.splitext(options.groupFile)[0]
-    with open(options.groupFile, 'r') as data_file:
-        data = data_file.read()
-    return artifactoryAPI.groups_create(name,data)
+def groups_create(api):
+    if options.dir:
+        return bulk_submit(api.groups_create)
+    name, data = read_entity_file(options.groupFile)
+    return api.groups_create(name,data)
         
-def groups_update():
-    name = os.path.splitext(options.groupFile)[0]
-    with open(options.groupFile, 'r') as data_file:
-        data = data_file.read()
-    return artifactoryAPI.groups_update(name,data)
+def groups_update(api):
+    if options.dir:
+        return bulk_submit(api.groups_update)
+    name, data = read_entity_file(options.groupFile)
+    return api.groups_update(name,data)
         
-def groups_delete():
-    return artifactoryAPI.groups_delete(options.name)
+def groups_delete(api):
+    return api.groups_delete(options.name)
 
-def repositories_list():
-    return artifactoryAPI.repositories_list(options.type)
+def repositories_list(api):
+    if options.output != 'pprint':
+        return api.iter_repositories(options.type)
+    return api.repositories_list(options.type)
+        
+def repositories_detail(api):
+    if options.all:
+        return api.iter_repositories(detail=True, prefetch=options.jobs)
+    return api.repositories_detail(options.key)
+
+def repositories_create(api):
+    if options.dir:
+        return bulk_submit(api.repositories_create)
+    name, data = read_entity_file(options.repositoryFile)
+    return api.repositories_create(name,data)
+
+def repositories_update(api):
+    if options.dir:
+        return bulk_submit(api.repositories_update)
+    name, data = read_entity_file(options.repositoryFile)
+    return api.repositories_update(name,data)
+
+def repositories_delete(api):
+    return api.repositories_delete(options.key)
+
+def permissions_list(api):
+    if options.output != 'pprint':
+        return api.iter_permissions()
+    return api.permissions_list()
         
-def repositories_detail():
-    return artifactoryAPI.repositories_detail(options.key)
+def permissions_detail(api):
+    if options.all:
+        return api.iter_permissions(detail=True, prefetch=options.jobs)
+    return api.permissions_detail(options.name)
+        
+def permissions_create(api):
+    name, data = read_entity_file(options.permissionFile)
+    return api.permissions_create(name,data)
+        
+def permissions_delete(api):
+    return api.permissions_delete(options.name)
 
-def repositories_create():
-    name = os.path.splitext(options.repositoryFile)[0]
-    with open(options.repositoryFile, 'r') as data_file:
-        data = data_file.read()
-    return artifactoryAPI.repositories_create(name,data)
+def artifacts_deploy(api):
+    if options.dir:
+        return deploy_files(api)
+    path = options.targetPath + '/' + (options.path or os.path.basename(options.file))
+    return api.artifact_deploy(options.repository, path.lstrip('/'), options.file)
 
-def repositories_update():
-    name = os.path.splitext(options.repositoryFile)[0]
-    with open(options.repositoryFile, 'r') as data_file:
+###
+### entity files
+###
+
+# name and contents (bytes, sent as they are) of an entity JSON file; the base name of the file without extension is the name
+def read_entity_file(fileName):
+    with open(fileName, 'rb') as data_file:
         data = data_file.read()
-    return artifactoryAPI.repositories_update(name,data)
+    return os.path.splitext(os.path.basename(fileName))[0], data
+
+# files matching --glob in --dir, in name order
+def entity_files():
+    return sorted(glob.glob(os.path.join(options.dir, options.glob)))
+
+# submit every entity file of --dir through one client, up to --jobs at once; returns a summary after printing
+# a line per file, or, with --output, the per-file results as they complete
+def bulk_submit(function):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def submit(fileName):
+        try:
+            name, data = read_entity_file(fileName)
+            status = function(name, data)
+            return {'file': fileName, 'name': name, 'status': status, 'ok': status < 400}
+        except Exception as error:
+            return {'file': fileName, 'name': None, 'status': repr(error), 'ok': False}
+
+    def submit_all():
+        with ThreadPoolExecutor(max_workers=max(1, options.jobs)) as executor:
+            for result in executor.map(submit, entity_files()):
+                yield result
+
+    if options.output != 'pprint':
+        return submit_all()
+    results = []
+    for result in submit_all():
+        print(('ok     ' if result['ok'] else 'FAILED ') + result['file'] + ': ' + str(result['status']))
+        results.append(result)
+    succeeded = len([result for result in results if result['ok']])
+    return {'files': len(results), 'succeeded': succeeded, 'failed': len(results) - succeeded}
 
-def repositories_delete():
-    return artifactoryAPI.repositories_delete(options.key)
+###
+### artifact files
+###
 
-def permissions_list():
-    return artifactoryAPI.permissions_list()
-        
-def permissions_detail():
-    return artifactoryAPI.permissions_detail(options.name)
-        
-def permissions_create():
-    name = os.path.splitext(options.permissionFile)[0]
-    with open(options.permissionFile, 'r') as data_file:
-        data = data_file.read()
-    return artifactoryAPI.permissions_create(name,data)
-        
-def permissions_delete():
-    return artifactoryAPI.permissions_delete(options.name)
+# (path, fileName) of the files of --dir matching --glob, path relative to --dir under --targetPath
+def artifact_files():
+    for fileName in glob.iglob(os.path.join(options.dir, options.glob), recursive=True):
+        if os.path.isfile(fileName):
+            path = os.path.relpath(fileName, options.dir).replace(os.sep, '/')
+            yield (options.targetPath + '/' + path).lstrip('/'), fileName
+
+# deploy the files of --dir, up to --jobs at once; returns a summary after printing a line per file, or, with
+# --output, the per-file results as they complete
+def deploy_files(api):
+    results = api.iter_artifacts_deploy(options.repository, artifact_files(), options.jobs)
+    if options.output != 'pprint':
+        return results
+    summary = {'files': 0, 'succeeded': 0, 'failed': 0, 'deployedByChecksum': 0, 'uploaded': 0, 'bytesSent': 0}
+    for result in results:
+        print(('ok     ' + result['file'] + ' -> ' + result['path'] + ' (' + result['deployedBy'] + ')') if result['ok'] else
+              ('FAILED ' + result['file'] + ': ' + result['error']))
+        summary['files'] += 1
+        summary['succeeded' if result['ok'] else 'failed'] += 1
+        if result['ok']:
+            summary['deployedByChecksum' if result['deployedBy'] == 'checksum' else 'uploaded'] += 1
+        summary['bytesSent'] += result['bytesSent']
+    return summary
 
 ###
 ### parameter parsing/promptrint commands
 ###
 
+# build baseURL from passed baseURL, hostname, or hostname/PublicContextPath
+def get_baseURL(serverPassed):
+    serverParsed = urlparse.urlsplit(serverPassed)
+    serverHostname = serverParsed.hostname # will not contain a value unless a URL was passed
+    if not serverHostname: # passed value was not a URL, build one
+        serverHostname = serverPassed
+        serverPublicContextPath = 'artifactory' # should be updated to skip this if "/" already present, indicating empty PublicContextPath
+        baseURL = 'http://' + serverHostname + '/' + serverPublicContextPath # should be updated to skip this if "/" already present, indicating empty PublicContextPath
+    else: # passed value was a URL, just extract PublicContextPath (for possible future use)
+        serverPublicContextPath = serverParsed.path[1:]
+        baseURL = serverPassed
+    return baseURL
+
+# ArtifactoryAPI authentication arguments from the --apiKey, --accessToken and --token options
+def auth_options():
+    if options.apiKey:
+        return {'apiKey': options.apiKey}
+    if options.accessToken:
+        return {'accessToken': options.accessToken}
+    if options.token:
+        return {'useToken': True, 'tokenDirectory': options.tokenDirectory or artifactoryAuth.DEFAULT_TOKEN_DIRECTORY}
+    return {}
+
+# ArtifactoryAPI disk cache arguments from the --cacheDirectory and --cacheMaxBytes options
+def cache_options():
+    cacheOptions = {}
+    if options.cacheDirectory:
+        cacheOptions['cacheDirectory'] = options.cacheDirectory
+        if options.cacheMaxBytes:
+            cacheOptions['cacheMaxBytes'] = options.cacheMaxBytes
+    return cacheOptions
+
+# True if the password is needed for baseURL: no API key or access token was given, and with --token, no
+# usable token is cached
+def needs_password(baseURL, username):
+    if options.apiKey or options.accessToken:
+        return False
+    if options.token:
+        return not artifactoryAuth.TokenCache(options.tokenDirectory or artifactoryAuth.DEFAULT_TOKEN_DIRECTORY).usable(baseURL, username)
+    return True
+
+# print a result in the --output format; list results are written one record at a time
+def print_result(result):
+    try:
+        if options.output == 'pprint' and artifactoryOutput.is_record_stream(result) and not isinstance(result, list):
+            # a generator of records, e.g. detail --all: print each as it arrives
+            for record in result:
+                pprint(record)
+        elif options.output == 'pprint':
+            pprint(result)
+        else:
+            artifactoryOutput.write_result(sys.stdout, result, options.output)
+    except IOError as error:
+        if error.errno != errno.EPIPE:
+            raise
+        # the reader of the output went away (e.g. head); stop at once, without a traceback
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        os._exit(1)
+
 # prompt user for input, using proper function for Python major version
 def user_input(prompt):
     if sys.version_info[0] > 2: 
@@ -132,42 +311,17 @@ def user_input(prompt):
     else:
         return raw_input(prompt)
     
-##################################
-# main program
-##################################
-
-if __name__ == "__main__":
-
-    ###
-    ### setup argument parser
-    ###
+###
+### parser for the "artifactory" object
+###
 
-    main_parser = argparse.ArgumentParser(
-                      description='Command-line interface to the Artifactory REST API.',
-                      formatter_class=argparse.RawDescriptionHelpFormatter,
-                      epilog=textwrap.dedent('''\
-                        Examples:
-                          %(prog)s -s -u admin -p password artifactoryHostname repos list 
-                          %(prog)s -user admin --server artifactory.company.com:5000/artifactory repos list
-                          
-                        See '%(prog)s <object> --help' to read about a specific subcommand.
-                      '''))  
-    
-    main_parser.add_argument('-s', '--server', required=True, help='target server or base Artifactory URL')
-                                                                                                                  
-    main_parser.add_argument('-u', '--username', required=False, default='admin', help='username for Artifactory authentication')
-                                                                                                                  
-    main_parser.add_argument('-p', '--password', required=False, help='password for Artifactory authentication')
-                                                                                                                  
-    object_subparsers = main_parser.add_subparsers(title="object", dest="object")                                                                                                              
-       
-    ###
-    ### parser for the "artifactory" object
-    ###
+def add_artifactory_parser(object_subparsers):
     object_parser_artifactory = object_subparsers.add_parser(
                                 "artifactory",
-                                help="manuipulate an Artifactory Instance: {health,information,configuration}")
+                                help="manuipulate an Artifactory Instance: {health,information,configuration,configurationDiff,configurationUpdate,configurationPatch}")
+    return object_parser_artifactory
 
+def add_artifactory_actions(object_parser_artifactory):
     object_action_subparser_artifactory = object_parser_artifactory.add_subparsers(title="action", dest="action")                                                                                                               
 
     parser_artifactory_info = object_action_subparser_artifactory.add_parser(
@@ -190,24 +344,69 @@ if __name__ == "__main__":
                               %(prog)s   
                           '''))  
     
-    parser_artifactory_install = object_action_subparser_artifactory.add_parser(
+    parser_artifactory_configuration = object_action_subparser_artifactory.add_parser(
                           "configuration",
                           help="get Configuration",
-                          description="Retrieve Configuration of the Artifactory Installation.",
+                          description="Retrieve Configuration of the Artifactory Installation, or a single section of it.",
                           formatter_class=argparse.RawDescriptionHelpFormatter,
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s   
+                              %(prog)s --section backups
+                              %(prog)s --section localRepositories --key libs-release-local
                           '''))  
+
+    parser_artifactory_configuration.add_argument('--section', required=False, help='top-level section of the Configuration to return, e.g. security, backups, localRepositories.')
+
+    parser_artifactory_configuration.add_argument('--key', required=False, help='key of the entry of the section to return.')
     
-    ###
-    ### parser for the "license" object
-    ###
-    
+    parser_artifactory_configurationDiff = object_action_subparser_artifactory.add_parser(
+                          "configurationDiff",
+                          help="compare Configuration with a descriptor file",
+                          description="List the differences between a configuration descriptor file and the Configuration of the Artifactory Installation.",
+                          formatter_class=argparse.RawDescriptionHelpFormatter,
+                          epilog=textwrap.dedent('''\
+                            Examples:
+                              %(prog)s --descriptorFile artConfigOutput.xml
+                          '''))  
+
+    parser_artifactory_configurationDiff.add_argument('--descriptorFile', required=True, help='configuration descriptor file to compare from.')
+
+    parser_artifactory_configurationUpdate = object_action_subparser_artifactory.add_parser(
+                          "configurationUpdate",
+                          help="replace Configuration",
+                          description="Replace the whole Configuration of the Artifactory Installation with a configuration descriptor file.",
+                          formatter_class=argparse.RawDescriptionHelpFormatter,
+                          epilog=textwrap.dedent('''\
+                            Examples:
+                              %(prog)s --descriptorFile artConfigOutput.xml
+                          '''))  
+
+    parser_artifactory_configurationUpdate.add_argument('--descriptorFile', required=True, help='configuration descriptor file to install.')
+
+    parser_artifactory_configurationPatch = object_action_subparser_artifactory.add_parser(
+                          "configurationPatch",
+                          help="change parts of Configuration",
+                          description="Change only the sections of the Configuration of the Artifactory Installation given in a YAML or JSON patch file.",
+                          formatter_class=argparse.RawDescriptionHelpFormatter,
+                          epilog=textwrap.dedent('''\
+                            Examples:
+                              %(prog)s --patchFile blackout.yaml
+                          '''))  
+
+    parser_artifactory_configurationPatch.add_argument('--patchFile', required=True, help='YAML or JSON file with the configuration changes.')
+
+###
+### parser for the "license" object
+###
+
+def add_license_parser(object_subparsers):
     object_parser_license = object_subparsers.add_parser(
                                 "license",
                                 help="manuipulate a License: {information,install}")
+    return object_parser_license
 
+def add_license_actions(object_parser_license):
     object_action_subparser_license = object_parser_license.add_subparsers(title="action", dest="action")                                                                                                               
 
     parser_license_info = object_action_subparser_license.add_parser(
@@ -231,16 +430,19 @@ if __name__ == "__main__":
                           '''))  
 
     parser_license_install.add_argument('--keyFile', required=True, help='File containing the License Key to install.')
-    
-    ###
-    ### parser for the "users" object
-    ###
-    
+
+###
+### parser for the "users" object
+###
+
+def add_users_parser(object_subparsers):
     object_parser_users = object_subparsers.add_parser(
                              "users",
                              help="manuipulate Users: {list,detail,create,update,delete}",
                              epilog="See '%(prog)s <user_action> --help' to read about a specific User action.")
-                                                                                            
+    return object_parser_users
+
+def add_users_actions(object_parser_users):
     object_action_subparser_users = object_parser_users.add_subparsers(title="action", dest="action")                                                                                                               
     
     parser_users_list = object_action_subparser_users.add_parser(
@@ -261,9 +463,14 @@ if __name__ == "__main__":
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s administrator  
+                              %(prog)s --all
                           '''))  
 
-    parser_users_detail.add_argument('--name', required=True, help='Username to return the details of.')
+    parser_users_detail_source = parser_users_detail.add_mutually_exclusive_group(required=True)
+
+    parser_users_detail_source.add_argument('--name', help='Username to return the details of.')
+
+    parser_users_detail_source.add_argument('--all', action='store_true', default=False, help='return the details of all Users, fetching up to --jobs at once.')
 
     parser_users_create = object_action_subparser_users.add_parser(
                           "create",
@@ -273,9 +480,16 @@ if __name__ == "__main__":
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s testuser.json  
+                              %(prog)s --dir users/ --glob 'team-*.json'
                           '''))  
 
-    parser_users_create.add_argument('--userFile', required=True, help='JSON file with details of user to create. Base name of file without extension is used as Username.')
+    parser_users_create_source = parser_users_create.add_mutually_exclusive_group(required=True)
+
+    parser_users_create_source.add_argument('--userFile', help='JSON file with details of user to create. Base name of file without extension is used as Username.')
+
+    parser_users_create_source.add_argument('--dir', help='directory of JSON files, one per user, to create in one run. Base name of each file without extension is used as Username.')
+
+    parser_users_create.add_argument('--glob', required=False, default='*.json', help='pattern selecting the files of --dir (default: *.json).')
 
     parser_users_update = object_action_subparser_users.add_parser(
                           "update",
@@ -285,9 +499,16 @@ if __name__ == "__main__":
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s testuser.json  
+                              %(prog)s --dir users/ --glob 'team-*.json'
                           '''))  
 
-    parser_users_update.add_argument('--userFile', required=True, help='JSON file with details of user to update. Base name of file without extension is used as Username.')
+    parser_users_update_source = parser_users_update.add_mutually_exclusive_group(required=True)
+
+    parser_users_update_source.add_argument('--userFile', help='JSON file with details of user to update. Base name of file without extension is used as Username.')
+
+    parser_users_update_source.add_argument('--dir', help='directory of JSON files, one per user, to update in one run. Base name of each file without extension is used as Username.')
+
+    parser_users_update.add_argument('--glob', required=False, default='*.json', help='pattern selecting the files of --dir (default: *.json).')
 
     parser_users_delete = object_action_subparser_users.add_parser(
                           "delete",
@@ -301,15 +522,18 @@ if __name__ == "__main__":
 
     parser_users_delete.add_argument('--name', required=True, help='Username to delete.')
 
-    ###
-    ### parser for the "groups" object
-    ###
-    
+###
+### parser for the "groups" object
+###
+
+def add_groups_parser(object_subparsers):
     object_parser_groups = object_subparsers.add_parser(
                              "groups",
                              help="manuipulate Groups: {list,detail,create,update,delete}",
                              epilog="See '%(prog)s <group_action> --help' to read about a specific Group action.")
-                                                                                            
+    return object_parser_groups
+
+def add_groups_actions(object_parser_groups):
     object_action_subparser_groups = object_parser_groups.add_subparsers(title="action", dest="action")                                                                                                               
     
     parser_groups_list = object_action_subparser_groups.add_parser(
@@ -330,9 +554,14 @@ if __name__ == "__main__":
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s admins  
+                              %(prog)s --all
                           '''))  
 
-    parser_groups_detail.add_argument('--name', required=True, help='Groupname to return details of.')
+    parser_groups_detail_source = parser_groups_detail.add_mutually_exclusive_group(required=True)
+
+    parser_groups_detail_source.add_argument('--name', help='Groupname to return details of.')
+
+    parser_groups_detail_source.add_argument('--all', action='store_true', default=False, help='return the details of all Groups, fetching up to --jobs at once.')
 
     parser_groups_create = object_action_subparser_groups.add_parser(
                           "create",
@@ -342,9 +571,16 @@ if __name__ == "__main__":
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s testgroup.json  
+                              %(prog)s --dir groups/ --glob 'team-*.json'
                           '''))  
 
-    parser_groups_create.add_argument('--groupFile', required=True, help='JSON file with details of Group to create. Base name of file without extension is used as Groupname.')
+    parser_groups_create_source = parser_groups_create.add_mutually_exclusive_group(required=True)
+
+    parser_groups_create_source.add_argument('--groupFile', help='JSON file with details of Group to create. Base name of file without extension is used as Groupname.')
+
+    parser_groups_create_source.add_argument('--dir', help='directory of JSON files, one per Group, to create in one run. Base name of each file without extension is used as Groupname.')
+
+    parser_groups_create.add_argument('--glob', required=False, default='*.json', help='pattern selecting the files of --dir (default: *.json).')
 
     parser_groups_update = object_action_subparser_groups.add_parser(
                           "update",
@@ -354,9 +590,16 @@ if __name__ == "__main__":
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s testgroup.json  
+                              %(prog)s --dir groups/ --glob 'team-*.json'
                           '''))  
 
-    parser_groups_update.add_argument('--groupFile', required=True, help='JSON file with details of Group to update. Base name of file without extension is used as Groupname.')
+    parser_groups_update_source = parser_groups_update.add_mutually_exclusive_group(required=True)
+
+    parser_groups_update_source.add_argument('--groupFile', help='JSON file with details of Group to update. Base name of file without extension is used as Groupname.')
+
+    parser_groups_update_source.add_argument('--dir', help='directory of JSON files, one per Group, to update in one run. Base name of each file without extension is used as Groupname.')
+
+    parser_groups_update.add_argument('--glob', required=False, default='*.json', help='pattern selecting the files of --dir (default: *.json).')
 
     parser_groups_delete = object_action_subparser_groups.add_parser(
                           "delete",
@@ -370,15 +613,18 @@ if __name__ == "__main__":
 
     parser_groups_delete.add_argument('--name', required=True, help='Groupname to delete.')
 
-    ###
-    ### parser for the "repositories" object
-    ###
-    
+###
+### parser for the "repositories" object
+###
+
+def add_repositories_parser(object_subparsers):
     object_parser_repos = object_subparsers.add_parser(
                              "repositories",
                              help="manuipulate Repositories: {list,detail,create,update,delete}",
                              epilog="See '%(prog)s <repository_action> --help' to read about a specific Repository action.")
-                                                                                            
+    return object_parser_repos
+
+def add_repositories_actions(object_parser_repos):
     object_action_subparser_repos = object_parser_repos.add_subparsers(title="action", dest="action")                                                                                                               
     
     parser_repos_list = object_action_subparser_repos.add_parser(
@@ -402,9 +648,14 @@ if __name__ == "__main__":
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s testrepo  
+                              %(prog)s --all
                           '''))  
 
-    parser_repos_detail.add_argument('--key', required=True, help='Key of Respository to return the configuration of.')
+    parser_repos_detail_source = parser_repos_detail.add_mutually_exclusive_group(required=True)
+
+    parser_repos_detail_source.add_argument('--key', help='Key of Respository to return the configuration of.')
+
+    parser_repos_detail_source.add_argument('--all', action='store_true', default=False, help='return the details of all Repositories, fetching up to --jobs at once.')
 
     parser_repos_create = object_action_subparser_repos.add_parser(
                           "create",
@@ -414,9 +665,16 @@ if __name__ == "__main__":
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s testrepo.json  
+                              %(prog)s --dir repos/ --glob 'team-*.json'
                           '''))  
 
-    parser_repos_create.add_argument('--repositoryFile', required=True, help='JSON file with details of Repository to create. Base name of file without extension is used as Key.')
+    parser_repos_create_source = parser_repos_create.add_mutually_exclusive_group(required=True)
+
+    parser_repos_create_source.add_argument('--repositoryFile', help='JSON file with details of Repository to create. Base name of file without extension is used as Key.')
+
+    parser_repos_create_source.add_argument('--dir', help='directory of JSON files, one per Repository, to create in one run. Base name of each file without extension is used as Key.')
+
+    parser_repos_create.add_argument('--glob', required=False, default='*.json', help='pattern selecting the files of --dir (default: *.json).')
 
     parser_repos_update = object_action_subparser_repos.add_parser(
                           "update",
@@ -426,9 +684,16 @@ if __name__ == "__main__":
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s testrepo.json  
+                              %(prog)s --dir repos/ --glob 'team-*.json'
                           '''))  
 
-    parser_repos_update.add_argument('--repositoryFile', required=True, help='JSON file with details of Repository to update. Base name of file without extension is used as Key.')
+    parser_repos_update_source = parser_repos_update.add_mutually_exclusive_group(required=True)
+
+    parser_repos_update_source.add_argument('--repositoryFile', help='JSON file with details of Repository to update. Base name of file without extension is used as Key.')
+
+    parser_repos_update_source.add_argument('--dir', help='directory of JSON files, one per Repository, to update in one run. Base name of each file without extension is used as Key.')
+
+    parser_repos_update.add_argument('--glob', required=False, default='*.json', help='pattern selecting the files of --dir (default: *.json).')
 
     parser_repos_delete = object_action_subparser_repos.add_parser(
                           "delete",
@@ -442,15 +707,18 @@ if __name__ == "__main__":
 
     parser_repos_delete.add_argument('--key', help='Key of Respository to delete.')
 
-    ###
-    ### parser for the "permissions" object
-    ###
-    
+###
+### parser for the "permissions" object
+###
+
+def add_permissions_parser(object_subparsers):
     object_parser_permissions = object_subparsers.add_parser(
                              "permissions",
                              help="manuipulate Permissions: {list,detail,create,delete}",
                              epilog="See '%(prog)s <permission_action> --help' to read about a specific Permission action.")
-                                                                                            
+    return object_parser_permissions
+
+def add_permissions_actions(object_parser_permissions):
     object_action_subparser_permissions = object_parser_permissions.add_subparsers(title="action", dest="action")                                                                                                               
     
     parser_permissions_list = object_action_subparser_permissions.add_parser(
@@ -471,9 +739,14 @@ if __name__ == "__main__":
                           epilog=textwrap.dedent('''\
                             Examples:
                               %(prog)s administrator  
+                              %(prog)s --all
                           '''))  
 
-    parser_permissions_detail.add_argument('--name', required=True, help='Permission to return details of.')
+    parser_permissions_detail_source = parser_permissions_detail.add_mutually_exclusive_group(required=True)
+
+    parser_permissions_detail_source.add_argument('--name', help='Permission to return details of.')
+
+    parser_permissions_detail_source.add_argument('--all', action='store_true', default=False, help='return the details of all Permissions, fetching up to --jobs at once.')
 
     parser_permissions_create = object_action_subparser_permissions.add_parser(
                           "create",
@@ -499,51 +772,324 @@ if __name__ == "__main__":
 
     parser_permissions_delete.add_argument('--name', required=True, help='Permissionname to delete.')
 
+###
+### parser for the "artifacts" object
+###
+
+def add_artifacts_parser(object_subparsers):
+    object_parser_artifacts = object_subparsers.add_parser(
+                             "artifacts",
+                             help="put Artifacts into repositories: {deploy}",
+                             epilog="See '%(prog)s <artifact_action> --help' to read about a specific Artifact action.")
+    return object_parser_artifacts
+
+def add_artifacts_actions(object_parser_artifacts):
+    object_action_subparser_artifacts = object_parser_artifacts.add_subparsers(title="action", dest="action")
+
+    parser_artifacts_deploy = object_action_subparser_artifacts.add_parser(
+                          "deploy",
+                          help="deploy files to a repository",
+                          description="Deploy a file, or a directory tree of files, to a repository. Files whose content the server already has are deployed by checksum, without sending them; others are streamed from disk.",
+                          formatter_class=argparse.RawDescriptionHelpFormatter,
+                          epilog=textwrap.dedent('''\
+                            Examples:
+                              %(prog)s --repository libs-release-local --file build/app-1.0.jar --targetPath com/company/app/1.0
+                              %(prog)s --repository build-cache-local --dir /var/cache/build --glob '**/*.tar.gz'
+                          '''))
+
+    parser_artifacts_deploy.add_argument('--repository', required=True, help='key of the repository to deploy to.')
+
+    parser_artifacts_deploy_source = parser_artifacts_deploy.add_mutually_exclusive_group(required=True)
+
+    parser_artifacts_deploy_source.add_argument('--file', help='file to deploy.')
+
+    parser_artifacts_deploy_source.add_argument('--dir', help='directory of files to deploy, up to --jobs at once, each to its path relative to the directory.')
+
+    parser_artifacts_deploy.add_argument('--glob', required=False, default='**/*', help="pattern selecting the files of --dir; ** matches any number of subdirectories (default: **/*).")
+
+    parser_artifacts_deploy.add_argument('--path', required=False, help='path in the repository to deploy --file to, under --targetPath (default: the file name).')
+
+    parser_artifacts_deploy.add_argument('--targetPath', required=False, default='', help='path in the repository to deploy under (default: the repository root).')
+
+###
+### main argument parser
+###
+
+# objects of the command line, in help order
+OBJECTS = ('artifactory', 'license', 'users', 'groups', 'repositories', 'permissions', 'artifacts')
+
+# usage errors of the main options while selecting the object; left for the full parser to report
+class MainOptionsError(Exception):
+    pass
+
+# parser of the main options and the object name only, no subparsers
+class MainOptionsParser(argparse.ArgumentParser):
+
+    def error(self, message):
+        raise MainOptionsError(message)
+
+# add the options of the main parser to main_parser
+def add_main_arguments(main_parser):
+    main_parser.add_argument('-s', '--server', required=False, help='target server or base Artifactory URL')
+                                                                                                                  
+    main_parser.add_argument('-u', '--username', required=False, default='admin', help='username for Artifactory authentication')
+                                                                                                                  
+    main_parser.add_argument('-p', '--password', required=False, help='password for Artifactory authentication')
+
+    main_parser.add_argument('--apiKey', required=False, help='API key to authenticate with instead of the password; default: $ARTIFACTORY_API_KEY')
+
+    main_parser.add_argument('--accessToken', required=False, help='access token to authenticate with instead of the password; default: $ARTIFACTORY_ACCESS_TOKEN')
+
+    main_parser.add_argument('-T', '--token', required=False, action='store_true', default=False, help='flag to exchange the password for an access token, cached for later runs in --tokenDirectory and renewed before it expires')
+
+    main_parser.add_argument('--tokenDirectory', required=False, help='directory access tokens are cached in with --token; default: ~/.artifactory/tokens')
+
+    main_parser.add_argument('--cacheDirectory', required=False, help='directory to keep detail responses in between runs, revalidated with conditional requests so unchanged entities are not sent again')
+
+    main_parser.add_argument('--cacheMaxBytes', required=False, type=int, help='size beyond which the least recently used --cacheDirectory entries are evicted; default: 64 MiB')
+
+    main_parser.add_argument('-j', '--jobs', required=False, type=int, default=8, help='number of files submitted concurrently with --dir, or details fetched concurrently with --all')
+                                                                                                                  
+    main_parser.add_argument('-o', '--output', required=False, default='pprint', choices=('pprint',) + artifactoryOutput.OUTPUT_FORMATS, help='format of results; jsonl, json and table write list results one record at a time')
+
+    main_parser.add_argument('--inventory', required=False, help='JSON inventory of Artifactory instances; run the command against all of them (or the --targets ones) instead of --server')
+
+    main_parser.add_argument('--targets', required=False, help='comma-separated names or tags of the --inventory targets to run the command against')
+
+    main_parser.add_argument('--fanOut', required=False, type=int, default=8, help='number of --inventory targets called concurrently')
+
+    main_parser.add_argument('-b', '--batch', required=False, help='file of commands to run with one client, one "object action arguments" per line; - reads standard input')
+
+    main_parser.add_argument('-i', '--shell', required=False, action='store_true', default=False, help='flag to run commands typed at an interactive prompt with one client')
+
+# the object named in argv, None if there is none (e.g. with --help) or it is unknown
+# the main options are parsed with argparse, so abbreviations such as --serv are expanded as the full parser does
+def selected_object(argv):
+    object_parser = MainOptionsParser(add_help=False)
+    add_main_arguments(object_parser)
+    object_parser.add_argument('object', nargs='?')
+    try:
+        selected, remaining = object_parser.parse_known_args(argv)
+    except MainOptionsError:
+        return None
+    return selected.object if selected.object in OBJECTS else None
+
+# main parser for argv; only the action parsers of the selected object are built, so startup
+# does not pay for the argument trees of all the other objects
+def build_parser(argv):
+    main_parser = argparse.ArgumentParser(
+                      description='Command-line interface to the Artifactory REST API.',
+                      formatter_class=argparse.RawDescriptionHelpFormatter,
+                      epilog=textwrap.dedent('''\
+                        Examples:
+                          %(prog)s -s -u admin -p password artifactoryHostname repos list 
+                          %(prog)s -user admin --server artifactory.company.com:5000/artifactory repos list
+                          %(prog)s -s artifactoryHostname --batch commands.txt
+                          %(prog)s -s artifactoryHostname --shell
+                          %(prog)s --inventory instances.json --targets prod users list
+                          %(prog)s -s artifactoryHostname --output jsonl repositories list | jq -r .key
+                          
+                        See '%(prog)s <object> --help' to read about a specific subcommand.
+                      '''))  
+    
+    add_main_arguments(main_parser)
+
+    object_subparsers = main_parser.add_subparsers(title="object", dest="object")
+    add_object_parsers(object_subparsers, selected_object(argv))
+    return main_parser
+
+# add all object parsers to object_subparsers, with the action parsers of selectedObject only
+def add_object_parsers(object_subparsers, selectedObject):
+    for objectName in OBJECTS:
+        object_parser = globals()['add_' + objectName + '_parser'](object_subparsers)
+        if objectName == selectedObject:
+            globals()['add_' + objectName + '_actions'](object_parser)
+
+###
+### batch and interactive mode
+###
+
+# parsers of single commands ("object action arguments"), by object, built when the object is first used
+commandParsers = {}
+
+def command_parser(objectName):
+    if objectName not in commandParsers:
+        parser = argparse.ArgumentParser(prog='artifactory>', description='Run one command with the client of the session.')
+        object_subparsers = parser.add_subparsers(title="object", dest="object")
+        add_object_parsers(object_subparsers, objectName)
+        commandParsers[objectName] = parser
+    return commandParsers[objectName]
+
+# run one command given as a list of arguments; its options are added to those of the main command line
+def run_command(mainOptions, args):
+    global options
+    parser = command_parser(args[0] if args[0] in OBJECTS else None)
+    commandOptions = parser.parse_args(args)
+    if not getattr(commandOptions, 'action', None):
+        parser.error('an action is required for ' + commandOptions.object)
+    options = argparse.Namespace(**vars(mainOptions))
+    for name, value in vars(commandOptions).items():
+        setattr(options, name, value)
+    return globals()[options.object + '_' + options.action](artifactoryAPI)
+
+# run each command line of lines and print its result; returns the number of commands which failed
+def run_commands(mainOptions, lines):
+    failures = 0
+    for lineNumber, line in enumerate(lines, 1):
+        try:
+            args = shlex.split(line, comments=True)
+            if args:
+                print_result(run_command(mainOptions, args))
+        except SystemExit as usageExit: # usage error or --help, already printed by argparse
+            failures += 1 if usageExit.code else 0
+        except Exception as error:
+            failures += 1
+            sys.stderr.write('line ' + str(lineNumber) + ': ' + repr(error) + '\n')
+    return failures
+
+# command lines typed at the interactive prompt, up to end of input or exit
+def shell_lines():
+    try:
+        import readline # line editing and history, where available
+    except ImportError:
+        pass
+    while True:
+        try:
+            line = user_input('artifactory> ')
+        except EOFError:
+            print('')
+            return
+        args = line.split()
+        if args and args[0] in ('exit', 'quit'):
+            return
+        if args and args[0] == 'help':
+            command_parser(args[1] if len(args) > 1 else None).print_help()
+            continue
+        yield line
+
+###
+### fan-out over an inventory of instances (--inventory)
+###
+
+# run the command against every target, --fanOut at once, each with its own client; print the result of each
+# target as it finishes and an aggregated report
+# with --output, each record of a result is tagged with its target, and progress and report go to stderr
+# returns the number of targets which failed
+def run_fan_out(apiModule, targets):
+    function = globals()[options.object + '_' + options.action]
+    printLock = threading.Lock()
+    report = sys.stdout if options.output == 'pprint' else sys.stderr
+
+    def run_target(target):
+        api = apiModule.ArtifactoryAPI(get_baseURL(target['baseURL']), target.get('username', options.username),
+                                       artifactoryInventory.target_password(target, options.password), poolMaxSize=max(options.jobs, 10), **dict(cache_options(), **auth_options()))
+        try:
+            result = function(api)
+            # read all of a streamed result while the client is still open
+            return list(result) if artifactoryOutput.is_record_stream(result) else result
+        finally:
+            api.close()
+
+    def report_target(result):
+        with printLock:
+            report.write('=== ' + result['target'] + ' (' + result['baseURL'] + '): ' + ('ok' if result['ok'] else 'FAILED, ' + result['error']) + '\n')
+            report.flush()
+            if not result['ok']:
+                return
+            if options.output == 'pprint':
+                pprint(result['result'])
+            elif artifactoryOutput.is_record_stream(result['result']):
+                print_result([{'target': result['target'], 'record': record} for record in result['result']])
+            else:
+                print_result({'target': result['target'], 'record': result['result']})
+
+    results = artifactoryInventory.fan_out(targets, run_target, options.fanOut, report_target)
+    report.write('=== fan-out report:\n' + '\n'.join(artifactoryInventory.format_report(results)) + '\n')
+    return len([result for result in results if not result['ok']])
+
+##################################
+# main program
+##################################
+
+if __name__ == "__main__":
+
+    ###
+    ### setup argument parser
+    ###
+
+    main_parser = build_parser(sys.argv[1:])
+
     ###
     ### parse command-line arguments
     ###
     
     options = main_parser.parse_args()  
+    if not options.object and not options.batch and not options.shell:
+        main_parser.error('an object, --batch or --shell is required')
+    if not options.server and not options.inventory:
+        main_parser.error('-s/--server or --inventory is required')
+    if options.inventory and (options.batch or options.shell):
+        main_parser.error('--inventory runs a single command; it can not be combined with --batch or --shell')
     
     ###
     ### command-line parsable; start work
     ###
 
+    import artifactoryAPI
+    import artifactoryDescriptor
+    import artifactoryAuth
+
+    options.apiKey = options.apiKey or os.environ.get(artifactoryAuth.API_KEY_ENVIRONMENT)
+    options.accessToken = options.accessToken or os.environ.get(artifactoryAuth.ACCESS_TOKEN_ENVIRONMENT)
+
+    # targets of an inventory replace the server of the command line
+    targets = None
+    if options.inventory:
+        import artifactoryInventory
+        targets = artifactoryInventory.load_inventory(options.inventory, options.targets.split(',') if options.targets else None)
+
+    if targets is None:
+        passwordNeeded = needs_password(get_baseURL(options.server), options.username)
+    else:
+        passwordNeeded = [target for target in targets if artifactoryInventory.target_password(target) is None
+                          and needs_password(get_baseURL(target['baseURL']), target.get('username', options.username))]
+    if not options.password and passwordNeeded:
+        options.password = getpass.getpass(prompt='Password for Artifactory user ' + options.username +':')
+
+    if targets is not None:
+        failedTargets = run_fan_out(artifactoryAPI, targets)
+        sys.exit(1 if failedTargets else 0)
+
     ###
     ### setup API
     ###
     
-    # build baseURL from passed baseURL, hostname, or hostname/PublicContextPath
-    serverPassed = options.server
-    serverParsed = urlparse.urlsplit(serverPassed)
-    serverHostname = serverParsed.hostname # will not contain a value unless a URL was passed
-    if not serverHostname: # passed value was not a URL, build one
-        serverHostname = serverPassed
-        serverPublicContextPath = 'artifactory' # should be updated to skip this if "/" already present, indicating empty PublicContextPath
-        baseURL = 'http://' + serverHostname + '/' + serverPublicContextPath # should be updated to skip this if "/" already present, indicating empty PublicContextPath
-    else: # passed value was a URL, just extract PublicContextPath (for possible future use)
-        serverPublicContextPath = serverParsed.path[1:]
-        baseURL = serverPassed
-
-    if not options.password:
-        options.password = getpass.getpass(prompt='Password for Artifactory user ' + artifactoryUsername +':')
-
     # setup API
-    artifactoryAPI = artifactoryAPI.ArtifactoryAPI(baseURL, options.username, options.password)
+    artifactoryAPI = artifactoryAPI.ArtifactoryAPI(get_baseURL(options.server), options.username, options.password, poolMaxSize=max(options.jobs, 10), **dict(cache_options(), **auth_options()))
     
     ###
     ### process command
     ###
 
-    # call the local function named by the submitted object and action, then format, print, and return the result
-    result = locals()[ options.object+'_'+options.action ]()
-    pprint(result)
+    failures = 0
+    if options.batch:
+        # one command per line, all sent through the client set up above
+        batch_file = sys.stdin if options.batch == '-' else open(options.batch, 'r')
+        failures = run_commands(options, batch_file)
+    elif options.shell:
+        run_commands(options, shell_lines())
+    else:
+        # call the local function named by the submitted object and action, then format, print, and return the result
+        result = locals()[ options.object+'_'+options.action ](artifactoryAPI)
+        print_result(result)
 #    sys.exit(result)
 
     ###
     ### cleanup and exit
     ###
 
-    # nothing to do
+    artifactoryAPI.close()
+    if failures:
+        sys.exit(1)
 
 ### EOF
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+import os
+import json
+import time
+import collections
+import hashlib
+import threading
+
+# on-disk cache of response bodies and their validators (ETag, Last-Modified), keyed by URL
+# entries are one JSON file each; the least recently used are evicted once the total size exceeds maxBytes
+class DiskCache:
+
+    def __init__(self, directory, maxBytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.totalBytes = sum(size for path, size, used in self._entries())
+
+    # file name for a URL
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    # (path, size, last use) of every stored entry
+    def _entries(self):
+        entries = []
+        for fileName in os.listdir(self.directory):
+            if fileName.endswith('.json'):
+                path = os.path.join(self.directory, fileName)
+                try:
+                    status = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, status.st_size, status.st_mtime))
+        return entries
+
+    # stored entry for url as a dict with url, etag, lastModified and body; None if not cached
+    def get(self, url):
+        path = self._path(url)
+        try:
+            with open(path, 'r') as entry_file:
+                entry = json.load(entry_file)
+            os.utime(path, None)  # mark as recently used
+        except (IOError, OSError, ValueError):
+            return None
+        if entry.get('url') != url:
+            return None
+        return entry
+
+    def put(self, url, etag, lastModified, body):
+        path = self._path(url)
+        data = json.dumps({'url': url, 'etag': etag, 'lastModified': lastModified, 'body': body})
+        with self.lock:
+            previousSize = os.path.getsize(path) if os.path.exists(path) else 0
+            # write to a temporary file first so readers never see a partial entry
+            # named per process and thread, as processes (e.g. an inventory fan-out) may share the directory
+            temporaryPath = path + '.' + str(os.getpid()) + '.' + str(threading.current_thread().ident) + '.tmp'
+            with open(temporaryPath, 'w') as entry_file:
+                entry_file.write(data)
+            os.replace(temporaryPath, path)
+            self.totalBytes += os.path.getsize(path) - previousSize
+            if self.totalBytes > self.maxBytes:
+                self._evict()
+
+    def delete(self, url):
+        path = self._path(url)
+        with self.lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self.totalBytes -= size
+            except OSError:
+                pass
+
+    # remove least recently used entries until the cache is back under maxBytes
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self.totalBytes = sum(size for path, size, used in entries)
+        for path, size, used in entries:
+            if self.totalBytes <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+                self.totalBytes -= size
+            except OSError:
+                pass
+
+# in-process read-through cache of decoded responses, keyed by API path
+# entries expire ttl seconds after they were stored; beyond maxEntries the least recently used are evicted
+# invalidations are numbered, so a read which started before a write can not store its stale result after the
+# write has invalidated it: take generation() before the request and pass it to put()
+class MemoryCache:
+
+    def __init__(self, ttl, maxEntries=1024):
+        self.ttl = ttl
+        self.maxEntries = maxEntries
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # number of the latest invalidation, and of the latest invalidation of each key and prefix
+        self.invalidations = 0
+        self.keysInvalidated = {}
+        self.prefixesInvalidated = {}
+
+    # cached value for key; None if not cached or expired
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    # the current generation, to pass to put() for a value about to be read
+    def generation(self):
+        with self.lock:
+            return self.invalidations
+
+    # store value for key; ignored if key was invalidated after generation, as value may predate the write
+    def put(self, key, value, generation=None):
+        with self.lock:
+            if generation is not None and self._invalidated_since(key, generation):
+                return
+            self.entries[key] = (time.time() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+
+    def _invalidated_since(self, key, generation):
+        if self.keysInvalidated.get(key, 0) > generation:
+            return True
+        return any(key.startswith(prefix) for prefix, invalidated in self.prefixesInvalidated.items() if invalidated > generation)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.invalidations += 1
+            self.keysInvalidated[key] = self.invalidations
+            self.entries.pop(key, None)
+
+    def invalidate_prefix(self, prefix):
+        with self.lock:
+            self.invalidations += 1
+            self.prefixesInvalidated[prefix] = self.invalidations
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+    def statistics(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+
+import io
+import sys
+import shutil
+import tempfile
+import hashlib
+import argparse
+import textwrap
+import collections
+import xml.etree.ElementTree as ElementTree
+
+# child elements identifying an entry of a list section, in order of preference
+IDENTITY_TAGS = ('key', 'name', 'repoKey')
+
+# sections holding repositories, by repository type
+REPOSITORY_SECTIONS = collections.OrderedDict((('local', 'localRepositories'),
+                                               ('remote', 'remoteRepositories'),
+                                               ('virtual', 'virtualRepositories')))
+
+# tag without its {namespace} prefix
+def local_tag(element):
+    return element.tag.rsplit('}', 1)[-1]
+
+# text of the first identity child of element, None if it has none
+def identity(element):
+    for child in element:
+        if local_tag(child) in IDENTITY_TAGS:
+            return child.text
+    return None
+
+# convert an element to plain Python values: text for leaves, dicts for children, lists for repeated tags
+def element_to_dict(element):
+    if len(element) == 0:
+        return element.text
+    result = collections.OrderedDict()
+    for child in element:
+        tag = local_tag(child)
+        value = element_to_dict(child)
+        if tag in result:
+            if not isinstance(result[tag], list):
+                result[tag] = [result[tag]]
+            result[tag].append(value)
+        else:
+            result[tag] = value
+    return result
+
+# indexed model of an Artifactory configuration descriptor (system/configuration)
+class ConfigurationDescriptor:
+
+    def __init__(self):
+        self.namespace = ''
+        self.sections = collections.OrderedDict()
+        # per list section, its entries by identity
+        self.index = {}
+
+    def _add_section(self, element):
+        tag = local_tag(element)
+        self.sections[tag] = element
+        entries = collections.OrderedDict()
+        for child in element:
+            key = identity(child)
+            if key is not None:
+                entries[key] = child
+        if entries:
+            self.index[tag] = entries
+
+    # top-level section element, e.g. 'security', 'backups', 'proxies'; None if absent
+    def section(self, tag):
+        return self.sections.get(tag)
+
+    # entries of a list section by identity, e.g. entries('backups')['backup-daily']
+    def entries(self, tag):
+        return self.index.get(tag, collections.OrderedDict())
+
+    def entry(self, tag, key):
+        return self.entries(tag).get(key)
+
+    # repository elements by key; repoType is 'local', 'remote', 'virtual' or None for all
+    def repositories(self, repoType=None):
+        repositories = collections.OrderedDict()
+        for sectionType, tag in REPOSITORY_SECTIONS.items():
+            if repoType in (None, sectionType):
+                repositories.update(self.entries(tag))
+        return repositories
+
+    def repository(self, key):
+        for tag in REPOSITORY_SECTIONS.values():
+            if key in self.entries(tag):
+                return self.entries(tag)[key]
+        return None
+
+# source for iterparse: a file name, a file object, or the descriptor itself as bytes or text
+def _open(source):
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    if isinstance(source, str) and source.lstrip().startswith('<'):
+        return io.BytesIO(source.encode('utf-8'))
+    return source
+
+# function returning source positioned at its start, for sources read more than once: file names and descriptor
+# text as they are; a file object is rewound to where it was first, or, if it can not seek, copied once to a
+# temporary file
+def _rereadable(source):
+    if not hasattr(source, 'read'):
+        return lambda: source
+    if not (hasattr(source, 'seekable') and source.seekable()):
+        copy = tempfile.TemporaryFile('w+' if isinstance(source, io.TextIOBase) else 'w+b')
+        shutil.copyfileobj(source, copy)
+        copy.seek(0)
+        source = copy
+    start = source.tell()
+    def rewound():
+        source.seek(start)
+        return source
+    return rewound
+
+# stream the top-level section elements of a descriptor
+# each section is detached from the root once parsed, so no full document tree is built up
+def iter_sections(source):
+    root = None
+    depth = 0
+    for event, element in ElementTree.iterparse(_open(source), events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 1:
+                yield root, element
+                root.remove(element)
+
+# build a ConfigurationDescriptor from a file name, file object, bytes or text
+def parse(source):
+    descriptor = ConfigurationDescriptor()
+    for root, element in iter_sections(source):
+        if not descriptor.sections and root.tag.startswith('{'):
+            descriptor.namespace = root.tag[1:].split('}', 1)[0]
+        descriptor._add_section(element)
+    return descriptor
+
+###
+### structural diff of two descriptors
+###
+
+# one difference: operation is 'added', 'removed' or 'modified'; key is None for a whole section
+# details lists (path, oldValue, newValue) for modified elements
+Change = collections.namedtuple('Change', 'operation section key details')
+
+# digest of an element's tag, attributes, text and children
+def digest(element):
+    checksum = hashlib.sha1()
+    _update_digest(checksum, element)
+    return checksum.hexdigest()
+
+def _update_digest(checksum, element):
+    checksum.update(local_tag(element).encode('utf-8') + b'\0')
+    for name in sorted(element.attrib):
+        checksum.update((name + '=' + element.attrib[name]).encode('utf-8') + b'\0')
+    checksum.update((element.text or '').strip().encode('utf-8') + b'\1')
+    for child in element:
+        _update_digest(checksum, child)
+    checksum.update(b'\2')
+
+# identities of the entries of a list section, None if element is not a list section
+def _entry_keys(element):
+    keys = [identity(child) for child in element]
+    if not keys or None in keys:
+        return None
+    return keys
+
+# per section: its digest, and for list sections the digest of each entry by identity
+def fingerprint(source):
+    sections = collections.OrderedDict()
+    for root, element in iter_sections(source):
+        entries = None
+        if _entry_keys(element):
+            entries = collections.OrderedDict((identity(child), digest(child)) for child in element)
+        sections[local_tag(element)] = (digest(element), entries)
+    return sections
+
+# leaf values of an element by path relative to it; repeated tags are numbered, attributes prefixed with @
+def flatten(element, prefix='', leaves=None):
+    if leaves is None:
+        leaves = collections.OrderedDict()
+    for name in element.attrib:
+        leaves[prefix + '@' + name] = element.attrib[name]
+    if len(element) == 0:
+        leaves[prefix.rstrip('/')] = (element.text or '').strip()
+        return leaves
+    counts = {}
+    for child in element:
+        tag = local_tag(child)
+        counts[tag] = counts.get(tag, 0) + 1
+        path = tag if counts[tag] == 1 else tag + '[' + str(counts[tag]) + ']'
+        flatten(child, prefix + path + '/', leaves)
+    return leaves
+
+# flattened leaves of just the wanted (section, key) elements; key None selects the whole section
+def _collect_leaves(source, wanted):
+    collected = {}
+    for root, element in iter_sections(source):
+        section = local_tag(element)
+        if (section, None) in wanted:
+            collected[(section, None)] = flatten(element)
+            continue
+        for child in element:
+            key = identity(child)
+            if (section, key) in wanted:
+                collected[(section, key)] = flatten(child)
+    return collected
+
+# compare two descriptors element by element, matching list entries on their key
+# runs in two streaming passes over each source: the first digests every section and entry, the second
+# flattens only the elements whose digests differ, so memory is bounded by the number of entries plus the changes
+# sources are file names, file objects, or descriptor text or bytes
+def diff(oldSource, newSource):
+    oldSource, newSource = _rereadable(oldSource), _rereadable(newSource)
+    old = fingerprint(oldSource())
+    new = fingerprint(newSource())
+
+    changes = []
+    modified = []
+    for section in list(old) + [section for section in new if section not in old]:
+        if section not in new:
+            changes.append(Change('removed', section, None, []))
+        elif section not in old:
+            changes.append(Change('added', section, None, []))
+        elif old[section][0] != new[section][0]:
+            oldEntries, newEntries = old[section][1], new[section][1]
+            if oldEntries is None or newEntries is None:
+                modified.append((len(changes), section, None))
+                changes.append(None)
+                continue
+            for key in list(oldEntries) + [key for key in newEntries if key not in oldEntries]:
+                if key not in newEntries:
+                    changes.append(Change('removed', section, key, []))
+                elif key not in oldEntries:
+                    changes.append(Change('added', section, key, []))
+                elif oldEntries[key] != newEntries[key]:
+                    # filled in after the second pass, keeping changes in document order
+                    modified.append((len(changes), section, key))
+                    changes.append(None)
+
+    if modified:
+        wanted = set((section, key) for position, section, key in modified)
+        oldLeaves = _collect_leaves(oldSource(), wanted)
+        newLeaves = _collect_leaves(newSource(), wanted)
+        for position, section, key in modified:
+            before, after = oldLeaves[(section, key)], newLeaves[(section, key)]
+            details = [(path, before.get(path), after.get(path))
+                       for path in list(before) + [path for path in after if path not in before]
+                       if before.get(path) != after.get(path)]
+            changes[position] = Change('modified', section, key, details)
+    return changes
+
+# one line per change: + added, - removed, ~ modified, followed by the modified values
+def format_changes(changes):
+    symbols = {'added': '+', 'removed': '-', 'modified': '~'}
+    lines = []
+    for change in changes:
+        name = change.section + ('[' + change.key + ']' if change.key is not None else '')
+        if not change.details:
+            lines.append(symbols[change.operation] + ' ' + name)
+        for path, oldValue, newValue in change.details:
+            # a section which is a single value has the empty path
+            lines.append('~ ' + name + ('/' + path if path else '') + ': ' + str(oldValue) + ' -> ' + str(newValue))
+    return lines
+
+##################################
+# main program
+##################################
+
+if __name__ == "__main__":
+
+    main_parser = argparse.ArgumentParser(
+                      description='Compare two Artifactory configuration descriptors.',
+                      formatter_class=argparse.RawDescriptionHelpFormatter,
+                      epilog=textwrap.dedent('''\
+                        Examples:
+                          %(prog)s artConfigMinimal.xml artConfigOutput.xml
+                      '''))
+
+    main_parser.add_argument('oldFile', help='descriptor to compare from')
+
+    main_parser.add_argument('newFile', help='descriptor to compare to')
+
+    arguments = main_parser.parse_args()
+
+    changes = diff(arguments.oldFile, arguments.newFile)
+    for line in format_changes(changes):
+        print(line)
+    sys.exit(1 if changes else 0)
+
+### EOF
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import json
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# environment variable a child artifactorySetup.py reads its password from
+PASSWORD_ENVIRONMENT = 'ARTIFACTORY_PASSWORD'
+
+# inventory of Artifactory instances, as JSON:
+#   {"defaults": {"username": "admin", "passwordEnv": "ARTIFACTORY_PASSWORD"},
+#    "targets": [{"name": "eu-prod", "baseURL": "https://artifactory-eu.company.com/artifactory", "tags": ["prod", "eu"]},
+#                {"name": "us-dev", "baseURL": "artifactory-us-dev.company.com", "username": "deployer", "passwordEnv": "US_DEV_PASSWORD"}]}
+# each target takes the defaults for the fields it does not set; selection keeps only the targets whose name
+# or one of whose tags is in it
+def load_inventory(fileName, selection=None):
+    with open(fileName, 'r') as inventory_file:
+        inventory = json.load(inventory_file)
+    targets = []
+    for entry in inventory.get('targets', []):
+        target = dict(inventory.get('defaults', {}))
+        target.update(entry)
+        target.setdefault('name', target['baseURL'])
+        target.setdefault('tags', [])
+        if selection and target['name'] not in selection and not set(target['tags']) & set(selection):
+            continue
+        targets.append(target)
+    return targets
+
+# password of a target: its own, the one in the environment variable named by passwordEnv, else default
+def target_password(target, default=None):
+    if 'password' in target:
+        return target['password']
+    if 'passwordEnv' in target and target['passwordEnv'] in os.environ:
+        return os.environ[target['passwordEnv']]
+    return default
+
+# argv without the given options which take a value, in both '--option value' and '--option=value' forms
+def strip_options(argv, options):
+    stripped = []
+    skipValue = False
+    for arg in argv:
+        if skipValue:
+            skipValue = False
+        elif arg in options:
+            skipValue = True
+        elif arg.split('=', 1)[0] not in options:
+            stripped.append(arg)
+    return stripped
+
+# call function(target) for every target, up to jobs at once; returns one result per target, in inventory order:
+#   {'target': name, 'baseURL': ..., 'ok': bool, 'seconds': float, 'result': return value or None, 'error': repr or None}
+# progress(result) is called as each target finishes; the result of a failed script is its output
+def fan_out(targets, function, jobs, progress=None):
+    def run_target(target):
+        start = time.time()
+        try:
+            value, ok, error = function(target), True, None
+        except Exception as exception:
+            value, ok, error = getattr(exception, 'output', None), False, repr(exception)
+        result = {'target': target['name'], 'baseURL': target['baseURL'], 'ok': ok,
+                  'seconds': round(time.time() - start, 3), 'result': value, 'error': error}
+        if progress:
+            progress(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        return list(executor.map(run_target, targets))
+
+# run a script with arguments against one target in a child process; the password goes through the environment,
+# never the command line. Returns the output, and raises ScriptError if the script failed.
+def run_script(script, arguments, target, password):
+    environment = dict(os.environ)
+    if password is not None:
+        environment[PASSWORD_ENVIRONMENT] = password
+    command = [sys.executable, script] + arguments + ['--targetServer', target['baseURL']]
+    if target.get('username'):
+        command += ['--username', target['username']]
+    child = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, env=environment)
+    output = child.communicate()[0].decode('utf-8', 'replace')
+    if child.returncode != 0:
+        raise ScriptError(child.returncode, output)
+    return output
+
+# a child process of run_script exited with an error
+class ScriptError(Exception):
+
+    def __init__(self, returncode, output):
+        Exception.__init__(self, 'exit status ' + str(returncode))
+        self.returncode = returncode
+        self.output = output
+
+# aggregated report of fan_out results: one line per target and a total
+def format_report(results):
+    lines = ['%-24s %-8s %9s  %s' % ('target', 'status', 'seconds', 'baseURL')]
+    for result in results:
+        lines.append('%-24s %-8s %9.2f  %s' % (result['target'], 'ok' if result['ok'] else 'FAILED', result['seconds'], result['baseURL']))
+        if result['error']:
+            lines.append('    ' + result['error'])
+    failed = len([result for result in results if not result['ok']])
+    lines.append(str(len(results)) + ' targets, ' + str(len(results) - failed) + ' ok, ' + str(failed) + ' failed')
+    return lines
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+import json
+import codecs
+
+# orjson, when installed, encodes and decodes several times faster than the json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+WHITESPACE = ' \t\n\r'
+
+# characters which may follow an element of an array
+DELIMITERS = WHITESPACE + ',]'
+
+# the elements of a JSON array, decoded one at a time from chunks of its text (bytes or str), e.g. a response
+# stream; only the current element is held in memory, not the whole document
+def iter_json_array(chunks):
+    chunks = iter(chunks)
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    exhausted = False
+    started = False
+    yieldedAny = False
+
+    def more():
+        for chunk in chunks:
+            text = utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                return text
+        return None
+
+    while True:
+        while position < len(buffer) and buffer[position] in WHITESPACE:
+            position += 1
+        if position == len(buffer):
+            # consumed text is dropped, so the buffer only holds the rest of the last chunk read
+            text = None if exhausted else more()
+            if text is None:
+                raise ValueError('JSON array ended unexpectedly')
+            buffer, position = text, 0
+            continue
+
+        character = buffer[position]
+        if not started:
+            if character != '[':
+                raise ValueError('Expected a JSON array, found ' + repr(buffer[position:position + 20]))
+            started = True
+            expectValue = True
+            position += 1
+            continue
+        if character == ']' and not expectValue:
+            return
+        if not expectValue:
+            if character != ',':
+                raise ValueError('Expected , or ] in JSON array, found ' + repr(buffer[position:position + 20]))
+            expectValue = True
+            position += 1
+            continue
+        if character == ']' and not yieldedAny:
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            value, end = None, None
+        # a number or literal at the end of the buffer may be cut short ('12' of '123', '2' of '2.5');
+        # an element only counts once a delimiter follows it, or the input has ended
+        if end is None or ((end == len(buffer) or buffer[end] not in DELIMITERS) and not exhausted):
+            text = None if exhausted else more()
+            if text is None:
+                if end is None:
+                    raise ValueError('JSON array ended unexpectedly')
+                exhausted = True
+                continue
+            buffer, position = buffer[position:] + text, 0
+            continue
+        yield value
+        yieldedAny = True
+        position = end
+        expectValue = False
+
+# request body for a JSON payload, as bytes: str and bytes are taken to be JSON text already (e.g. read from a
+# file) and sent as they are, not encoded again; anything else is encoded
+def encode(payload):
+    if isinstance(payload, bytes):
+        return payload
+    if isinstance(payload, str):
+        return payload.encode('utf-8')
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except TypeError:
+            # values orjson does not take (e.g. integers over 64 bits, keys which are not strings)
+            pass
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+# decode JSON text, bytes or str; bytes straight off a response need no decoding to str first
+def decode(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+import time
+import threading
+
+# endpoint families which can be limited separately, by management API path prefix
+ENDPOINT_FAMILIES = (('security/', 'security'), ('repositories', 'repositories'), ('system/', 'system'))
+
+# family of a management API path: 'security', 'repositories', 'system', or 'other'
+def endpoint_family(path):
+    for prefix, family in ENDPOINT_FAMILIES:
+        if path.startswith(prefix) or path == prefix.rstrip('/'):
+            return family
+    return 'other'
+
+# token bucket: on average rate calls per second, with bursts of up to burst calls
+class TokenBucket:
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self.tokens = self.burst
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    # wait until a token is available, then take it
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# limits the number of requests in flight, adapting the limit to how the server copes (AIMD):
+# the limit grows by one after a full limit's worth of fast, successful requests, and is halved
+# (at most once per latency baseline) when a request fails, or when recent latency rises well above the baseline
+# latency is judged per endpoint family, which differ in how long their requests take: a smoothed recent latency
+# is compared with a baseline, the lowest smoothed latency seen lately, so jitter alone does not count as overload
+class AdaptiveConcurrencyLimiter:
+
+    # maxLimit: upper bound of requests in flight; minLimit: lower bound
+    # latencyTarget: seconds the recent latency may reach before the server counts as overloaded;
+    #   None uses tolerance times the family's baseline
+    # tolerance: how far above its baseline the recent latency of a family may rise
+    def __init__(self, maxLimit, minLimit=1, initialLimit=None, latencyTarget=None, tolerance=2.0):
+        self.maxLimit = maxLimit
+        self.minLimit = minLimit
+        self.limit = float(initialLimit if initialLimit is not None else max(minLimit, maxLimit // 2))
+        self.latencyTarget = latencyTarget
+        self.tolerance = tolerance
+        # per endpoint family: [recent latency (exponentially weighted average), baseline latency]
+        self.latencies = {}
+        self.inFlight = 0
+        self.successes = 0
+        self.lastDecrease = 0
+        self.condition = threading.Condition()
+
+    # wait for a free slot
+    def acquire(self):
+        with self.condition:
+            while self.inFlight >= int(self.limit):
+                self.condition.wait()
+            self.inFlight += 1
+
+    # free the slot and adapt the limit to the outcome of the request
+    def release(self, latency, failed, family='other'):
+        with self.condition:
+            self.inFlight -= 1
+            recent, baseline = self._observe(family, latency)
+            target = self.latencyTarget if self.latencyTarget is not None else self.tolerance * baseline
+            if failed or recent > target:
+                if time.time() - self.lastDecrease > baseline:
+                    self.limit = max(self.minLimit, self.limit / 2)
+                    self.lastDecrease = time.time()
+                self.successes = 0
+            else:
+                self.successes += 1
+                if self.successes >= self.limit:
+                    self.limit = min(self.maxLimit, self.limit + 1)
+                    self.successes = 0
+            self.condition.notify_all()
+
+    # free the slot of a request which never got a response worth judging (e.g. an invalid URL)
+    def cancel(self):
+        with self.condition:
+            self.inFlight -= 1
+            self.condition.notify_all()
+
+    # update and return the recent and baseline latency of family
+    def _observe(self, family, latency):
+        if family not in self.latencies:
+            self.latencies[family] = [latency, latency]
+        averages = self.latencies[family]
+        averages[0] += 0.2 * (latency - averages[0])
+        # the baseline is the lowest recent latency seen, let drift up slowly so it follows a server which has
+        # become slower for good, but not the queueing caused by too many requests in flight
+        averages[1] = min(averages[0], averages[1] * 1.001)
+        return averages[0], averages[1]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+import json
+import threading
+import collections
+
+# management API path prefixes whose next path segment is an entity name, and the placeholder used for it
+ENDPOINT_PLACEHOLDERS = (('security/users/', '{name}'),
+                         ('security/groups/', '{name}'),
+                         ('security/permissions/', '{name}'),
+                         ('repositories/', '{key}'))
+
+# upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+# endpoint template of a management API path, e.g. 'security/users/{name}' for 'security/users/admin'
+# paths outside the management API (artifacts) are reported as '{repoKey}/{path}'
+def endpoint_template(path):
+    if path is None:
+        return '{repoKey}/{path}'
+    path = path.split('?', 1)[0]
+    for prefix, placeholder in ENDPOINT_PLACEHOLDERS:
+        if path.startswith(prefix) and len(path) > len(prefix):
+            return prefix + placeholder
+    return path
+
+# quantile q (0..1) estimated from cumulative bucket counts, interpolating linearly within a bucket
+def histogram_quantile(q, bucketCounts, count):
+    if count == 0:
+        return None
+    rank = q * count
+    lower, seen = 0.0, 0
+    for bound, bucketCount in zip(LATENCY_BUCKETS, bucketCounts):
+        if seen + bucketCount >= rank:
+            if bound == float('inf'):
+                return lower
+            return lower + (bound - lower) * (rank - seen) / bucketCount
+        lower, seen = bound, seen + bucketCount
+    return lower
+
+# per-endpoint aggregate of request records
+class EndpointStatistics:
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.bytesIn = 0
+        self.bytesOut = 0
+        self.statuses = collections.Counter()
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def add(self, record):
+        self.count += 1
+        self.seconds += record['latency']
+        self.bytesIn += record['bytesIn']
+        self.bytesOut += record['bytesOut']
+        status = record['status']
+        self.statuses[str(status) if status is not None else 'error'] += 1
+        if status is None or status >= 400:
+            self.errors += 1
+        for position, bound in enumerate(LATENCY_BUCKETS):
+            if record['latency'] <= bound:
+                self.buckets[position] += 1
+                break
+
+    def quantile(self, q):
+        return histogram_quantile(q, self.buckets, self.count)
+
+# request hook aggregating latency histograms, status counts and bytes per (method, endpoint template)
+# install with ArtifactoryAPI.add_request_hook(collector)
+class MetricsCollector:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = collections.OrderedDict()
+
+    def __call__(self, record):
+        key = (record['method'], record['endpoint'])
+        with self.lock:
+            if key not in self.endpoints:
+                self.endpoints[key] = EndpointStatistics()
+            self.endpoints[key].add(record)
+
+    # summary per endpoint, slowest total time first
+    def summary(self):
+        with self.lock:
+            items = sorted(self.endpoints.items(), key=lambda item: -item[1].seconds)
+            return [{'method': method,
+                     'endpoint': endpoint,
+                     'count': statistics.count,
+                     'errors': statistics.errors,
+                     'statuses': dict(statistics.statuses),
+                     'totalSeconds': round(statistics.seconds, 6),
+                     'meanSeconds': round(statistics.seconds / statistics.count, 6),
+                     'p50Seconds': round(statistics.quantile(0.5), 6),
+                     'p99Seconds': round(statistics.quantile(0.99), 6),
+                     'bytesIn': statistics.bytesIn,
+                     'bytesOut': statistics.bytesOut}
+                    for (method, endpoint), statistics in items]
+
+    def json_summary(self):
+        return json.dumps({'endpoints': self.summary()}, indent=2)
+
+    # Prometheus text exposition format
+    def prometheus_text(self):
+        lines = ['# HELP artifactory_request_duration_seconds Latency of Artifactory API requests.',
+                 '# TYPE artifactory_request_duration_seconds histogram']
+        with self.lock:
+            items = list(self.endpoints.items())
+        for (method, endpoint), statistics in items:
+            labels = 'method="' + method + '",endpoint="' + endpoint + '"'
+            cumulative = 0
+            for bound, bucketCount in zip(LATENCY_BUCKETS, statistics.buckets):
+                cumulative += bucketCount
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('artifactory_request_duration_seconds_bucket{' + labels + ',le="' + le + '"} ' + str(cumulative))
+            lines.append('artifactory_request_duration_seconds_sum{' + labels + '} ' + repr(statistics.seconds))
+            lines.append('artifactory_request_duration_seconds_count{' + labels + '} ' + str(statistics.count))
+        lines += ['# HELP artifactory_requests_total Artifactory API requests by response status.',
+                  '# TYPE artifactory_requests_total counter']
+        for (method, endpoint), statistics in items:
+            for status, count in sorted(statistics.statuses.items()):
+                lines.append('artifactory_requests_total{method="' + method + '",endpoint="' + endpoint + '",status="' + status + '"} ' + str(count))
+        lines += ['# HELP artifactory_request_bytes_total Bytes sent to and received from the Artifactory API.',
+                  '# TYPE artifactory_request_bytes_total counter']
+        for (method, endpoint), statistics in items:
+            labels = 'method="' + method + '",endpoint="' + endpoint + '"'
+            lines.append('artifactory_request_bytes_total{' + labels + ',direction="in"} ' + str(statistics.bytesIn))
+            lines.append('artifactory_request_bytes_total{' + labels + ',direction="out"} ' + str(statistics.bytesOut))
+        return '\n'.join(lines) + '\n'
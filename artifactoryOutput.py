@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+import json
+
+# formats results can be written in
+OUTPUT_FORMATS = ('jsonl', 'json', 'table')
+
+# records used to size the columns of a table; later records are written as they come, wider values
+# just push their row out of line
+TABLE_SAMPLE = 100
+
+# True for results written record by record: lists and other iterables (generators), but not strings or dicts
+def is_record_stream(result):
+    if isinstance(result, (str, bytes, dict)):
+        return False
+    return hasattr(result, '__iter__')
+
+# write a result to stream in format; a list or other iterable result is written one record at a time,
+# so a generator of records never has to be held in memory as a whole
+def write_result(stream, result, format):
+    if is_record_stream(result):
+        write_records(stream, result, format)
+    elif format == 'json':
+        stream.write(json.dumps(result, indent=2, default=str) + '\n')
+    else:
+        write_records(stream, [result], format)
+
+def write_records(stream, records, format):
+    if format == 'jsonl':
+        write_jsonl(stream, records)
+    elif format == 'json':
+        write_json_array(stream, records)
+    else:
+        write_table(stream, records)
+
+# one JSON document per line, flushed as each is written so pipelines see records as they arrive
+def write_jsonl(stream, records):
+    for record in records:
+        stream.write(json.dumps(record, default=str) + '\n')
+        stream.flush()
+
+# a JSON array, one element per line
+def write_json_array(stream, records):
+    count = 0
+    for record in records:
+        stream.write(('[\n ' if count == 0 else ',\n ') + json.dumps(record, default=str))
+        count += 1
+    stream.write('[]\n' if count == 0 else '\n]\n')
+    stream.flush()
+
+def _cells(record, columns):
+    if not isinstance(record, dict):
+        record = {'value': record}
+    return [_cell(record.get(column, '')) for column in columns]
+
+def _cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+# aligned columns named after the keys of the first records; records which are not dicts make a single column
+def write_table(stream, records):
+    records = iter(records)
+    sample = []
+    for record in records:
+        sample.append(record)
+        if len(sample) >= TABLE_SAMPLE:
+            break
+    if not sample:
+        return
+    columns = []
+    for record in sample:
+        for column in (record.keys() if isinstance(record, dict) else ['value']):
+            if column not in columns:
+                columns.append(column)
+    widths = [len(column) for column in columns]
+    for record in sample:
+        widths = [max(width, len(cell)) for width, cell in zip(widths, _cells(record, columns))]
+
+    def write_row(cells):
+        stream.write('  '.join(cell.ljust(width) for cell, width in zip(cells, widths)).rstrip() + '\n')
+
+    write_row(columns)
+    write_row(['-' * width for width in widths])
+    for record in sample:
+        write_row(_cells(record, columns))
+    for record in records:
+        write_row(_cells(record, columns))
+    stream.flush()
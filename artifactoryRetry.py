@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+import time
+import random
+import threading
+import email.utils
+
+# raised instead of sending a request to a host whose circuit breaker is open
+class CircuitOpenError(Exception):
+    pass
+
+# when and how long to wait before retrying a request
+class RetryPolicy:
+
+    # retries: attempts after the first one; 0 disables retrying
+    # backoffFactor: the n-th retry waits a random time up to backoffFactor * 2**n seconds (full jitter)
+    # backoffMax: upper limit of any wait, including one asked for with Retry-After
+    # statuses: response status codes worth retrying
+    # methods: only idempotent methods are retried; repeating them can not apply a change twice
+    def __init__(self, retries=3, backoffFactor=0.5, backoffMax=30, statuses=(429, 502, 503, 504),
+                 methods=('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')):
+        self.retries = retries
+        self.backoffFactor = backoffFactor
+        self.backoffMax = backoffMax
+        self.statuses = statuses
+        self.methods = methods
+
+    # True if a request which got response (or failed to get one) should be sent again
+    def should_retry(self, method, attempt, response=None):
+        if attempt >= self.retries or method.upper() not in self.methods:
+            return False
+        return response is None or response.status_code in self.statuses
+
+    # seconds to wait before the retry following attempt; honors a Retry-After header
+    def delay(self, attempt, response=None):
+        retryAfter = response.headers.get('Retry-After') if response is not None else None
+        if retryAfter:
+            return min(self.backoffMax, max(0, parse_retry_after(retryAfter)))
+        return random.uniform(0, min(self.backoffMax, self.backoffFactor * (2 ** attempt)))
+
+# seconds from a Retry-After value, given either as seconds or as an HTTP date
+def parse_retry_after(value):
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_tz(value)
+        if parsed is None:
+            return 0
+        return email.utils.mktime_tz(parsed) - time.time()
+
+# stops calls to a failing host: after failureThreshold consecutive failures the circuit opens and calls
+# fail at once with CircuitOpenError; after resetTimeout seconds one trial call is let through, and its
+# success closes the circuit again
+class CircuitBreaker:
+
+    def __init__(self, host, failureThreshold=5, resetTimeout=30):
+        self.host = host
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.openedAt = None
+        self.trialRunning = False
+
+    def before_call(self):
+        with self.lock:
+            if self.openedAt is None:
+                return
+            if self.trialRunning or time.time() - self.openedAt < self.resetTimeout:
+                raise CircuitOpenError('Circuit open for ' + self.host + ' after ' + str(self.failures) + ' consecutive failures')
+            self.trialRunning = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.openedAt = None
+            self.trialRunning = False
+
+    # end a call which did not reach the host, without counting it either way; the next trial call may go ahead
+    def cancel_call(self):
+        with self.lock:
+            self.trialRunning = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trialRunning = False
+            if self.failures >= self.failureThreshold:
+                self.openedAt = time.time()
@@ -11,16 +11,25 @@ import re
 import getpass
 import textwrap
 import argparse
-import urlparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pprint import pprint
+try:
+    import urlparse
+except ImportError:
+    import urllib.parse as urlparse
 
 ###
 ### internal import
 ###
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import artifactoryAPI
-from tools import log
+import artifactoryMetrics
+import artifactoryTrace
+import artifactoryInventory
+import artifactoryOutput
+import artifactoryAuth
 
 ###
 ### local functions for API calls
@@ -36,6 +45,9 @@ def artifactory_get_health():
 def artifactory_get_configuration():
     return artifactoryAPI.artifactory_get_configuration()
         
+def artifactory_configuration_patch(patch):
+    return artifactoryAPI.artifactory_configuration_patch(patch)
+        
 def license_information():
     return artifactoryAPI.license_information()
         
@@ -44,9 +56,16 @@ def license_install(licenseData):
         
 def users_list():
     return artifactoryAPI.users_list()
+
+def users_iter():
+    return artifactoryAPI.iter_users()
         
 def users_detail(username):
     return artifactoryAPI.users_detail(username)
+
+# details of all Users, fetched up to --jobs (at least 8) at a time
+def users_detail_all():
+    return artifactoryAPI.iter_users(detail=True, prefetch=max(arguments.jobs, 8))
         
 def users_create(username, userData):
     return artifactoryAPI.users_create(username, userData)
@@ -59,9 +78,16 @@ def users_delete(username):
 
 def groups_list():
     return artifactoryAPI.groups_list()
+
+def groups_iter():
+    return artifactoryAPI.iter_groups()
         
 def groups_detail(groupname):
     return artifactoryAPI.groups_detail(groupname)
+
+# details of all Groups, fetched up to --jobs (at least 8) at a time
+def groups_detail_all():
+    return artifactoryAPI.iter_groups(detail=True, prefetch=max(arguments.jobs, 8))
         
 def groups_create(groupname, groupData):
     return artifactoryAPI.groups_create(groupname, groupData)
@@ -74,10 +100,17 @@ def groups_delete(groupname):
 
 def repos_list(repotype):
     return artifactoryAPI.repositories_list(repotype)
+
+def repos_iter(repotype):
+    return artifactoryAPI.iter_repositories(repotype)
         
 def repos_detail(repokey):
     return artifactoryAPI.repositories_detail(repokey)
 
+# details of all Repositories, fetched up to --jobs (at least 8) at a time
+def repos_detail_all():
+    return artifactoryAPI.iter_repositories(detail=True, prefetch=max(arguments.jobs, 8))
+
 def repos_create(repokey, repoData):
     return artifactoryAPI.repositories_create(repokey, repoData)
 
@@ -87,11 +120,21 @@ def repos_update(repokey, repoData):
 def repos_delete(repokey):
     return artifactoryAPI.repositories_delete(repokey)
 
+def repos_patch(changes):
+    return artifactoryAPI.repositories_patch(changes)
+
 def permissions_list():
     return artifactoryAPI.permissions_list()
+
+def permissions_iter():
+    return artifactoryAPI.iter_permissions()
         
 def permissions_detail(permissionname):
     return artifactoryAPI.permissions_detail(permissionname)
+
+# details of all Permissions, fetched up to --jobs (at least 8) at a time
+def permissions_detail_all():
+    return artifactoryAPI.iter_permissions(detail=True, prefetch=max(arguments.jobs, 8))
         
 def permissions_create(permissionname, permissionData):
     return artifactoryAPI.permissions_create(permissionname, permissionData)
@@ -129,7 +172,10 @@ def get_artifactory_baseURL():
     else:
         valueProvided = user_input('targetServer: ')
 
-    # parse provided value and build full baseURL, as necessary
+    return build_artifactory_baseURL(valueProvided)
+
+# parse a target server value and build full baseURL, as necessary
+def build_artifactory_baseURL(valueProvided):
     valueParsed = urlparse.urlsplit(valueProvided)
     hostname = valueParsed.hostname # if full baseURL provided
     # note: serverPublicContextPath = valueParsed.path[1:] if full baseURL provided
@@ -166,6 +212,10 @@ def get_artifactory_password():
     if arguments.password:
         password = arguments.password
 
+    # else use value from environment, if present (set per target by --inventory fan-out)
+    elif artifactoryInventory.PASSWORD_ENVIRONMENT in os.environ:
+        password = os.environ[artifactoryInventory.PASSWORD_ENVIRONMENT]
+
     # else use value from configuration file, if present,
     elif 'artifactory' in config:
         if 'password' in config['artifactory']:
@@ -177,6 +227,28 @@ def get_artifactory_password():
 
     return password
 
+# ArtifactoryAPI authentication arguments: an API key or access token from the command line, the environment or
+# the configuration file, in that order; else, with --token, exchange the password for a cached access token
+def get_artifactory_auth():
+    artifactoryConfig = config.get('artifactory', {})
+    apiKey = arguments.apiKey or os.environ.get(artifactoryAuth.API_KEY_ENVIRONMENT) or artifactoryConfig.get('apiKey')
+    if apiKey:
+        return {'apiKey': apiKey}
+    accessToken = arguments.accessToken or os.environ.get(artifactoryAuth.ACCESS_TOKEN_ENVIRONMENT) or artifactoryConfig.get('accessToken')
+    if accessToken:
+        return {'accessToken': accessToken}
+    if arguments.token:
+        return {'useToken': True, 'tokenDirectory': arguments.tokenDirectory or artifactoryAuth.DEFAULT_TOKEN_DIRECTORY}
+    return {}
+
+# True if the password is needed: no API key or access token is given, and with --token, no usable token is cached
+def password_needed(baseURL, username, auth):
+    if 'apiKey' in auth or 'accessToken' in auth:
+        return False
+    if auth.get('useToken'):
+        return not artifactoryAuth.TokenCache(auth['tokenDirectory']).usable(baseURL, username)
+    return True
+
 # get value of destructive flag
 # if True, creates over-write existing objects with the same identifier and type
 def get_destructive_flag():
@@ -200,6 +272,79 @@ def get_destructive_flag():
         
     return flagValue
 
+# requests per second by endpoint family, from --rateLimit family=rate,...
+def get_rate_limits():
+    rateLimits = {}
+    for limit in arguments.rateLimit.split(','):
+        if limit:
+            family, rate = limit.split('=')
+            rateLimits[family.strip()] = float(rate)
+    return rateLimits
+
+# ArtifactoryAPI disk cache arguments from --cacheDirectory and --cacheMaxBytes
+def cache_options():
+    cacheOptions = {}
+    if arguments.cacheDirectory:
+        cacheOptions['cacheDirectory'] = arguments.cacheDirectory
+        if arguments.cacheMaxBytes:
+            cacheOptions['cacheMaxBytes'] = arguments.cacheMaxBytes
+    return cacheOptions
+
+###
+### fan-out over an inventory of instances (--inventory)
+###
+
+# options selecting the one target of a run; the fan-out sets them per target
+FAN_OUT_OPTIONS = ('--inventory', '--targets', '--fanOut', '-t', '--targetServer', '-u', '--username', '-p', '--password')
+
+# options naming a file written at the end of a run; each target writes its own, named FILE.<target>
+PER_TARGET_FILE_OPTIONS = ('--metrics', '--trace')
+
+# FILE.<target name>, with characters which do not belong in a file name (e.g. of a URL) replaced
+def target_file_name(fileName, target):
+    return fileName + '.' + re.sub('[^A-Za-z0-9._-]', '_', target['name'])
+
+# username a target run authenticates as: the target's, else that of the command line or configuration file
+def target_username(target):
+    return target.get('username') or arguments.username or config.get('artifactory', {}).get('username') or ''
+
+# run this script with the same arguments against every target of the inventory, --fanOut at once, each in a
+# child process; print the output of each target as it finishes and an aggregated report
+# returns the number of targets which failed
+def run_fan_out():
+    targets = artifactoryInventory.load_inventory(arguments.inventory, arguments.targets.split(',') if arguments.targets else None)
+    print('\nFan-out to ' + str(len(targets)) + ' targets of ' + arguments.inventory)
+    defaultPassword = arguments.password or os.environ.get(artifactoryInventory.PASSWORD_ENVIRONMENT) or config.get('artifactory', {}).get('password')
+    # as for a single target, an API key, an access token or a cached token (--token) make the password unnecessary
+    auth = get_artifactory_auth()
+    passwordNeeded = [target for target in targets if artifactoryInventory.target_password(target) is None
+                      and password_needed(build_artifactory_baseURL(target['baseURL']), target_username(target), auth)]
+    if defaultPassword is None and passwordNeeded:
+        defaultPassword = getpass.getpass('password: ')
+    script = os.path.abspath(sys.argv[0])
+    childArguments = artifactoryInventory.strip_options(sys.argv[1:], FAN_OUT_OPTIONS + PER_TARGET_FILE_OPTIONS)
+    printLock = threading.Lock()
+
+    def run_target(target):
+        target = dict(target)
+        target.setdefault('username', arguments.username)
+        targetArguments = list(childArguments)
+        for option in PER_TARGET_FILE_OPTIONS:
+            fileName = getattr(arguments, option.lstrip('-'))
+            if fileName:
+                targetArguments += [option, target_file_name(fileName, target)]
+        return artifactoryInventory.run_script(script, targetArguments, target, artifactoryInventory.target_password(target, defaultPassword))
+
+    def report_target(result):
+        with printLock:
+            print('\n=== ' + result['target'] + ' (' + result['baseURL'] + '): ' + ('ok' if result['ok'] else 'FAILED, ' + result['error']))
+            print(result['result'] or '')
+
+    results = artifactoryInventory.fan_out(targets, run_target, arguments.fanOut, report_target)
+    print('\n=== fan-out report:')
+    print('\n'.join(artifactoryInventory.format_report(results)))
+    return len([result for result in results if not result['ok']])
+
 ###
 ### functions to process Artifactory section of configuration file
 ###
@@ -211,6 +356,8 @@ def process_artifactory_section():
         process_artifactory_information()
     if 'configuration' in config['artifactory']:
         process_artifactory_configuration()
+    if 'configurationPatch' in config['artifactory']:
+        process_artifactory_configurationPatch()
     return
 
 def process_artifactory_health():
@@ -230,6 +377,14 @@ def process_artifactory_configuration():
         print(artifactory_get_configuration())
     return
 
+# change parts of the configuration descriptor with one request
+def process_artifactory_configurationPatch():
+    patch = config['artifactory']['configurationPatch']
+    print('\nPatching Artifactory Instance Configuration with data:')
+    print(str(patch))
+    print('\nResults:\n' + str(artifactory_configuration_patch(patch)))
+    return
+
 ###
 ### functions to process License section of configuration file
 ###
@@ -258,6 +413,59 @@ def process_license_install():
     print(str(license_install(licenseData)))
     return
 
+###
+### functions to run entity operations
+###
+
+# serializes output of operations; list operations running on the worker pool write theirs directly (--output)
+outputLock = threading.Lock()
+
+# run operation once for each item and print the output lines it returns, in item order
+# with --jobs N, up to N operations are in flight at once on the worker pool
+def run_operations(operation, items):
+    for lines in map_operations(operation, items):
+        if lines:
+            with outputLock:
+                print('\n'.join(lines))
+    return
+
+# lines a list operation returns: its title and the str of records; with --output, or records from a generator,
+# the title and the records are written right away instead, one record at a time, and there are no lines
+def list_lines(title, records):
+    if arguments.output == 'text' and isinstance(records, list):
+        return [title, str(records)]
+    with outputLock:
+        print(title)
+        if arguments.output == 'text':
+            # records arriving one at a time (a detail "*" read); print each as it comes
+            for record in records:
+                print(str(record))
+        else:
+            artifactoryOutput.write_result(sys.stdout, records, arguments.output)
+    return []
+
+# apply function to each item, on the worker pool if there is one; results are returned in item order
+# when tracing, each call gets its own span under the span active in the caller
+def map_operations(function, items):
+    if tracer:
+        function = tracer.wrap(function, 'entity')
+    if executor:
+        return executor.map(function, items)
+    return (function(item) for item in items)
+
+# run a process_*_section function, or plan_configuration, in its own trace span when tracing
+def run_section(section):
+    if not tracer:
+        return section()
+    with tracer.span(section.__name__):
+        return section()
+
+# read an entity file; the base name of the file without extension identifies the entity
+def read_entity_file(fileName):
+    with open(fileName, 'r') as entity_file:
+        data = entity_file.read()
+    return os.path.splitext(os.path.basename(fileName))[0], data
+
 ###
 ### functions to process Users section of configuration file
 ###
@@ -280,58 +488,70 @@ def process_users_section():
     return
 
 def process_users_list():
-    print('\nList of Users:')
-    print(str(users_list()))
+    print('\n'.join(operation_users_list()))
     return
 
 def process_users_detail():
-    for username in config['users']['detail']:
-        print('\nDetails for User "' + username + '":')
-        print(str(users_detail(username)))
+    run_operations(operation_users_detail, config['users']['detail'])
     return
 
 def process_users_delete():
-    for username in config['users']['delete']:
-        print('\nDeleting User "' + username + '"')
-        print('Results: ' + str(users_delete(username)))
+    run_operations(operation_users_delete, config['users']['delete'])
     return
 
 def process_users_create():
-    for username in config['users']['create']:
-        userData = config['users']['create'][username]
-        print('\nCreating User "' + username + '" with data:')
-        print(str(userData))
-        print('\nResults:\n' +str(users_create(username,userData)))
+    run_operations(operation_users_create, config['users']['create'])
     return
 
 def process_users_createFromFile():
-    for userFileName in config['users']['createFromFile']:
-        with open(userFileName, 'r') as user_file:
-            username = os.path.splitext(user_file)[0]
-            userData = user_file.read()
-            print('\nCreating User "' + username + '" with data:')
-            print(str(userData))
-            print('\nResults:\n' +str(users_create(username,userData)))
+    run_operations(operation_users_createFromFile, config['users']['createFromFile'])
     return
 
 def process_users_update():
-    for username in config['users']['update']:
-        userData = config['users']['update'][username]
-        print('\nUpdating User "' + username + '" with data:')
-        print(str(userData))
-        print('\nResults:\n' +str(users_update(username,userData)))
+    run_operations(operation_users_update, config['users']['update'])
     return
 
-def process_users_update():
-    for userFileName in config['users']['updateFromFile']:
-        with open(userFileName, 'r') as user_file:
-            username = os.path.splitext(user_file)[0]
-            userData = user_file.read()
-            print('\nUpdating User "' + username + '" with data:')
-            print(str(userData))
-            print('\nResults:\n' +str(users_update(username,userData)))
+def process_users_updateFromFile():
+    run_operations(operation_users_updateFromFile, config['users']['updateFromFile'])
     return
 
+def operation_users_list():
+    return list_lines('\nList of Users:', users_list() if arguments.output == 'text' else users_iter())
+
+def operation_users_detail(username):
+    if username == '*':
+        return list_lines('\nDetails for all Users:', users_detail_all())
+    return ['\nDetails for User "' + username + '":',
+            str(users_detail(username))]
+
+def operation_users_delete(username):
+    return ['\nDeleting User "' + username + '"',
+            'Results: ' + str(users_delete(username))]
+
+def operation_users_create(username):
+    userData = config['users']['create'][username]
+    return ['\nCreating User "' + username + '" with data:',
+            str(userData),
+            '\nResults:\n' + str(users_create(username,userData))]
+
+def operation_users_createFromFile(userFileName):
+    username, userData = read_entity_file(userFileName)
+    return ['\nCreating User "' + username + '" with data:',
+            str(userData),
+            '\nResults:\n' + str(users_create(username,userData))]
+
+def operation_users_update(username):
+    userData = config['users']['update'][username]
+    return ['\nUpdating User "' + username + '" with data:',
+            str(userData),
+            '\nResults:\n' + str(users_update(username,userData))]
+
+def operation_users_updateFromFile(userFileName):
+    username, userData = read_entity_file(userFileName)
+    return ['\nUpdating User "' + username + '" with data:',
+            str(userData),
+            '\nResults:\n' + str(users_update(username,userData))]
+
 ###
 ### functions to process Groups section of configuration file
 ###
@@ -356,60 +576,72 @@ def process_groups_section():
 
 # display a list of all Artifactory Instance Groups
 def process_groups_list():
-    print('\nList of Groups:')
-    print(str(groups_list()))
+    print('\n'.join(operation_groups_list()))
     return
 
 # display details for listed Artifactory Instance Groups
 def process_groups_detail():
-    for groupname in config['groups']['detail']:
-        print('\nDetails for Group "' + groupname + '":')
-        print(str(groups_detail(groupname)))
+    run_operations(operation_groups_detail, config['groups']['detail'])
     return
 
 # delete listed Artifactory Instance Groups
 def process_groups_delete():
-    for groupname in config['groups']['delete']:
-        print('\nDeleting Group "' + groupname + '"')
-        print('Results: ' + str(groups_delete(groupname)))
+    run_operations(operation_groups_delete, config['groups']['delete'])
     return
 
 def process_groups_create():
-    for groupname in config['groups']['create']:
-        groupData = config['groups']['create'][groupname]
-        print('\nCreating Group "' + groupname + '" with data:')
-        print(str(groupData))
-        print('\nResults:\n' +str(groups_create(groupname,groupData)))
+    run_operations(operation_groups_create, config['groups']['create'])
     return
 
 def process_groups_createFromFile():
-    for groupname in config['groups']['create']:
-        with open(groupFileName, 'r') as group_file:
-            groupname = os.path.splitext(group_file)[0]
-            groupData = group_file.read()
-            print('\nCreating Group "' + groupname + '" with data:')
-            print(str(groupData))
-            print('\nResults:\n' +str(groups_create(groupname,groupData)))
+    run_operations(operation_groups_createFromFile, config['groups']['createFromFile'])
     return
 
 def process_groups_update():
-    for groupname in config['groups']['update']:
-        groupData = config['groups']['update'][groupname]
-        print('\nUpdating Group "' + groupname + '" with data:')
-        print(str(groupData))
-        print('\nResults:\n' +str(groups_update(groupname,groupData)))
+    run_operations(operation_groups_update, config['groups']['update'])
     return
 
-def process_groups_update():
-    for groupFileName in config['groups']['updateFromFile']:
-        with open(groupFileName, 'r') as group_file:
-            groupname = os.path.splitext(group_file)[0]
-            groupData = group_file.read()
-            print('\nUpdating Group "' + groupname + '" with data:')
-            print(str(groupData))
-            print('\nResults:\n' +str(groups_update(groupname,groupData)))
+def process_groups_updateFromFile():
+    run_operations(operation_groups_updateFromFile, config['groups']['updateFromFile'])
     return
 
+def operation_groups_list():
+    return list_lines('\nList of Groups:', groups_list() if arguments.output == 'text' else groups_iter())
+
+def operation_groups_detail(groupname):
+    if groupname == '*':
+        return list_lines('\nDetails for all Groups:', groups_detail_all())
+    return ['\nDetails for Group "' + groupname + '":',
+            str(groups_detail(groupname))]
+
+def operation_groups_delete(groupname):
+    return ['\nDeleting Group "' + groupname + '"',
+            'Results: ' + str(groups_delete(groupname))]
+
+def operation_groups_create(groupname):
+    groupData = config['groups']['create'][groupname]
+    return ['\nCreating Group "' + groupname + '" with data:',
+            str(groupData),
+            '\nResults:\n' + str(groups_create(groupname,groupData))]
+
+def operation_groups_createFromFile(groupFileName):
+    groupname, groupData = read_entity_file(groupFileName)
+    return ['\nCreating Group "' + groupname + '" with data:',
+            str(groupData),
+            '\nResults:\n' + str(groups_create(groupname,groupData))]
+
+def operation_groups_update(groupname):
+    groupData = config['groups']['update'][groupname]
+    return ['\nUpdating Group "' + groupname + '" with data:',
+            str(groupData),
+            '\nResults:\n' + str(groups_update(groupname,groupData))]
+
+def operation_groups_updateFromFile(groupFileName):
+    groupname, groupData = read_entity_file(groupFileName)
+    return ['\nUpdating Group "' + groupname + '" with data:',
+            str(groupData),
+            '\nResults:\n' + str(groups_update(groupname,groupData))]
+
 ###
 ### functions to process Repositories section of configuration file
 ###
@@ -424,73 +656,99 @@ def process_repos_section():
     if 'create' in config['repositories']:
         process_repos_create()
     if 'createFromFile' in config['repositories']:
-        process_repositories_createFromFile()
+        process_repos_createFromFile()
     if 'update' in config['repositories']:
         process_repos_update()
     if 'updateFromFile' in config['repositories']:
         process_repos_updateFromFile()
+    if 'patch' in config['repositories']:
+        process_repos_patch()
     return
 
 # display a list of all Artifactory Instance Repositories
 # or all Repositories of listed Types
 def process_repos_list():
     if type(config['repositories']['list']) is list:
-         for repoType in config['repositories']['list']:
-            print('\nList of Repositories of Type "' + repoType + '":')
-            print(str(repos_list(repoType)))
+        run_operations(operation_repos_list, config['repositories']['list'])
     else:
-        print('\nList of Repositories:')
-        print(str(repos_list('')))
+        run_operations(operation_repos_list, [''])
     return
 
 def process_repos_detail():
-    for reponame in config['repositories']['detail']:
-        print('\nDetails for Repository "' + reponame + '":')
-        print(str(repos_detail(reponame)))
+    run_operations(operation_repos_detail, config['repositories']['detail'])
     return
 
 def process_repos_delete():
-    for repoKey in config['repositories']['delete']:
-        print('\nDeleting Repository "' + repoKey + '"')
-        print('Results: ' + str(repos_delete(repoKey)))
+    run_operations(operation_repos_delete, config['repositories']['delete'])
     return
 
 def process_repos_create():
-    for repoKey in config['repositories']['create']:
-        repoData = config['repositories']['create'][repoKey]
-        print('\nCreating Repository "' + repoKey + '" with data:')
-        print(str(repoData))
-        print('\nResults:\n' +str(repos_create(repoKey,repoData)))
+    run_operations(operation_repos_create, config['repositories']['create'])
     return
 
 def process_repos_createFromFile():
-    for repoFileName in config['repositories']['create']:
-        with open(repoFileName, 'r') as repo_file:
-            repoKey = os.path.splitext(repo_file)[0]
-            repoData = repo_file.read()
-            print('\nCreating Repository "' + repoKey + '" with data:')
-            print(str(repoData))
-            print('\nResults:\n' +str(repos_create(repoKey,repoData)))
+    run_operations(operation_repos_createFromFile, config['repositories']['createFromFile'])
     return
 
 def process_repos_update():
-    for repoKey in config['repositories']['update']:
-        repoData = config['repositories']['update'][repoKey]
-        print('\nUpdating Repository "' + repoKey + '" with data:')
-        print(str(repoData))
-        print('\nResults:\n' +str(repos_update(repoKey,repoData)))
+    run_operations(operation_repos_update, config['repositories']['update'])
     return
 
 def process_repos_updateFromFile():
-    for repoFileName in config['repositories']['updateFromFile']:
-        with open(repoFileName, 'r') as repo_file:
-            repoKey = os.path.splitext(repo_file)[0]
-            repoData = repo_file.read()
-            print('\nUpdating Repository "' + repoKey + '" with data:')
-            print(str(repoData))
-            print('\nResults:\n' +str(repos_update(repoKey,repoData)))
+    run_operations(operation_repos_updateFromFile, config['repositories']['updateFromFile'])
     return
 
+# change fields of many Repositories with one configuration patch
+def process_repos_patch():
+    print('\n'.join(operation_repos_patch()))
+    return
+
+# an empty repoType lists Repositories of all Types
+def operation_repos_list(repoType):
+    if not repoType:
+        return list_lines('\nList of Repositories:', repos_list('') if arguments.output == 'text' else repos_iter(''))
+    return list_lines('\nList of Repositories of Type "' + repoType + '":', repos_list(repoType) if arguments.output == 'text' else repos_iter(repoType))
+
+def operation_repos_detail(reponame):
+    if reponame == '*':
+        return list_lines('\nDetails for all Repositories:', repos_detail_all())
+    return ['\nDetails for Repository "' + reponame + '":',
+            str(repos_detail(reponame))]
+
+def operation_repos_delete(repoKey):
+    return ['\nDeleting Repository "' + repoKey + '"',
+            'Results: ' + str(repos_delete(repoKey))]
+
+def operation_repos_create(repoKey):
+    repoData = config['repositories']['create'][repoKey]
+    return ['\nCreating Repository "' + repoKey + '" with data:',
+            str(repoData),
+            '\nResults:\n' + str(repos_create(repoKey,repoData))]
+
+def operation_repos_createFromFile(repoFileName):
+    repoKey, repoData = read_entity_file(repoFileName)
+    return ['\nCreating Repository "' + repoKey + '" with data:',
+            str(repoData),
+            '\nResults:\n' + str(repos_create(repoKey,repoData))]
+
+def operation_repos_update(repoKey):
+    repoData = config['repositories']['update'][repoKey]
+    return ['\nUpdating Repository "' + repoKey + '" with data:',
+            str(repoData),
+            '\nResults:\n' + str(repos_update(repoKey,repoData))]
+
+def operation_repos_updateFromFile(repoFileName):
+    repoKey, repoData = read_entity_file(repoFileName)
+    return ['\nUpdating Repository "' + repoKey + '" with data:',
+            str(repoData),
+            '\nResults:\n' + str(repos_update(repoKey,repoData))]
+
+def operation_repos_patch():
+    changes = config['repositories']['patch']
+    return ['\nPatching ' + str(len(changes)) + ' Repositories with data:',
+            str(changes),
+            '\nResults:\n' + str(repos_patch(changes))]
+
 ###
 ### functions to process Permissions section of configuration file
 ###
@@ -509,38 +767,307 @@ def process_permissions_section():
     return
 
 def process_permissions_list():
-    print('\nList of Permissions:')
-    print(str(permissions_list()))
+    print('\n'.join(operation_permissions_list()))
     return
 
 def process_permissions_detail():
-    for permissionname in config['permissions']['detail']:
-        print('\nDetails for Permission "' + permissionname + '":')
-        print(str(permissions_detail(permissionname)))
+    run_operations(operation_permissions_detail, config['permissions']['detail'])
     return
 
 def process_permissions_delete():
-    for permissionname in config['permissions']['delete']:
-        print('\nDeleting Permission "' + permissionname + '"')
-        print('Results: ' + str(permissions_delete(permissionname)))
+    run_operations(operation_permissions_delete, config['permissions']['delete'])
     return
 
 def process_permissions_create():
-    for permissionname in config['permissions']['create']:
-        permissionData = config['permissions']['create'][permissionname]
-        print('\nCreating Permission "' + permissionname + '" with data:')
-        print(str(permissionData))
-        print('\nResults:\n' +str(permissions_create(permissionname,permissionData)))
+    run_operations(operation_permissions_create, config['permissions']['create'])
     return
 
 def process_permissions_createFromFile():
-    for permissionname in config['permissions']['create']:
-        with open(permissionFileName, 'r') as permission_file:
-            permissionname = os.path.splitext(permission_file)[0]
-            permissionData = permission_file.read()
-            print('\nCreating Permission "' + permissionname + '" with data:')
-            print(str(permissionData))
-            print('\nResults:\n' +str(permissions_create(permissionname,permissionData)))
+    run_operations(operation_permissions_createFromFile, config['permissions']['createFromFile'])
+    return
+
+def operation_permissions_list():
+    return list_lines('\nList of Permissions:', permissions_list() if arguments.output == 'text' else permissions_iter())
+
+def operation_permissions_detail(permissionname):
+    if permissionname == '*':
+        return list_lines('\nDetails for all Permissions:', permissions_detail_all())
+    return ['\nDetails for Permission "' + permissionname + '":',
+            str(permissions_detail(permissionname))]
+
+def operation_permissions_delete(permissionname):
+    return ['\nDeleting Permission "' + permissionname + '"',
+            'Results: ' + str(permissions_delete(permissionname))]
+
+def operation_permissions_create(permissionname):
+    permissionData = config['permissions']['create'][permissionname]
+    return ['\nCreating Permission "' + permissionname + '" with data:',
+            str(permissionData),
+            '\nResults:\n' + str(permissions_create(permissionname,permissionData))]
+
+def operation_permissions_createFromFile(permissionFileName):
+    permissionname, permissionData = read_entity_file(permissionFileName)
+    return ['\nCreating Permission "' + permissionname + '" with data:',
+            str(permissionData),
+            '\nResults:\n' + str(permissions_create(permissionname,permissionData))]
+
+###
+### functions to schedule operations by dependency (--dag)
+###
+
+# configuration file sections handled by the operation graph, and the prefix of their operation_ functions
+GRAPH_SECTIONS = (('users', 'users'), ('groups', 'groups'), ('repositories', 'repos'), ('permissions', 'permissions'))
+
+# write actions, in the order they are applied to the same entity
+WRITE_ACTIONS = ('delete', 'create', 'createFromFile', 'update', 'updateFromFile')
+
+# one operation in the graph; it runs once every prerequisite node has finished
+class OperationNode:
+    def __init__(self, operation, args, prerequisites):
+        self.operation = operation
+        self.args = args
+        self.prerequisites = prerequisites
+
+# entity data is either a dict from the configuration file or the JSON text of an entity file
+# source names the data in the error; data which is not a JSON object stops the run before anything is written
+def parse_entity_data(data, source):
+    if isinstance(data, dict):
+        return data
+    try:
+        parsed = json.loads(data)
+    except (TypeError, ValueError) as error:
+        sys.exit('Invalid entity data in ' + source + ': ' + str(error))
+    if not isinstance(parsed, dict):
+        sys.exit('Invalid entity data in ' + source + ': not a JSON object')
+    return parsed
+
+# where the data of a write comes from, for error messages
+def entity_source(section, action, item):
+    if action.endswith('FromFile'):
+        return 'file ' + item
+    return section + ' ' + action + ' "' + item + '"'
+
+# (section, name) of the entities the given entity data refers to and which must exist first
+def entity_references(section, data):
+    references = []
+    if section == 'users':
+        references += [('groups', groupname) for groupname in data.get('groups', [])]
+    if section == 'repositories':
+        # members of a virtual repository
+        references += [('repositories', repoKey) for repoKey in data.get('repositories', [])]
+    if section == 'permissions':
+        references += [('repositories', repoKey) for repoKey in data.get('repositories', [])]
+        principals = data.get('principals', {})
+        references += [('users', username) for username in principals.get('users', {})]
+        references += [('groups', groupname) for groupname in principals.get('groups', {})]
+    return references
+
+# build the operation graph for the entity sections of the configuration file
+# nodes are keyed by (section, action, item); edges order
+#   - list and detail reads of a section before any write in that section
+#   - writes to one entity in WRITE_ACTIONS order
+#   - writes to an entity after writes to the entities it refers to (groups of a user,
+#     members of a virtual repository, repositories and principals of a permission)
+def build_operation_graph():
+    graph = {}
+    entityWrites = {}
+    entityData = {}
+
+    for section, prefix in GRAPH_SECTIONS:
+        if section not in config:
+            continue
+        sectionConfig = config[section]
+
+        reads = []
+        if 'list' in sectionConfig:
+            if section == 'repositories':
+                repoTypes = sectionConfig['list'] if type(sectionConfig['list']) is list else ['']
+                for repoType in repoTypes:
+                    graph[(section, 'list', repoType)] = OperationNode(operation_repos_list, (repoType,), [])
+                    reads.append((section, 'list', repoType))
+            else:
+                graph[(section, 'list', None)] = OperationNode(globals()['operation_' + prefix + '_list'], (), [])
+                reads.append((section, 'list', None))
+        for name in sectionConfig.get('detail', []):
+            graph[(section, 'detail', name)] = OperationNode(globals()['operation_' + prefix + '_detail'], (name,), [])
+            reads.append((section, 'detail', name))
+
+        for action in WRITE_ACTIONS:
+            if action not in sectionConfig:
+                continue
+            for item in sectionConfig[action]:
+                data = None
+                if action.endswith('FromFile'):
+                    name, data = read_entity_file(item)
+                else:
+                    name = item
+                    if action != 'delete':
+                        data = sectionConfig[action][item]
+                key = (section, action, item)
+                writes = entityWrites.setdefault((section, name), [])
+                graph[key] = OperationNode(globals()['operation_' + prefix + '_' + action], (item,), reads + writes)
+                writes.append(key)
+                if data is not None:
+                    entityData.setdefault((section, name), {}).update(parse_entity_data(data, entity_source(section, action, item)))
+
+        # the Repositories patch changes existing Repositories, after all other Repository writes
+        if 'patch' in sectionConfig:
+            sectionWrites = [key for writes in entityWrites.values() for key in writes if key[0] == section]
+            graph[(section, 'patch', None)] = OperationNode(globals()['operation_' + prefix + '_patch'], (), reads + sectionWrites)
+
+    for (section, name), data in entityData.items():
+        for reference in entity_references(section, data):
+            for key in entityWrites[(section, name)]:
+                if key[1] != 'delete':
+                    graph[key].prerequisites = graph[key].prerequisites + entityWrites.get(reference, [])
+
+    return graph
+
+# run the entity sections of the configuration file as one operation graph
+def process_operation_graph():
+    run_operation_graph(build_operation_graph())
+    return
+
+# run every node of the graph as soon as its prerequisites have finished, up to --jobs at once
+# output is printed as each operation completes
+def run_operation_graph(graph):
+    dependents = dict((key, []) for key in graph)
+    waitingOn = {}
+    for key, node in graph.items():
+        waitingOn[key] = len(node.prerequisites)
+        for prerequisite in node.prerequisites:
+            dependents[prerequisite].append(key)
+
+    pool = ThreadPoolExecutor(max_workers=arguments.jobs)
+    running = {}
+    def start(key):
+        node = graph[key]
+        operation = tracer.wrap(node.operation, 'entity') if tracer else node.operation
+        running[pool.submit(operation, *node.args)] = key
+
+    for key in graph:
+        if waitingOn[key] == 0:
+            start(key)
+    finished = 0
+    while running:
+        done, notDone = wait(list(running), return_when=FIRST_COMPLETED)
+        for future in done:
+            key = running.pop(future)
+            lines = future.result()
+            if lines:
+                with outputLock:
+                    print('\n'.join(lines))
+            finished += 1
+            for dependent in dependents[key]:
+                waitingOn[dependent] -= 1
+                if waitingOn[dependent] == 0:
+                    start(dependent)
+    pool.shutdown()
+
+    if finished < len(graph):
+        blocked = [key for key in graph if waitingOn[key] > 0]
+        sys.exit('Circular dependencies between configuration file entities: ' + str(blocked))
+    return
+
+###
+### functions to plan changes against the live state of the instance (--plan)
+###
+
+# per section: function listing the live entities, field naming them in the list, function returning their details
+PLAN_SECTIONS = (('users', 'Users', lambda: users_list(), 'name', users_detail),
+                 ('groups', 'Groups', lambda: groups_list(), 'name', groups_detail),
+                 ('repositories', 'Repositories', lambda: repos_list(''), 'key', repos_detail),
+                 ('permissions', 'Permissions', lambda: permissions_list(), 'name', permissions_detail))
+
+# fields which can be written but are never returned by the API
+WRITE_ONLY_FIELDS = ('password',)
+
+# True if every value in desired is already present in live; lists compare regardless of order
+def matches_live_state(desired, live):
+    if isinstance(desired, dict):
+        if not isinstance(live, dict):
+            return False
+        for field in desired:
+            if field in WRITE_ONLY_FIELDS:
+                continue
+            if field not in live or not matches_live_state(desired[field], live[field]):
+                return False
+        return True
+    if isinstance(desired, list) and isinstance(live, list):
+        return sorted(json.dumps(value, sort_keys=True) for value in desired) == sorted(json.dumps(value, sort_keys=True) for value in live)
+    return desired == live
+
+# True if replacing live with desired (a create of an existing entity) would change it: desired differs from live,
+# or live has fields, other than its name, which desired leaves out
+def replaces_live_state(desired, live, nameField):
+    if not matches_live_state(desired, live):
+        return True
+    return any(field != nameField and field not in desired for field in live)
+
+# read the live state of the entities the configuration file writes, and drop every write which would not change anything
+# the pruned configuration is then processed as usual
+def plan_configuration():
+    for section, title, listFunction, nameField, detailFunction in PLAN_SECTIONS:
+        if section not in config:
+            continue
+        sectionConfig = config[section]
+
+        # collect writes in apply order as (action, item, name, data)
+        writes = []
+        for action in WRITE_ACTIONS:
+            for item in sectionConfig.get(action, []):
+                if action.endswith('FromFile'):
+                    name, data = read_entity_file(item)
+                    data = parse_entity_data(data, entity_source(section, action, item))
+                elif action == 'delete':
+                    name, data = item, None
+                else:
+                    name, data = item, parse_entity_data(sectionConfig[action][item], entity_source(section, action, item))
+                writes.append((action, item, name, data))
+        if not writes:
+            continue
+
+        # one list call, then details only for existing entities with desired data
+        existing = set(entry[nameField] for entry in listFunction())
+        detailNames = sorted(set(name for action, item, name, data in writes if data is not None and name in existing))
+        details = dict(zip(detailNames, map_operations(detailFunction, detailNames)))
+
+        print('\nPlan for ' + title + ':')
+        kept = set()
+        changing = set()
+        skipped = 0
+        for action, item, name, data in writes:
+            # once an entity is written, later writes to it can not be compared with the live state
+            if name in changing:
+                reason = 'after earlier change'
+            elif action == 'delete':
+                reason = 'exists' if name in existing else None
+            elif name not in existing:
+                reason = 'new'
+            elif action.startswith('create') and not destructive:
+                print('  ' + action + ' "' + name + '": skipped (exists; destructive flag is not set)')
+                skipped += 1
+                continue
+            elif action.startswith('create'):
+                # a create replaces the whole entity, so fields it leaves out are reset as well
+                reason = 'would replace' if replaces_live_state(data, details[name], nameField) else None
+            elif matches_live_state(data, details[name]):
+                reason = None
+            else:
+                reason = 'changed'
+            if reason:
+                kept.add((action, item))
+                changing.add(name)
+                print('  ' + action + ' "' + name + '": ' + reason)
+        print('  ' + str(len(writes) - len(kept) - skipped) + ' of ' + str(len(writes)) + ' writes unchanged, ' + str(skipped) + ' skipped')
+
+        for action in WRITE_ACTIONS:
+            if action not in sectionConfig:
+                continue
+            if isinstance(sectionConfig[action], dict):
+                sectionConfig[action] = dict((item, data) for item, data in sectionConfig[action].items() if (action, item) in kept)
+            else:
+                sectionConfig[action] = [item for item in sectionConfig[action] if (action, item) in kept]
     return
 
 ###
@@ -576,6 +1103,9 @@ if __name__ == "__main__":
                           %(prog)s artCongif.json -u admin hostname.company.com
                           %(prog)s artCongif.json https://hostname.company.com:5000/ServerPublicContext
                           %(prog)s artConfig.json --configFile artConfig.json -D
+                          %(prog)s --configFile artConfig.json --jobs 16 --dag
+                          %(prog)s --configFile artConfig.json --plan
+                          %(prog)s --configFile permissions.json --inventory instances.json --targets prod --fanOut 8
                       '''))  
     
     main_parser.add_argument('-c', '--configFile', required=False, help='configuration JSON file')
@@ -586,10 +1116,52 @@ if __name__ == "__main__":
                                                                                                                   
     main_parser.add_argument('-p', '--password', required=False, help='password for Artifactory authentication')
                                                                                                                   
+    main_parser.add_argument('--apiKey', required=False, help='API key to authenticate with instead of the password; default: $ARTIFACTORY_API_KEY, else apiKey of the artifactory section')
+
+    main_parser.add_argument('--accessToken', required=False, help='access token to authenticate with instead of the password; default: $ARTIFACTORY_ACCESS_TOKEN, else accessToken of the artifactory section')
+
+    main_parser.add_argument('-T', '--token', required=False, action='store_true', default=False, help='flag to exchange the password for an access token, cached for later runs in --tokenDirectory and renewed before it expires')
+
+    main_parser.add_argument('--tokenDirectory', required=False, help='directory access tokens are cached in with --token; default: ~/.artifactory/tokens')
+                                                                                                                  
     main_parser.add_argument('-D', '--destructive', required=False, action='store_true', default=False, help='flag to allow destruction and replacement of any conficting resources')
 
     main_parser.add_argument('-S', '--safe', required=False, action='store_true', default=False, help='flag to prevent destruction and replacement of any conficting resources; overrides destructive flag')
 
+    main_parser.add_argument('-j', '--jobs', required=False, type=int, default=1, help='number of entity operations to run concurrently within a section')
+
+    main_parser.add_argument('--dag', required=False, action='store_true', default=False, help='flag to run Users, Groups, Repositories and Permissions operations as soon as the entities they depend on are in place, instead of section by section')
+
+    main_parser.add_argument('-P', '--plan', required=False, action='store_true', default=False, help='flag to compare Users, Groups, Repositories and Permissions with the live instance first, and only send the writes which change something')
+
+    main_parser.add_argument('--planOnly', required=False, action='store_true', default=False, help='flag to display the plan (see --plan) without applying it')
+
+    main_parser.add_argument('--cacheTTL', required=False, type=int, default=0, help='seconds to reuse list and detail responses within the run; writes invalidate them; default: 0 (disabled)')
+
+    main_parser.add_argument('--cacheDirectory', required=False, help='directory to keep detail responses in between runs, revalidated with conditional requests so unchanged entities are not sent again')
+
+    main_parser.add_argument('--cacheMaxBytes', required=False, type=int, help='size beyond which the least recently used --cacheDirectory entries are evicted; default: 64 MiB')
+
+    main_parser.add_argument('--retries', required=False, type=int, default=3, help='times to retry a request which failed with a connection error or 502/503/504; 0 disables')
+
+    main_parser.add_argument('--rateLimit', required=False, default='', help='requests per second by endpoint family, e.g. security=20,repositories=50,system=5')
+
+    main_parser.add_argument('--adaptive', required=False, action='store_true', default=False, help='flag to adapt the number of requests in flight (up to --jobs) to the latency and errors observed')
+
+    main_parser.add_argument('--metrics', required=False, help='file to write per-endpoint request metrics to at the end of the run')
+
+    main_parser.add_argument('--metricsFormat', required=False, default='json', choices=['json', 'prometheus'], help='format of the --metrics file')
+
+    main_parser.add_argument('--trace', required=False, help='file to write an OpenTelemetry JSON trace of the run to, with spans per section, entity operation and HTTP request')
+
+    main_parser.add_argument('-o', '--output', required=False, default='text', choices=('text',) + artifactoryOutput.OUTPUT_FORMATS, help='format of list results; jsonl, json and table write them one record at a time')
+
+    main_parser.add_argument('--inventory', required=False, help='JSON inventory of Artifactory instances; apply configFile to all of them (or the --targets ones) instead of targetServer')
+
+    main_parser.add_argument('--targets', required=False, help='comma-separated names or tags of the --inventory targets to apply configFile to')
+
+    main_parser.add_argument('--fanOut', required=False, type=int, default=4, help='number of --inventory targets configured concurrently')
+
     main_parser.add_argument('--debug', required=False, action='store_true', default=False, help='flag include debug information in output')
 
 
@@ -627,15 +1199,46 @@ if __name__ == "__main__":
         print('\n=== config-file:')
         print(config)
 
+    ###
+    ### fan-out to the instances of an inventory
+    ###
+
+    if arguments.inventory:
+        failedTargets = run_fan_out()
+        print('\n' + os.path.basename(sys.argv[0]) + ' complete.\n')
+        sys.exit(1 if failedTargets else 0)
+
     ###
     ### setup API & program modes
     ###
         
     artifactory_baseURL = get_artifactory_baseURL()
     artifactory_username = get_artifactory_username()
-    artifactory_password = get_artifactory_password()
-
-    artifactoryAPI = artifactoryAPI.ArtifactoryAPI(artifactory_baseURL, artifactory_username, artifactory_password)
+    artifactory_auth = get_artifactory_auth()
+    artifactory_password = None
+    if password_needed(artifactory_baseURL, artifactory_username, artifactory_auth):
+        artifactory_password = get_artifactory_password()
+
+    # keep one pooled connection per concurrent job
+    artifactoryAPI = artifactoryAPI.ArtifactoryAPI(artifactory_baseURL, artifactory_username, artifactory_password, poolMaxSize=max(arguments.jobs, 10), cacheTTL=arguments.cacheTTL, retries=arguments.retries,
+                                                   rateLimits=get_rate_limits(), adaptiveConcurrency=arguments.jobs if arguments.adaptive else None,
+                                                   **dict(cache_options(), **artifactory_auth))
+
+    metrics = None
+    if arguments.metrics:
+        metrics = artifactoryMetrics.MetricsCollector()
+        artifactoryAPI.add_request_hook(metrics)
+
+    tracer = None
+    if arguments.trace:
+        tracer = artifactoryTrace.Tracer(os.path.basename(sys.argv[0]))
+        artifactoryAPI.add_request_hook(tracer.request_hook)
+        artifactoryAPI.add_task_wrapper(tracer.propagate)
+
+    # worker pool for entity operations; None runs them one at a time
+    executor = None
+    if arguments.jobs > 1:
+        executor = ThreadPoolExecutor(max_workers=arguments.jobs)
 
     # get value of destructive flag
     # if True, creates over-write existing objects with the same identifier and type
@@ -650,27 +1253,55 @@ if __name__ == "__main__":
     print('\nTarget Artifactory Instance: ' + artifactory_baseURL)
     
     if 'artifactory' in config:
-        process_artifactory_section()
+        run_section(process_artifactory_section)
 
     if 'license' in config:
-        process_license_section()
+        run_section(process_license_section)
+
+    if arguments.plan or arguments.planOnly:
+        run_section(plan_configuration)
 
-    if 'users' in config:
-        process_users_section()
+    # the Artifactory and License sections always run first; a License must be in place for anything else
+    if arguments.planOnly:
+        print('\nPlan only; no changes applied.')
 
-    if 'groups' in config:
-        process_groups_section()
+    elif arguments.dag:
+        run_section(process_operation_graph)
 
-    if 'repositories' in config:
-        process_repos_section()
+    else:
+        if 'users' in config:
+            run_section(process_users_section)
+
+        if 'groups' in config:
+            run_section(process_groups_section)
+
+        if 'repositories' in config:
+            run_section(process_repos_section)
 
-    if 'permissions' in config:
-        process_permissions_section()
+        if 'permissions' in config:
+            run_section(process_permissions_section)
 
     ###
     ### cleanup and exit
     ###
 
+    if executor:
+        executor.shutdown()
+    if tracer:
+        tracer.write(arguments.trace)
+        print('\nTrace written to ' + arguments.trace)
+    if metrics:
+        with open(arguments.metrics, 'w') as metrics_file:
+            if arguments.metricsFormat == 'prometheus':
+                metrics_file.write(metrics.prometheus_text())
+            else:
+                metrics_file.write(metrics.json_summary())
+        print('\nRequest metrics written to ' + arguments.metrics)
+    if debug:
+        print('\n=== cache statistics:')
+        print(artifactoryAPI.cache_statistics())
+    artifactoryAPI.close()
+
     print('\n' + os.path.basename(sys.argv[0]) + ' complete.\n')
 
 ### EOF
@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+
+import os
+import gzip
+import json
+import time
+import random
+import hashlib
+import binascii
+import threading
+import collections
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit, parse_qs
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit, parse_qs
+
+# minimal configuration descriptor served until one is posted
+EMPTY_DESCRIPTOR = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<config xmlns="http://artifactory.jfrog.org/xsd/1.7.1"><offlineMode>false</offlineMode></config>\n')
+
+# security collections by management API path, with the field naming their entities in lists
+SECURITY_COLLECTIONS = (('security/users', 'name'), ('security/groups', 'name'), ('security/permissions', 'name'))
+
+# bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls on reused connections
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # simulated cost of accepting a new connection (stands in for TCP+TLS handshake and auth)
+        time.sleep(self.server.stub.handshakeDelay)
+        with self.server.stub.lock:
+            self.server.stub.connections += 1
+        BaseHTTPRequestHandler.setup(self)
+
+    def log_message(self, format, *args):
+        return
+
+    def send_body(self, status, body, contentType='application/json', headers=None):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        compress = (self.server.stub.compression and len(body) >= GZIP_MIN_SIZE
+                    and 'gzip' in self.headers.get('Accept-Encoding', ''))
+        if compress:
+            body = gzip.compress(body, 1)
+        self.send_response(status)
+        self.send_header('Content-Type', contentType)
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_json(self, status, value, headers=None):
+        self.send_body(status, json.dumps(value), headers=headers)
+
+    def handle_any(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        with stub.lock:
+            stub.requests += 1
+            stub.inFlight += 1
+            stub.maxInFlight = max(stub.maxInFlight, stub.inFlight)
+
+        delay = stub.latency + random.uniform(0, stub.latencyJitter)
+        try:
+            if delay:
+                time.sleep(delay)
+        finally:
+            with stub.lock:
+                stub.inFlight -= 1
+        with stub.lock:
+            failing = stub.failNext > 0 or (stub.errorRate and random.random() < stub.errorRate)
+            if failing:
+                stub.failNext = max(0, stub.failNext - 1)
+                stub.errors += 1
+        if failing:
+            return self.send_json(stub.errorStatus, {'errors': [{'status': stub.errorStatus, 'message': 'injected error'}]},
+                                  headers={'Retry-After': stub.retryAfter})
+
+        # access tokens must be ones the stub issued and still valid; other credentials are accepted unchecked
+        authorization = self.headers.get('Authorization', '')
+        if authorization.startswith('Bearer '):
+            with stub.lock:
+                expires = stub.tokens.get(authorization[len('Bearer '):])
+            if expires is None or expires < time.time():
+                return self.send_json(401, {'errors': [{'status': 401, 'message': 'Bad credentials'}]})
+        elif authorization.startswith('Basic '):
+            with stub.lock:
+                stub.passwordChecks += 1
+
+        url = urlsplit(self.path)
+        prefix = stub.contextPath + '/api/'
+        if not url.path.startswith(prefix):
+            return stub.handle_artifact(self, url.path[len(stub.contextPath) + 1:], body)
+        stub.handle_api(self, url.path[len(prefix):], parse_qs(url.query), body)
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_PATCH = do_DELETE = handle_any
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+# in-process mock of the Artifactory REST endpoints used by ArtifactoryAPI, keeping its entities in memory
+#   latency, latencyJitter: seconds added to every response (fixed, plus a uniform random part)
+#   errorRate: fraction of requests answered with errorStatus instead (error injection)
+#   handshakeDelay: seconds spent accepting each new connection
+#   compression: gzip response bodies for clients which accept it
+class ArtifactoryStub:
+
+    def __init__(self, latency=0.0, latencyJitter=0.0, errorRate=0.0, errorStatus=503, handshakeDelay=0.0, contextPath='/artifactory',
+                 compression=True):
+        self.latency = latency
+        self.latencyJitter = latencyJitter
+        self.errorRate = errorRate
+        self.errorStatus = errorStatus
+        # number of coming requests to answer with errorStatus regardless of errorRate, and the Retry-After they carry
+        self.failNext = 0
+        self.retryAfter = '0'
+        self.handshakeDelay = handshakeDelay
+        self.contextPath = contextPath
+        self.compression = compression
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        # requests waiting out their simulated latency at once, now and at most
+        self.inFlight = 0
+        self.maxInFlight = 0
+        self.errors = 0
+        self.passwordChecks = 0
+        # deployed artifacts ('repoKey/path' -> SHA-1), the checksums of stored content by SHA-1, and the bytes
+        # of content received
+        self.artifacts = {}
+        self.filestore = {}
+        self.bytesUploaded = 0
+        # access token -> expiry (epoch seconds), refresh token -> access token
+        self.tokens = {}
+        self.refreshTokens = {}
+        self.repositories = collections.OrderedDict()
+        self.security = dict((path, collections.OrderedDict()) for path, nameField in SECURITY_COLLECTIONS)
+        self.license = {'type': 'Commercial', 'validThrough': 'never', 'licensedTo': 'stub'}
+        self.descriptor = EMPTY_DESCRIPTOR
+        # bodies of the configuration patches received, in order
+        self.configurationPatches = []
+        self.server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+
+    # start serving on a free local port; returns the base URL to give ArtifactoryAPI
+    def start(self):
+        self.server = StubServer(('127.0.0.1', 0), StubRequestHandler)
+        self.server.stub = self
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self.base_url()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def base_url(self):
+        return 'http://127.0.0.1:' + str(self.server.server_address[1]) + self.contextPath
+
+    def handle_api(self, handler, path, query, body):
+        method = handler.command
+        if path == 'system/ping':
+            return handler.send_body(200, 'OK', 'text/plain')
+        if path == 'system':
+            return handler.send_body(200, 'Artifactory stub\n', 'text/plain')
+        if path == 'system/license':
+            if method in ('PUT', 'POST'):
+                return handler.send_json(200, {'status': 'OK', 'message': 'The license has been successfully installed.'})
+            return handler.send_json(200, self.license)
+        if path == 'system/configuration':
+            if method == 'POST':
+                self.descriptor = body.decode('utf-8')
+                return handler.send_body(200, 'Reload of new configuration (' + str(len(body)) + ' bytes) succeeded', 'text/plain')
+            if method == 'PATCH':
+                self.configurationPatches.append(body.decode('utf-8'))
+                return handler.send_body(200, 'Configuration successfully patched', 'text/plain')
+            return handler.send_body(200, self.descriptor, 'application/xml')
+        if path == 'security/token' and method == 'POST':
+            return self.handle_token(handler, parse_qs(body.decode('utf-8')))
+
+        if path == 'repositories':
+            repoType = query.get('type', [''])[0].upper()
+            with self.lock:
+                entries = [{'key': key, 'type': repository.get('rclass', 'local').upper(), 'url': handler.path}
+                           for key, repository in self.repositories.items()
+                           if not repoType or repository.get('rclass', 'local').upper() == repoType]
+            return handler.send_json(200, entries)
+        if path.startswith('repositories/'):
+            return self.handle_entity(handler, self.repositories, path[len('repositories/'):], 'key', body)
+
+        for collectionPath, nameField in SECURITY_COLLECTIONS:
+            if path == collectionPath:
+                with self.lock:
+                    entries = [{nameField: name, 'uri': handler.path + '/' + name} for name in self.security[collectionPath]]
+                return handler.send_json(200, entries)
+            if path.startswith(collectionPath + '/'):
+                return self.handle_entity(handler, self.security[collectionPath], path[len(collectionPath) + 1:], nameField, body)
+
+        handler.send_json(404, {'errors': [{'status': 404, 'message': 'Not found: ' + path}]})
+
+    # detail, create (PUT), update (POST) and delete of one entity of a collection
+    def handle_entity(self, handler, collection, name, nameField, body):
+        method = handler.command
+        if method in ('GET', 'HEAD'):
+            with self.lock:
+                entity = collection.get(name)
+            if entity is None:
+                return handler.send_json(404, {'errors': [{'status': 404, 'message': name + ' not found'}]})
+            text = json.dumps(entity, sort_keys=True)
+            etag = '"' + hashlib.sha1(text.encode('utf-8')).hexdigest() + '"'
+            if handler.headers.get('If-None-Match') == etag:
+                handler.send_response(304)
+                handler.send_header('ETag', etag)
+                handler.send_header('Content-Length', '0')
+                handler.end_headers()
+                return
+            return handler.send_body(200, text, headers={'ETag': etag})
+        if method in ('PUT', 'POST'):
+            try:
+                data = json.loads(body.decode('utf-8') or '{}')
+                # tolerate payloads encoded twice, as sent by older clients
+                if not isinstance(data, dict):
+                    data = json.loads(data)
+            except ValueError:
+                return handler.send_json(400, {'errors': [{'status': 400, 'message': 'invalid JSON'}]})
+            with self.lock:
+                if method == 'POST' and name not in collection:
+                    return handler.send_json(404, {'errors': [{'status': 404, 'message': name + ' not found'}]})
+                entity = collection.get(name, {}) if method == 'POST' else {}
+                entity.update(data)
+                entity[nameField] = name
+                collection[name] = entity
+            return handler.send_body(201 if method == 'PUT' else 200, '')
+        if method == 'DELETE':
+            with self.lock:
+                found = collection.pop(name, None) is not None
+            return handler.send_body(200 if found else 404, '')
+        handler.send_json(405, {'errors': [{'status': 405, 'message': 'method not allowed'}]})
+
+    # issue an access token, or exchange a refresh token and its access token for a new pair
+    def handle_token(self, handler, form):
+        field = lambda name: form.get(name, [''])[0]
+        with self.lock:
+            if field('grant_type') == 'refresh_token':
+                if self.refreshTokens.get(field('refresh_token')) != field('access_token'):
+                    return handler.send_json(401, {'errors': [{'status': 401, 'message': 'Invalid refresh token'}]})
+                del self.refreshTokens[field('refresh_token')]
+                self.tokens.pop(field('access_token'), None)
+            expiresIn = int(field('expires_in') or 3600)
+            accessToken = binascii.hexlify(os.urandom(16)).decode('ascii')
+            self.tokens[accessToken] = time.time() + expiresIn
+            token = {'access_token': accessToken, 'expires_in': expiresIn, 'scope': 'member-of-groups:*', 'token_type': 'Bearer'}
+            if field('refreshable') != 'false':
+                token['refresh_token'] = binascii.hexlify(os.urandom(16)).decode('ascii')
+                self.refreshTokens[token['refresh_token']] = accessToken
+        handler.send_json(200, token)
+
+    # deploy (PUT) of an artifact into a repository; with X-Checksum-Deploy, only the checksums are sent, and the
+    # deploy succeeds only if content with them is stored already
+    def handle_artifact(self, handler, path, body):
+        repoKey, separator, artifactPath = path.partition('/')
+        if handler.command != 'PUT' or not artifactPath:
+            return handler.send_json(404, {'errors': [{'status': 404, 'message': 'Not found: ' + path}]})
+        with self.lock:
+            if repoKey not in self.repositories:
+                return handler.send_json(404, {'errors': [{'status': 404, 'message': 'Repository ' + repoKey + ' not found'}]})
+        sha1 = handler.headers.get('X-Checksum-Sha1')
+        if handler.headers.get('X-Checksum-Deploy') == 'true':
+            with self.lock:
+                checksums = self.filestore.get(sha1)
+            if checksums is None or handler.headers.get('X-Checksum-Sha256', checksums['sha256']) != checksums['sha256']:
+                return handler.send_json(404, {'errors': [{'status': 404, 'message': 'Checksum deploy failed: no content with checksum ' + str(sha1)}]})
+        else:
+            checksums = {'sha1': hashlib.sha1(body).hexdigest(), 'sha256': hashlib.sha256(body).hexdigest(),
+                         'md5': hashlib.md5(body).hexdigest(), 'size': len(body)}
+            for header, name in (('X-Checksum-Sha1', 'sha1'), ('X-Checksum-Sha256', 'sha256'), ('X-Checksum', 'md5')):
+                if handler.headers.get(header, checksums[name]) != checksums[name]:
+                    return handler.send_json(409, {'errors': [{'status': 409, 'message': 'Checksum mismatch: ' + name}]})
+            with self.lock:
+                self.filestore[checksums['sha1']] = checksums
+                self.bytesUploaded += len(body)
+        with self.lock:
+            self.artifacts[path] = checksums['sha1']
+        handler.send_json(201, {'repo': repoKey, 'path': '/' + artifactPath, 'size': str(checksums['size']),
+                                'downloadUri': self.base_url() + '/' + path,
+                                'checksums': {'sha1': checksums['sha1'], 'sha256': checksums['sha256'], 'md5': checksums['md5']}})
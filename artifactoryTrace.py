@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+import os
+import json
+import time
+import binascii
+import threading
+import contextlib
+
+# OpenTelemetry span kinds and status codes used in the exported JSON
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+def _random_id(size):
+    return binascii.hexlify(os.urandom(size)).decode('ascii')
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+class Span:
+
+    def __init__(self, traceId, name, parent, kind, attributes, started):
+        self.traceId = traceId
+        self.spanId = _random_id(8)
+        self.parentSpanId = parent.spanId if parent is not None else None
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.started = started
+        self.ended = None
+        self.error = None
+
+    def to_otlp(self):
+        span = {'traceId': self.traceId,
+                'spanId': self.spanId,
+                'name': self.name,
+                'kind': self.kind,
+                'startTimeUnixNano': str(int(self.started * 1e9)),
+                'endTimeUnixNano': str(int((self.ended or self.started) * 1e9)),
+                'attributes': [_attribute(key, value) for key, value in sorted(self.attributes.items())],
+                'status': {'code': STATUS_CODE_ERROR, 'message': self.error} if self.error else {'code': STATUS_CODE_OK}}
+        if self.parentSpanId:
+            span['parentSpanId'] = self.parentSpanId
+        return span
+
+# collects the spans of one run as a single trace; each thread has its own stack of active spans,
+# so spans started in a thread become children of the span active there
+# install tracer.request_hook with ArtifactoryAPI.add_request_hook to get a span per HTTP request
+class Tracer:
+
+    def __init__(self, serviceName):
+        self.serviceName = serviceName
+        self.traceId = _random_id(16)
+        self.lock = threading.Lock()
+        self.spans = []
+        self.local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    # span active in the calling thread, None if there is none
+    def current_span(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    # start a span without activating it; parent defaults to the span active in the calling thread
+    def start_span(self, name, attributes=None, parent=None, kind=SPAN_KIND_INTERNAL, started=None):
+        if parent is None:
+            parent = self.current_span()
+        span = Span(self.traceId, name, parent, kind, attributes, started if started is not None else time.time())
+        with self.lock:
+            self.spans.append(span)
+        return span
+
+    def end_span(self, span, ended=None):
+        span.ended = ended if ended is not None else time.time()
+
+    # make span the active span of the calling thread for the duration of the block
+    @contextlib.contextmanager
+    def activated(self, span):
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            stack.pop()
+
+    # start, activate and end a span around a block; an exception marks the span as failed
+    @contextlib.contextmanager
+    def span(self, name, attributes=None, parent=None):
+        span = self.start_span(name, attributes, parent)
+        try:
+            with self.activated(span):
+                yield span
+        except Exception as error:
+            span.error = repr(error)
+            raise
+        finally:
+            self.end_span(span)
+
+    # wrap function so each call runs in a span named after it, as a child of the span active now;
+    # used to carry the parent over to worker threads
+    def wrap(self, function, attributeName):
+        parent = self.current_span()
+        def traced(*args):
+            attributes = {attributeName: args[0]} if args else {}
+            with self.span(function.__name__, attributes, parent):
+                return function(*args)
+        traced.__name__ = function.__name__
+        return traced
+
+    # wrap function so it runs with the span active now as its active span, in whichever thread calls it;
+    # install with ArtifactoryAPI.add_task_wrapper so requests the client makes from its own worker threads
+    # get their parent
+    def propagate(self, function):
+        parent = self.current_span()
+        if parent is None:
+            return function
+        def propagated(*args, **kwargs):
+            with self.activated(parent):
+                return function(*args, **kwargs)
+        propagated.__name__ = function.__name__
+        return propagated
+
+    # ArtifactoryAPI request hook recording one client span per HTTP request
+    def request_hook(self, record):
+        attributes = {'http.method': record['method'],
+                      'http.url': record['url'],
+                      'artifactory.endpoint': record['endpoint'],
+                      'artifactory.attempt': record['attempt'],
+                      'http.request_content_length': record['bytesOut'],
+                      'http.response_content_length': record['bytesIn']}
+        if record['status'] is not None:
+            attributes['http.status_code'] = record['status']
+        span = self.start_span(record['method'] + ' ' + record['endpoint'], attributes, kind=SPAN_KIND_CLIENT, started=record['started'])
+        if record['status'] is None or record['status'] >= 500:
+            span.error = 'status ' + str(record['status']) if record['status'] is not None else 'no response'
+        self.end_span(span, record['started'] + record['latency'])
+
+    # the trace in OpenTelemetry (OTLP/JSON) format
+    def to_otlp(self):
+        with self.lock:
+            spans = [span.to_otlp() for span in self.spans]
+        return {'resourceSpans': [{'resource': {'attributes': [_attribute('service.name', self.serviceName)]},
+                                   'scopeSpans': [{'scope': {'name': 'artifactoryTrace'},
+                                                   'spans': spans}]}]}
+
+    def write(self, fileName):
+        with open(fileName, 'w') as trace_file:
+            json.dump(self.to_otlp(), trace_file)
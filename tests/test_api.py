@@ -0,0 +1,44 @@
+import time
+import threading
+
+import pytest
+import requests
+
+import artifactoryAPI
+import artifactoryRetry
+import artifactoryStub
+
+def test_circuit_closes_after_trial_call_fails_client_side():
+    with artifactoryStub.ArtifactoryStub(errorRate=1.0) as stub:
+        api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', retries=0,
+                                            circuitBreakerThreshold=2, circuitBreakerReset=0.1)
+        for attempt in range(2):
+            api.users_list()
+        with pytest.raises(artifactoryRetry.CircuitOpenError):
+            api.users_list()
+        time.sleep(0.2)
+
+        def failing_hook(record):
+            raise RuntimeError('hook failed')
+        # the trial call fails in a request hook, before its outcome is recorded
+        api.add_request_hook(failing_hook)
+        with pytest.raises(RuntimeError):
+            api.users_list()
+        api.remove_request_hook(failing_hook)
+        stub.errorRate = 0.0
+        assert api.users_list() == []
+        api.close()
+
+def test_concurrency_slot_is_freed_after_client_side_errors():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', adaptiveConcurrency=2)
+        for attempt in range(3):
+            with pytest.raises(requests.exceptions.InvalidURL):
+                api._send('GET', 'http://')
+        results = []
+        worker = threading.Thread(target=lambda: results.append(api.users_list()))
+        worker.daemon = True
+        worker.start()
+        worker.join(10)
+        assert results == [[]]
+        api.close()
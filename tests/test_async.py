@@ -0,0 +1,51 @@
+import asyncio
+
+import artifactoryAsyncAPI
+import artifactoryStub
+
+def test_concurrency_is_capped_at_max_concurrency():
+    async def run(baseURL):
+        async with artifactoryAsyncAPI.AsyncArtifactoryAPI(baseURL, 'admin', 'password', maxConcurrency=4) as api:
+            return await asyncio.gather(*[api.users_create('user' + str(number), {}) for number in range(24)])
+
+    with artifactoryStub.ArtifactoryStub(latency=0.02) as stub:
+        assert asyncio.run(run(stub.base_url())) == [201] * 24
+        assert stub.maxInFlight == 4
+        # one pooled connection per worker thread
+        assert stub.connections <= 4
+
+def test_results_and_errors_come_back_as_coroutines():
+    async def run(baseURL):
+        async with artifactoryAsyncAPI.AsyncArtifactoryAPI(baseURL, 'admin', 'password', maxConcurrency=2) as api:
+            await api.users_create('alice', {'email': 'alice@example.com'})
+            detail = await api.users_detail('alice')
+            names = [user['name'] for user in await api.users_list()]
+            return detail, names
+
+    with artifactoryStub.ArtifactoryStub() as stub:
+        detail, names = asyncio.run(run(stub.base_url()))
+        assert detail['email'] == 'alice@example.com'
+        assert names == ['alice']
+
+def test_close_lets_other_tasks_run():
+    async def run(baseURL):
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        api = artifactoryAsyncAPI.AsyncArtifactoryAPI(baseURL, 'admin', 'password', maxConcurrency=2)
+        calls = [asyncio.ensure_future(api.users_list()) for number in range(4)]
+        ticker = asyncio.ensure_future(tick())
+        await asyncio.sleep(0)
+        before = len(ticks)
+        await api.close()
+        ticker.cancel()
+        await asyncio.gather(*calls)
+        return len(ticks) - before
+
+    with artifactoryStub.ArtifactoryStub(latency=0.1) as stub:
+        # the calls in flight take about 0.2 seconds to finish; the ticker keeps running meanwhile
+        assert asyncio.run(run(stub.base_url())) >= 5
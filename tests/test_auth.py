@@ -0,0 +1,66 @@
+import os
+import hashlib
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import artifactoryAPI
+import artifactoryStub
+
+# run function in a daemon thread; a deadlock fails the test instead of hanging it
+def run_with_timeout(function, timeout=20):
+    results = []
+    worker = threading.Thread(target=lambda: results.append(function()))
+    worker.daemon = True
+    worker.start()
+    worker.join(timeout)
+    assert results, 'timed out'
+    return results[0]
+
+def test_token_with_adaptive_concurrency():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', useToken=True, adaptiveConcurrency=2)
+
+        def create_users():
+            with ThreadPoolExecutor(8) as executor:
+                return list(executor.map(lambda number: api.users_create('user' + str(number), {}), range(40)))
+        assert run_with_timeout(create_users) == [201] * 40
+        # one password exchange, shared by all threads
+        assert stub.passwordChecks == 1
+        assert len(stub.tokens) == 1
+
+        # a revoked token is replaced on 401, from within the request which still holds its slot
+        stub.tokens.clear()
+        assert len(run_with_timeout(api.users_list)) == 40
+        assert stub.passwordChecks == 1
+        api.close()
+
+def test_token_cache_is_shared_and_private(tmp_path):
+    directory = str(tmp_path / 'tokens')
+    with artifactoryStub.ArtifactoryStub() as stub:
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', useToken=True, tokenDirectory=directory) as api:
+            api.users_list()
+        fileNames = os.listdir(directory)
+        assert len(fileNames) == 1
+        assert stat.S_IMODE(os.stat(os.path.join(directory, fileNames[0])).st_mode) == 0o600
+        # a later client needs no password while the cached token is valid
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', None, useToken=True, tokenDirectory=directory) as api:
+            assert api.users_list() == []
+        assert stub.passwordChecks == 1
+
+def test_positioned_body_is_sent_again_from_its_position(tmp_path):
+    content = b'header--' + b'payload' * 1000
+    artifact = tmp_path / 'artifact.bin'
+    artifact.write_bytes(content)
+    with artifactoryStub.ArtifactoryStub() as stub:
+        api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', useToken=True)
+        api.repositories_create('build-local', {'key': 'build-local', 'rclass': 'local', 'packageType': 'generic'})
+        # the token is rejected, so the upload is sent again with a new one
+        stub.tokens.clear()
+        with open(str(artifact), 'rb') as artifact_file:
+            artifact_file.seek(len(b'header--'))
+            r = api._send('PUT', stub.base_url() + '/build-local/payload.bin', data=artifact_file)
+        assert r.status_code == 201
+        assert len(r.history) == 1 and r.history[0].status_code == 401
+        assert r.json()['checksums']['sha1'] == hashlib.sha1(content[len(b'header--'):]).hexdigest()
+        api.close()
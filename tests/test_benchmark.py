@@ -0,0 +1,48 @@
+import os
+import sys
+import json
+import subprocess
+
+import requests
+
+import artifactoryStub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'artifactoryBenchmark.py')
+
+# standard output of a benchmark run; retry warnings go to standard error
+def run_benchmark(*arguments):
+    # from another directory, as the benchmark must find its sibling modules on its own
+    result = subprocess.run([sys.executable, SCRIPT] + list(arguments), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            cwd=os.path.join(ROOT, 'Examples'), timeout=120)
+    output = result.stdout.decode('utf-8')
+    assert result.returncode == 0, output + result.stderr.decode('utf-8')
+    return output
+
+def test_setup_benchmark_reports_workloads():
+    results = json.loads(run_benchmark('setup', '--entities', '10', '20', '--jobs', '4', '--errorRate', '0.05', '--endpoints', '--json'))
+    assert [workload['entities'] for workload in results['workloads']] == [10, 20]
+    for workload in results['workloads']:
+        assert workload['operations'] == 4 * workload['entities']
+        # an injected error is retried with one more request, except on a (non-idempotent) update
+        assert workload['operations'] <= workload['requests'] <= workload['operations'] + workload['injectedErrors']
+        assert set(endpoint['endpoint'] for endpoint in workload['endpoints']) >= set(['security/users/{name}', 'repositories/{key}'])
+
+def test_pooling_benchmark():
+    output = run_benchmark('pooling', '--requests', '20')
+    assert 'pooled  : 20 requests' in output
+    assert 'speedup:' in output
+
+def test_stub_serves_entities_and_injects_errors():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        session = requests.Session()
+        session.auth = ('admin', 'password')
+        assert session.put(stub.base_url() + '/api/security/groups/readers', json={'description': 'readers'}).status_code == 201
+        assert session.get(stub.base_url() + '/api/security/groups/readers').json() == {'description': 'readers', 'name': 'readers'}
+        assert session.get(stub.base_url() + '/api/security/groups/writers').status_code == 404
+        assert session.delete(stub.base_url() + '/api/security/groups/readers').status_code == 200
+        stub.errorRate = 1.0
+        response = session.get(stub.base_url() + '/api/security/groups')
+        assert response.status_code == 503 and response.headers['Retry-After'] == '0'
+        assert stub.errors == 1 and stub.requests == 5
+        session.close()
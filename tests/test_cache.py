@@ -0,0 +1,52 @@
+import os
+import sys
+import subprocess
+
+import artifactoryAPI
+import artifactoryCache
+import artifactoryStub
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'artifactoryCLI.py')
+
+def test_not_modified_reuses_the_stored_body(tmp_path):
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.security['security/users']['alice'] = {'name': 'alice', 'email': 'alice@example.com'}
+        records = []
+        for run in range(2):
+            # a new client per run, as in repeated command-line runs
+            api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', cacheDirectory=str(tmp_path))
+            api.add_request_hook(records.append)
+            assert api.users_detail('alice') == {'name': 'alice', 'email': 'alice@example.com'}
+            api.close()
+        assert [record['status'] for record in records] == [200, 304]
+        assert records[1]['bytesIn'] == 0
+
+        stub.security['security/users']['alice']['email'] = 'alice@example.org'
+        api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', cacheDirectory=str(tmp_path))
+        assert api.users_detail('alice')['email'] == 'alice@example.org'
+        api.close()
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = artifactoryCache.DiskCache(str(tmp_path), maxBytes=1000)
+    body = 'x' * 300
+    for index, url in enumerate(('http://host/a', 'http://host/b')):
+        cache.put(url, '"' + url + '"', None, body)
+        os.utime(cache._path(url), (index, index))
+    # reading a marks it as recently used, so b is evicted first
+    assert cache.get('http://host/a')['body'] == body
+    cache.put('http://host/c', '"c"', None, body)
+    cache.put('http://host/d', '"d"', None, body)
+    assert cache.get('http://host/b') is None
+    assert cache.get('http://host/d')['body'] == body
+    assert cache.totalBytes <= 1000
+    assert sum(os.path.getsize(os.path.join(str(tmp_path), name)) for name in os.listdir(str(tmp_path))) <= 1000
+
+def test_cli_cache_directory(tmp_path):
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.security['security/users']['alice'] = {'name': 'alice'}
+        for run in range(2):
+            result = subprocess.run([sys.executable, SCRIPT, '-s', stub.base_url(), '-p', 'password', '--cacheDirectory', str(tmp_path),
+                                     'users', 'detail', '--name', 'alice'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=60)
+            assert result.returncode == 0, result.stdout
+            assert b"'alice'" in result.stdout
+        assert len(os.listdir(str(tmp_path))) == 1
@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+import artifactoryCLI
+import artifactoryStub
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'artifactoryCLI.py')
+
+# exit code and output of a CLI run; commands is given as its standard input
+def run_cli(*arguments, commands=None):
+    result = subprocess.run([sys.executable, SCRIPT] + list(arguments), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            input=commands.encode('utf-8') if commands is not None else b'', timeout=60)
+    return result.returncode, result.stdout.decode('utf-8')
+
+@pytest.mark.parametrize('argv, selected', [
+    (['-s', 'host', 'users', 'list'], 'users'),
+    (['--user', 'admin', '-s', 'host', 'users', 'list'], 'users'),
+    (['--serv', 'host', 'groups', 'list'], 'groups'),
+    (['-shost', '-j4', 'repositories', 'list'], 'repositories'),
+    (['-s', 'host', 'repos', 'list'], None),
+    (['--help'], None),
+    (['-s', 'host', '--jobs', 'many', 'users', 'list'], None),
+])
+def test_selected_object(argv, selected):
+    assert artifactoryCLI.selected_object(argv) == selected
+
+def test_only_the_selected_object_has_actions():
+    parser = artifactoryCLI.build_parser(['-s', 'host', 'users', 'list'])
+    assert parser.parse_args(['-s', 'host', 'users', 'list']).action == 'list'
+    with pytest.raises(SystemExit):
+        parser.parse_args(['-s', 'host', 'groups', 'list'])
+
+def test_abbreviated_main_options():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.security['security/users']['alice'] = {'name': 'alice'}
+        code, output = run_cli('--user', 'admin', '--pass', 'password', '--serv', stub.base_url(), 'users', 'list')
+        assert code == 0, output
+        assert "'alice'" in output
+
+def test_bulk_create_from_a_directory(tmp_path):
+    for number in range(6):
+        (tmp_path / ('user' + str(number) + '.json')).write_text(json.dumps({'email': 'user' + str(number) + '@example.com'}))
+    (tmp_path / 'notes.txt').write_text('not an entity')
+    (tmp_path / 'broken.json').write_text('{"email": ')
+    with artifactoryStub.ArtifactoryStub(latency=0.01) as stub:
+        code, output = run_cli('-s', stub.base_url(), '-p', 'password', '--jobs', '4', 'users', 'create', '--dir', str(tmp_path), '--glob', '*.json')
+        assert code == 0, output
+        assert sorted(stub.security['security/users']) == ['user' + str(number) for number in range(6)]
+        assert stub.security['security/users']['user3']['email'] == 'user3@example.com'
+        assert output.count('ok     ') == 6
+        assert 'FAILED ' + str(tmp_path / 'broken.json') in output
+        assert "{'failed': 1, 'files': 7, 'succeeded': 6}" in output
+        assert stub.maxInFlight > 1
+
+        # with --output, one record per file
+        code, output = run_cli('-s', stub.base_url(), '-p', 'password', '--output', 'jsonl', 'users', 'update', '--dir', str(tmp_path), '--glob', 'user*.json')
+        assert code == 0, output
+        records = [json.loads(line) for line in output.splitlines()]
+        assert sorted(record['name'] for record in records) == ['user' + str(number) for number in range(6)]
+        assert all(record['ok'] for record in records)
+
+def test_batch_runs_every_command_with_one_client(tmp_path):
+    commands = ('users create --userFile ' + str(tmp_path / 'alice.json') + '\n'
+                '# comments and blank lines are skipped\n'
+                '\n'
+                'users detail --name alice\n'
+                'groups nonsense\n'
+                'users detail --name nobody\n'
+                'users list\n')
+    (tmp_path / 'alice.json').write_text(json.dumps({'email': 'alice@example.com'}))
+    with artifactoryStub.ArtifactoryStub() as stub:
+        code, output = run_cli('-s', stub.base_url(), '-p', 'password', '--batch', '-', commands=commands)
+        # the invalid command fails, and so does the exit code; the others still run
+        assert code == 1, output
+        assert "'email': 'alice@example.com'" in output
+        assert "invalid choice: 'nonsense'" in output
+        assert "[{'name': 'alice'" in output
+        assert stub.connections == 1
+
+        batchFile = tmp_path / 'commands.txt'
+        batchFile.write_text('users list\ngroups list\n')
+        code, output = run_cli('-s', stub.base_url(), '-p', 'password', '--batch', str(batchFile))
+        assert code == 0, output
+
+def test_shell_reads_commands_until_exit():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.security['security/groups']['readers'] = {'name': 'readers'}
+        code, output = run_cli('-s', stub.base_url(), '-p', 'password', '--shell',
+                               commands='help groups\ngroups list\nexit\nusers list\n')
+        assert code == 0, output
+        assert 'usage: artifactory>' in output
+        assert "'readers'" in output
+        # nothing after exit is run
+        assert stub.requests == 1
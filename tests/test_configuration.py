@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import artifactoryAPI
+import artifactoryStub
+
+DESCRIPTOR = ('<?xml version="1.0" encoding="UTF-8"?><config xmlns="http://artifactory.jfrog.org/xsd/1.7.1">'
+              '<offlineMode>true</offlineMode></config>')
+
+def test_update_replaces_the_descriptor(tmp_path):
+    descriptorFile = tmp_path / 'config.xml'
+    descriptorFile.write_text(DESCRIPTOR)
+    with artifactoryStub.ArtifactoryStub() as stub:
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password') as api:
+            # a file object is streamed as it is
+            with open(str(descriptorFile), 'rb') as descriptor_file:
+                assert api.artifactory_configuration_update(descriptor_file) == 200
+            assert stub.descriptor == DESCRIPTOR
+            assert api.artifactory_configuration_descriptor().section('offlineMode').text == 'true'
+
+def test_patch_sends_only_the_changes():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password') as api:
+            assert api.artifactory_configuration_patch({'offlineMode': True}) == 200
+            assert api.artifactory_configuration_patch('offlineMode: false\n') == 200
+        assert json.loads(stub.configurationPatches[0]) == {'offlineMode': True}
+        assert stub.configurationPatches[1] == 'offlineMode: false\n'
+
+def test_repositories_patch_groups_changes_by_repository_type():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', cacheTTL=60) as api:
+            api.repositories_create('libs-local', {'key': 'libs-local', 'rclass': 'local'})
+            api.repositories_create('central', {'key': 'central', 'rclass': 'remote', 'url': 'https://repo1.maven.org/maven2'})
+            api.repositories_detail('libs-local')
+            assert api.repositories_patch({'libs-local': {'blackedOut': True}, 'central': {'offline': True}}) == 200
+            # the patch may have changed any repository, so cached details are read again
+            requests = stub.requests
+            api.repositories_detail('libs-local')
+            assert stub.requests == requests + 1
+            assert json.loads(stub.configurationPatches[0]) == {'localRepositories': {'libs-local': {'blackedOut': True}},
+                                                                'remoteRepositories': {'central': {'offline': True}}}
+            # one request for all repositories; an unknown key sends none
+            with pytest.raises(KeyError):
+                api.repositories_patch({'no-such-repository': {'blackedOut': True}})
+        assert len(stub.configurationPatches) == 1
@@ -0,0 +1,28 @@
+from test_setup import run_setup
+
+import artifactoryStub
+
+def test_writes_wait_for_the_entities_they_refer_to(tmp_path):
+    sections = {'permissions': {'create': {'readers': {'repositories': ['libs-local'],
+                                                       'principals': {'users': {'alice': ['r']}, 'groups': {'developers': ['r']}}}}},
+                'users': {'create': {'alice': {'email': 'alice@example.com', 'groups': ['developers']},
+                                     'bob': {'email': 'bob@example.com'}}},
+                'repositories': {'create': {'libs-local': {'rclass': 'local', 'packageType': 'maven'}}},
+                'groups': {'create': {'developers': {'description': 'developers'}}}}
+    with artifactoryStub.ArtifactoryStub(latency=0.01, latencyJitter=0.05) as stub:
+        output = run_setup(tmp_path, stub, sections, '--dag', '-j', '8')
+        position = dict((name, output.index(name)) for name in
+                        ('Creating Group "developers"', 'Creating User "alice"', 'Creating User "bob"',
+                         'Creating Repository "libs-local"', 'Creating Permission "readers"'))
+        assert position['Creating Group "developers"'] < position['Creating User "alice"']
+        for prerequisite in ('Creating User "alice"', 'Creating Group "developers"', 'Creating Repository "libs-local"'):
+            assert position[prerequisite] < position['Creating Permission "readers"']
+        assert 'readers' in stub.security['security/permissions']
+
+def test_circular_references_are_reported(tmp_path):
+    sections = {'repositories': {'create': {'first': {'rclass': 'virtual', 'repositories': ['second']},
+                                            'second': {'rclass': 'virtual', 'repositories': ['first']}}}}
+    with artifactoryStub.ArtifactoryStub() as stub:
+        output = run_setup(tmp_path, stub, sections, '--dag', returncode=1)
+        assert 'Circular dependencies between configuration file entities' in output
+        assert not stub.repositories
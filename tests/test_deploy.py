@@ -0,0 +1,55 @@
+import pytest
+import requests
+
+import artifactoryAPI
+import artifactoryAsyncAPI
+import artifactoryStub
+
+def test_missing_repository_is_not_uploaded_to():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password')
+        records = []
+        api.add_request_hook(records.append)
+        with pytest.raises(requests.HTTPError):
+            api.artifact_deploy('missing-local', 'a/b.bin', __file__)
+        # the checksum deploy only; the file is not streamed
+        assert len(records) == 1
+        assert records[0]['bytesOut'] == 0
+        api.close()
+
+def test_identical_files_are_uploaded_once(tmp_path):
+    content = b'x' * 200000
+    files = []
+    for index in range(8):
+        path = tmp_path / ('copy' + str(index) + '.bin')
+        path.write_bytes(content)
+        files.append(('copies/' + path.name, str(path)))
+    with artifactoryStub.ArtifactoryStub(latency=0.01) as stub:
+        api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password')
+        api.repositories_create('build-local', {'key': 'build-local', 'rclass': 'local', 'packageType': 'generic'})
+        records = list(api.iter_artifacts_deploy('build-local', files, jobs=8))
+        assert all(record['ok'] for record in records)
+        assert sorted(record['deployedBy'] for record in records) == ['checksum'] * 7 + ['upload']
+        assert stub.bytesUploaded == len(content)
+        assert len(stub.artifacts) == 8
+        api.close()
+
+def test_async_api_mirrors_only_endpoint_calls():
+    for name in ('iter_artifacts_deploy', 'add_request_hook', 'remove_request_hook', 'cache_statistics'):
+        assert not hasattr(artifactoryAsyncAPI.AsyncArtifactoryAPI, name)
+    assert hasattr(artifactoryAsyncAPI.AsyncArtifactoryAPI, 'artifact_deploy')
+
+def test_duplicates_after_the_first_upload_deploy_by_checksum(tmp_path):
+    files = []
+    for index in range(3):
+        path = tmp_path / ('copy' + str(index) + '.bin')
+        path.write_bytes(b'same content')
+        files.append(('copies/' + path.name, str(path)))
+    with artifactoryStub.ArtifactoryStub() as stub:
+        api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password')
+        api.repositories_create('build-local', {'key': 'build-local', 'rclass': 'local', 'packageType': 'generic'})
+        # one at a time, so each upload has finished before the next file is read
+        records = list(api.iter_artifacts_deploy('build-local', files, jobs=1))
+        assert [record['deployedBy'] for record in records] == ['upload', 'checksum', 'checksum']
+        assert stub.bytesUploaded == len(b'same content')
+        api.close()
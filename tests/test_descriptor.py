@@ -0,0 +1,82 @@
+import io
+import os
+
+import artifactoryAPI
+import artifactoryDescriptor
+import artifactoryStub
+
+OLD = (b'<?xml version="1.0" encoding="UTF-8"?><config xmlns="http://artifactory.jfrog.org/xsd/1.7.1">'
+       b'<offlineMode>false</offlineMode>'
+       b'<localRepositories><localRepository><key>libs</key><blackedOut>false</blackedOut></localRepository></localRepositories>'
+       b'</config>')
+NEW = OLD.replace(b'<offlineMode>false', b'<offlineMode>true').replace(b'<blackedOut>false', b'<blackedOut>true')
+
+EXPECTED = ['~ offlineMode: false -> true',
+            '~ localRepositories[libs]/blackedOut: false -> true']
+
+class Unseekable(io.RawIOBase):
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.data.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+def test_diff_of_bytes():
+    assert artifactoryDescriptor.format_changes(artifactoryDescriptor.diff(OLD, NEW)) == EXPECTED
+
+def test_diff_of_file_objects():
+    changes = artifactoryDescriptor.diff(io.BytesIO(OLD), io.BufferedReader(Unseekable(NEW)))
+    assert artifactoryDescriptor.format_changes(changes) == EXPECTED
+
+def test_diff_of_files(tmp_path):
+    oldFile, newFile = tmp_path / 'old.xml', tmp_path / 'new.xml'
+    oldFile.write_bytes(OLD)
+    newFile.write_bytes(NEW)
+    with open(str(oldFile), 'rb') as old, open(str(newFile), 'r') as new:
+        assert artifactoryDescriptor.format_changes(artifactoryDescriptor.diff(old, new)) == EXPECTED
+    assert artifactoryDescriptor.format_changes(artifactoryDescriptor.diff(str(oldFile), str(newFile))) == EXPECTED
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Examples', 'artConfigOutput.xml')
+
+LOCAL_REPOSITORIES = ['acs-project', 'cmd', 'default', 'docker-prod-local2', 'official-oracle', 'oracle-dumps', 'terraform']
+
+def test_parse_indexes_sections_and_entries():
+    descriptor = artifactoryDescriptor.parse(EXAMPLE)
+    assert descriptor.namespace == 'http://artifactory.jfrog.org/xsd/1.7.1'
+    assert descriptor.section('offlineMode').text == 'false'
+    assert descriptor.section('noSuchSection') is None
+    assert list(descriptor.repositories('local')) == LOCAL_REPOSITORIES
+    assert artifactoryDescriptor.local_tag(descriptor.repository('acs-production')) == 'remoteRepository'
+    assert descriptor.repository('no-such-repository') is None
+    assert list(descriptor.entries('backups')) == ['backup-daily', 'backup-weekly']
+    backup = artifactoryDescriptor.element_to_dict(descriptor.entry('backups', 'backup-daily'))
+    assert backup['cronExp'] == '0 0 2 ? * MON-FRI'
+    assert backup['excludedRepositories'] is None
+
+def test_sections_are_detached_as_they_are_parsed():
+    root = None
+    sections = []
+    with open(EXAMPLE, 'rb') as descriptor_file:
+        for root, element in artifactoryDescriptor.iter_sections(descriptor_file):
+            # no section seen before is still attached to the root
+            assert not [section for section in sections if section in list(root)]
+            sections.append(element)
+    assert len(sections) == 24
+    assert len(root) == 0
+
+def test_descriptor_is_parsed_from_the_response_stream():
+    with open(EXAMPLE, 'r') as descriptor_file:
+        text = descriptor_file.read()
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.descriptor = text
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password') as api:
+            # the stub gzips the descriptor, which is decoded while it is parsed
+            descriptor = api.artifactory_configuration_descriptor()
+    assert list(descriptor.repositories('local')) == LOCAL_REPOSITORIES
+    assert list(descriptor.entries('backups')) == ['backup-daily', 'backup-weekly']
@@ -0,0 +1,46 @@
+import json
+import itertools
+
+import pytest
+
+import artifactoryAPI
+import artifactoryJSON
+import artifactoryStub
+
+DOCUMENT = json.dumps([{'name': 'ärger ☃', 'note': 'brackets ], commas , and "quotes"'},
+                       123, 2.5, -7e3, True, None, 'text', [1, [2, []]], {}, []], ensure_ascii=False).encode('utf-8')
+
+def test_any_chunking_decodes_the_same():
+    expected = json.loads(DOCUMENT.decode('utf-8'))
+    for split in range(len(DOCUMENT) + 1):
+        assert list(artifactoryJSON.iter_json_array([DOCUMENT[:split], DOCUMENT[split:]])) == expected
+    for size in (1, 2, 3, 7):
+        chunks = [DOCUMENT[start:start + size] for start in range(0, len(DOCUMENT), size)]
+        assert list(artifactoryJSON.iter_json_array(chunks)) == expected
+    assert list(artifactoryJSON.iter_json_array([DOCUMENT.decode('utf-8')])) == expected
+
+def test_empty_arrays():
+    for text in ('[]', ' [ ] ', '[\n]'):
+        assert list(artifactoryJSON.iter_json_array([text])) == []
+
+@pytest.mark.parametrize('text', ['{"name": "alice"}', '[1, 2', '[1 2]', '', '[{"name": '])
+def test_invalid_arrays(text):
+    with pytest.raises(ValueError):
+        list(artifactoryJSON.iter_json_array([text]))
+
+def test_elements_are_yielded_before_the_rest_arrives():
+    def chunks():
+        yield b'[{"name": "alice"}, '
+        raise AssertionError('read past the first element')
+    elements = artifactoryJSON.iter_json_array(chunks())
+    assert next(elements) == {'name': 'alice'}
+
+def test_iter_users_streams_the_list():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        for number in range(2000):
+            stub.security['security/users']['user' + str(number)] = {'name': 'user' + str(number)}
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password') as api:
+            assert list(api.iter_users()) == api.users_list()
+            # stopping early leaves the rest of the list, and of the details, unread
+            details = itertools.islice(api.iter_users(detail=True, prefetch=4), 3)
+            assert [user['name'] for user in details] == ['user0', 'user1', 'user2']
@@ -0,0 +1,41 @@
+import random
+
+import artifactoryLimits
+
+# latencies of a healthy server: 5 to 15 ms, whatever the number of requests in flight
+def test_limit_holds_under_jitter():
+    randomness = random.Random(1)
+    limiter = artifactoryLimits.AdaptiveConcurrencyLimiter(16)
+    for request in range(5000):
+        limiter.acquire()
+        limiter.release(randomness.uniform(0.005, 0.015), False, 'security')
+    assert limiter.limit == 16
+
+# latencies of a server which queues requests beyond 6 in flight
+def test_limit_backs_off_under_queueing():
+    randomness = random.Random(1)
+    limiter = artifactoryLimits.AdaptiveConcurrencyLimiter(32)
+    limits = []
+    for request in range(20000):
+        limiter.acquire()
+        latency = 0.01 * max(1, (limiter.limit / 6) ** 2) * randomness.uniform(0.7, 1.3)
+        limiter.release(latency, False, 'security')
+        limiter.lastDecrease = 0  # simulated requests take no time
+        limits.append(limiter.limit)
+    assert max(limits[5000:]) < 16
+
+# each endpoint family has its own baseline; slow configuration calls do not hold back fast security calls
+def test_families_have_their_own_baseline():
+    limiter = artifactoryLimits.AdaptiveConcurrencyLimiter(16)
+    for request in range(2000):
+        limiter.acquire()
+        limiter.release(0.005, False, 'security')
+        limiter.acquire()
+        limiter.release(0.5, False, 'system')
+    assert limiter.limit == 16
+
+def test_failures_halve_the_limit():
+    limiter = artifactoryLimits.AdaptiveConcurrencyLimiter(16, initialLimit=16)
+    limiter.acquire()
+    limiter.release(0.01, True)
+    assert limiter.limit == 8
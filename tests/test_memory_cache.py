@@ -0,0 +1,36 @@
+import artifactoryAPI
+import artifactoryCache
+import artifactoryStub
+
+def test_put_after_invalidation_is_ignored():
+    cache = artifactoryCache.MemoryCache(60)
+    generation = cache.generation()
+    cache.invalidate('security/users/alice')
+    cache.put('security/users/alice', {'name': 'alice'}, generation)
+    assert cache.get('security/users/alice') is None
+
+    generation = cache.generation()
+    cache.invalidate_prefix('security/permissions')
+    cache.put('security/permissions/readers', {'name': 'readers'}, generation)
+    assert cache.get('security/permissions/readers') is None
+    # other keys, and reads started after the invalidation, are stored
+    cache.put('security/groups/readers', {'name': 'readers'}, generation)
+    cache.put('security/users/alice', {'name': 'alice'}, cache.generation())
+    assert cache.get('security/groups/readers') == {'name': 'readers'}
+    assert cache.get('security/users/alice') == {'name': 'alice'}
+
+def test_read_racing_a_write_is_not_cached():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.security['security/users']['alice'] = {'name': 'alice', 'email': 'alice@example.com'}
+        api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', cacheTTL=300)
+        racing = []
+
+        # the update is sent, and invalidates the cache, after the GET read alice but before its result is stored
+        def write_during_read(record):
+            if record['method'] == 'GET' and not racing:
+                racing.append(record)
+                api.users_update('alice', {'email': 'alice@example.org'})
+        api.add_request_hook(write_during_read)
+        assert api.users_detail('alice')['email'] == 'alice@example.com'
+        assert api.users_detail('alice')['email'] == 'alice@example.org'
+        api.close()
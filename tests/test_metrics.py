@@ -0,0 +1,40 @@
+import artifactoryAPI
+import artifactoryMetrics
+import artifactoryStub
+
+def test_endpoint_templates():
+    assert artifactoryMetrics.endpoint_template('security/users/admin') == 'security/users/{name}'
+    assert artifactoryMetrics.endpoint_template('security/users') == 'security/users'
+    assert artifactoryMetrics.endpoint_template('repositories?type=local') == 'repositories'
+    assert artifactoryMetrics.endpoint_template('repositories/libs-local') == 'repositories/{key}'
+    assert artifactoryMetrics.endpoint_template(None) == '{repoKey}/{path}'
+
+def test_histogram_quantile_interpolates_within_a_bucket():
+    buckets = [0] * len(artifactoryMetrics.LATENCY_BUCKETS)
+    buckets[1] = 10  # 10 requests between 5 and 10 ms
+    assert artifactoryMetrics.histogram_quantile(0.5, buckets, 10) == 0.0075
+    assert artifactoryMetrics.histogram_quantile(0.5, buckets, 0) is None
+
+def test_collector_aggregates_per_endpoint():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        collector = artifactoryMetrics.MetricsCollector()
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', retries=0) as api:
+            api.add_request_hook(collector)
+            for name in ('alice', 'bob'):
+                api.users_create(name, {'email': name + '@example.com'})
+                api.users_detail(name)
+            stub.failNext = 1
+            api._request('GET', 'security/users')
+    summary = dict(((endpoint['method'], endpoint['endpoint']), endpoint) for endpoint in collector.summary())
+    assert summary[('PUT', 'security/users/{name}')]['count'] == 2
+    assert summary[('PUT', 'security/users/{name}')]['bytesOut'] > 0
+    detail = summary[('GET', 'security/users/{name}')]
+    assert detail['count'] == 2 and detail['errors'] == 0 and detail['statuses'] == {'200': 2}
+    assert detail['bytesIn'] > 0
+    assert summary[('GET', 'security/users')]['statuses'] == {'503': 1}
+    assert summary[('GET', 'security/users')]['errors'] == 1
+
+    text = collector.prometheus_text()
+    assert 'artifactory_request_duration_seconds_count{method="GET",endpoint="security/users/{name}"} 2' in text
+    assert 'artifactory_request_duration_seconds_bucket{method="GET",endpoint="security/users/{name}",le="+Inf"} 2' in text
+    assert 'artifactory_requests_total{method="GET",endpoint="security/users",status="503"} 1' in text
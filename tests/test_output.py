@@ -0,0 +1,61 @@
+import io
+import json
+
+import artifactoryOutput
+import artifactoryStub
+from test_cli import run_cli
+
+RECORDS = [{'name': 'alice', 'groups': ['readers']}, {'name': 'bob', 'admin': True}]
+
+def test_jsonl_writes_each_record_as_it_comes():
+    stream = io.StringIO()
+
+    # each record must be on the stream before the next one is produced
+    def records():
+        for position, record in enumerate(RECORDS):
+            assert stream.getvalue().count('\n') == position
+            yield record
+    artifactoryOutput.write_result(stream, records(), 'jsonl')
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == RECORDS
+
+def test_json_array():
+    stream = io.StringIO()
+    artifactoryOutput.write_result(stream, iter(RECORDS), 'json')
+    assert json.loads(stream.getvalue()) == RECORDS
+    assert len(stream.getvalue().splitlines()) == 4
+    stream = io.StringIO()
+    artifactoryOutput.write_result(stream, [], 'json')
+    assert json.loads(stream.getvalue()) == []
+    # a single result which is not a list is written as it is
+    stream = io.StringIO()
+    artifactoryOutput.write_result(stream, {'status': 'OK'}, 'json')
+    assert json.loads(stream.getvalue()) == {'status': 'OK'}
+
+def test_table_columns():
+    stream = io.StringIO()
+    artifactoryOutput.write_result(stream, RECORDS, 'table')
+    assert stream.getvalue().splitlines() == ['name   groups       admin',
+                                              '-----  -----------  -----',
+                                              'alice  ["readers"]',
+                                              'bob                 True']
+    stream = io.StringIO()
+    artifactoryOutput.write_result(stream, 'OK', 'table')
+    assert stream.getvalue().splitlines() == ['value', '-----', 'OK']
+
+def test_is_record_stream():
+    assert artifactoryOutput.is_record_stream([])
+    assert artifactoryOutput.is_record_stream(iter([]))
+    for value in ('text', b'bytes', {'name': 'alice'}, 200):
+        assert not artifactoryOutput.is_record_stream(value)
+
+def test_cli_output_formats():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        for name in ('alice', 'bob'):
+            stub.security['security/users'][name] = {'name': name}
+        code, output = run_cli('-s', stub.base_url(), '-p', 'password', '--output', 'jsonl', 'users', 'list')
+        assert code == 0, output
+        assert [json.loads(line)['name'] for line in output.splitlines()] == ['alice', 'bob']
+        code, output = run_cli('-s', stub.base_url(), '-p', 'password', '--output', 'table', 'users', 'list')
+        assert code == 0, output
+        assert output.splitlines()[0].split() == ['name', 'uri']
+        assert output.splitlines()[2].split()[0] == 'alice'
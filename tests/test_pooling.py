@@ -0,0 +1,39 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import artifactoryAPI
+import artifactoryStub
+
+def test_requests_reuse_one_connection():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password') as api:
+            for number in range(20):
+                assert api.users_create('user' + str(number), {}) == 201
+            assert len(api.users_list()) == 20
+        assert stub.requests == 21
+        assert stub.connections == 1
+
+def test_concurrent_requests_stay_within_the_pool():
+    with artifactoryStub.ArtifactoryStub(latency=0.01) as stub:
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', poolMaxSize=4) as api:
+            with ThreadPoolExecutor(4) as executor:
+                for round in range(3):
+                    assert list(executor.map(lambda number: api.users_create('user' + str(number), {}), range(16))) == [201] * 16
+        assert stub.connections <= 4
+
+def test_idle_connections_are_not_reused():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', keepAliveTimeout=0.1) as api:
+            api.users_list()
+            api.users_list()
+            time.sleep(0.2)
+            api.users_list()
+        assert stub.connections == 2
+
+def test_context_manager_closes_the_pool():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password') as api:
+            api.users_list()
+            adapter = api.session.get_adapter(stub.base_url())
+            assert len(adapter.poolmanager.pools) == 1
+        assert len(adapter.poolmanager.pools) == 0
@@ -0,0 +1,60 @@
+import time
+import email.utils
+
+import requests
+
+import artifactoryAPI
+import artifactoryRetry
+import artifactoryStub
+
+def response_with(headers):
+    response = requests.Response()
+    response.status_code = 503
+    response.headers.update(headers)
+    return response
+
+def test_transient_errors_are_retried():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.security['security/users']['alice'] = {'name': 'alice'}
+        stub.failNext = 2
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', retries=3, backoffFactor=0.01) as api:
+            records = []
+            api.add_request_hook(records.append)
+            assert api.users_list() == [{'name': 'alice', 'uri': '/artifactory/api/security/users/alice'}]
+        assert [(record['status'], record['attempt']) for record in records] == [(503, 0), (503, 1), (200, 2)]
+
+def test_retries_are_limited():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.failNext = 10
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', retries=2, backoffFactor=0.01) as api:
+            assert api._request('GET', 'security/users').status_code == 503
+        assert stub.requests == 3
+
+def test_non_idempotent_requests_are_not_retried():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.security['security/users']['alice'] = {'name': 'alice'}
+        stub.failNext = 1
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', retries=3, backoffFactor=0.01) as api:
+            # a POST may have been applied before it failed, so sending it again could apply it twice
+            assert api.users_update('alice', {'email': 'alice@example.com'}) == 503
+        assert stub.requests == 1
+
+def test_retry_after_is_honored():
+    with artifactoryStub.ArtifactoryStub(errorStatus=429) as stub:
+        stub.failNext = 1
+        stub.retryAfter = '0.3'
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password', retries=1, backoffFactor=0.0) as api:
+            started = time.time()
+            assert api.users_list() == []
+            assert time.time() - started >= 0.3
+        assert stub.requests == 2
+
+def test_retry_after_forms_and_limit():
+    policy = artifactoryRetry.RetryPolicy(backoffFactor=0.5, backoffMax=10)
+    assert policy.delay(0, response_with({'Retry-After': '2'})) == 2
+    assert policy.delay(0, response_with({'Retry-After': '120'})) == 10
+    inFiveSeconds = email.utils.formatdate(time.time() + 5, usegmt=True)
+    assert 3 <= policy.delay(0, response_with({'Retry-After': inFiveSeconds})) <= 5
+    assert policy.delay(0, response_with({'Retry-After': 'not a date'})) == 0
+    # without Retry-After, full jitter up to backoffFactor * 2**attempt
+    assert all(0 <= policy.delay(2) <= 2 for attempt in range(100))
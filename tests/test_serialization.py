@@ -0,0 +1,38 @@
+import json
+
+import requests
+
+import artifactoryAPI
+import artifactoryJSON
+import artifactoryStub
+
+def test_encoded_payloads_pass_through():
+    text = '{"email":  "alice@example.com", "groups": ["readers"]}\n'
+    assert artifactoryJSON.encode(text) == text.encode('utf-8')
+    assert artifactoryJSON.encode(text.encode('utf-8')) == text.encode('utf-8')
+    assert json.loads(artifactoryJSON.encode({'name': 'alice', 'size': 2 ** 70})) == {'name': 'alice', 'size': 2 ** 70}
+    assert artifactoryJSON.decode(b'{"name": "\\u00e4"}') == artifactoryJSON.decode('{"name": "ä"}') == {'name': 'ä'}
+
+def test_entity_text_is_sent_byte_for_byte():
+    text = b'{\n  "email": "alice@example.com"\n}\n'
+    with artifactoryStub.ArtifactoryStub() as stub:
+        records = []
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password') as api:
+            api.add_request_hook(records.append)
+            assert api.users_create('alice', text) == 201
+            assert api.users_create('bob', {'email': 'bob@example.com'}) == 201
+        assert records[0]['bytesOut'] == len(text)
+        assert records[1]['bytesOut'] == len(b'{"email":"bob@example.com"}')
+        assert stub.security['security/users']['alice']['email'] == 'alice@example.com'
+
+def test_compressed_responses_use_the_session_default_accept_encoding():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        for number in range(200):
+            stub.security['security/users']['user' + str(number)] = {'name': 'user' + str(number)}
+        with artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password') as api:
+            r = api._request('GET', 'security/users')
+            # requests asks for gzip by default; the client does not set the header itself
+            assert r.request.headers['Accept-Encoding'] == requests.utils.default_headers()['Accept-Encoding']
+            assert r.headers['Content-Encoding'] == 'gzip'
+            assert len(r.json()) == 200
+            assert len(api.users_list()) == 200
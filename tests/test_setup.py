@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import subprocess
+import importlib
+
+import artifactoryStub
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'artifactorySetup.py')
+
+def run_setup(tmp_path, stub, sections, *options, returncode=0):
+    configFile = tmp_path / 'config.json'
+    config = {'artifactory': {'baseURL': stub.base_url(), 'username': 'admin', 'password': 'password'}}
+    config.update(sections)
+    configFile.write_text(json.dumps(config))
+    result = subprocess.run([sys.executable, SCRIPT, '-c', str(configFile)] + list(options), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            stdin=subprocess.DEVNULL, timeout=60)
+    output = result.stdout.decode('utf-8')
+    assert result.returncode == returncode, output
+    return output
+
+def test_import():
+    module = importlib.import_module('artifactorySetup')
+    assert callable(module.run_operations)
+
+def test_users_section(tmp_path):
+    with artifactoryStub.ArtifactoryStub() as stub:
+        output = run_setup(tmp_path, stub, {'users': {'create': {'alice': {'email': 'alice@example.com'}}, 'detail': ['alice']}})
+        assert 'artifactorySetup.py complete.' in output
+        assert stub.security['security/users']['alice']['email'] == 'alice@example.com'
+
+def test_plan_reports_creates_of_existing_entities(tmp_path):
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.security['security/users']['alice'] = {'name': 'alice', 'email': 'alice@example.com', 'admin': True}
+        sections = {'users': {'create': {'alice': {'email': 'alice@example.com'}}}}
+        output = run_setup(tmp_path, stub, sections, '--planOnly')
+        assert 'create "alice": skipped (exists' in output
+        assert '0 of 1 writes unchanged, 1 skipped' in output
+        # the create leaves out admin, so replacing the user would reset it
+        output = run_setup(tmp_path, stub, sections, '--planOnly', '-D')
+        assert 'create "alice": would replace' in output
+
+def test_fan_out_writes_metrics_per_target(tmp_path):
+    with artifactoryStub.ArtifactoryStub() as first, artifactoryStub.ArtifactoryStub() as second:
+        inventoryFile = tmp_path / 'inventory.json'
+        inventoryFile.write_text(json.dumps({'defaults': {'username': 'admin', 'password': 'password'},
+                                             'targets': [{'name': 'first', 'baseURL': first.base_url()},
+                                                         {'name': 'second', 'baseURL': second.base_url()}]}))
+        metricsFile = tmp_path / 'metrics.json'
+        output = run_setup(tmp_path, first, {'users': {'create': {'alice': {'email': 'alice@example.com'}}}},
+                           '--inventory', str(inventoryFile), '--metrics', str(metricsFile))
+        assert '2 targets, 2 ok, 0 failed' in output
+        for stub in (first, second):
+            assert 'alice' in stub.security['security/users']
+        assert not metricsFile.exists()
+        for name in ('first', 'second'):
+            assert json.loads((tmp_path / ('metrics.json.' + name)).read_text())
+
+def test_cache_directory_revalidates_details(tmp_path):
+    cacheDirectory = tmp_path / 'cache'
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.security['security/users']['alice'] = {'name': 'alice', 'email': 'alice@example.com'}
+        sections = {'users': {'detail': ['alice']}}
+        for run in range(2):
+            output = run_setup(tmp_path, stub, sections, '--cacheDirectory', str(cacheDirectory))
+            assert 'alice@example.com' in output
+        assert len(os.listdir(str(cacheDirectory))) == 1
+
+def test_invalid_entity_file_stops_the_run(tmp_path):
+    entityFile = tmp_path / 'alice.json'
+    entityFile.write_text('{"email": "alice@example.org",}')
+    with artifactoryStub.ArtifactoryStub() as stub:
+        stub.security['security/users']['alice'] = {'name': 'alice', 'email': 'alice@example.com'}
+        sections = {'users': {'updateFromFile': [str(entityFile)], 'create': {'bob': {'email': 'bob@example.com'}}}}
+        for options in (('--plan',), ('--planOnly',), ('--dag', '-j', '4')):
+            output = run_setup(tmp_path, stub, sections, *options, returncode=1)
+            assert 'Invalid entity data in file ' + str(entityFile) in output
+        assert 'bob' not in stub.security['security/users']
+
+def test_fan_out_with_api_key_needs_no_password(tmp_path):
+    with artifactoryStub.ArtifactoryStub() as first, artifactoryStub.ArtifactoryStub() as second:
+        inventoryFile = tmp_path / 'inventory.json'
+        inventoryFile.write_text(json.dumps({'defaults': {'username': 'admin'},
+                                             'targets': [{'name': 'first', 'baseURL': first.base_url()},
+                                                         {'name': 'second', 'baseURL': second.base_url()}]}))
+        sections = {'artifactory': {'username': 'admin'}, 'users': {'create': {'alice': {'email': 'alice@example.com'}}}}
+        output = run_setup(tmp_path, first, sections, '--inventory', str(inventoryFile), '--apiKey', 'secret')
+        assert '2 targets, 2 ok, 0 failed' in output
+        for stub in (first, second):
+            assert 'alice' in stub.security['security/users']
+            assert stub.passwordChecks == 0
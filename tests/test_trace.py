@@ -0,0 +1,19 @@
+import artifactoryAPI
+import artifactoryStub
+import artifactoryTrace
+
+def test_prefetched_detail_requests_are_children_of_the_active_span():
+    with artifactoryStub.ArtifactoryStub() as stub:
+        for name in ('alice', 'bob', 'carol'):
+            stub.security['security/users'][name] = {'name': name}
+        tracer = artifactoryTrace.Tracer('test')
+        api = artifactoryAPI.ArtifactoryAPI(stub.base_url(), 'admin', 'password')
+        api.add_request_hook(tracer.request_hook)
+        api.add_task_wrapper(tracer.propagate)
+        with tracer.span('operation_users_detail') as operation:
+            details = list(api.iter_users(detail=True, prefetch=2))
+        api.close()
+    assert [detail['name'] for detail in details] == ['alice', 'bob', 'carol']
+    requests = [span for span in tracer.spans if span.name.startswith('GET ')]
+    assert len(requests) == 4
+    assert all(span.parentSpanId == operation.spanId for span in requests)